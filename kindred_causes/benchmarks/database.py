@@ -0,0 +1,126 @@
+"""
+Benchmark of the database profiles under concurrent requests.
+
+Each profile runs in its own process against a fresh database: worker threads simulate requests that
+read a page of events and write a notification, closing their connection between requests the way
+Django does when CONN_MAX_AGE is 0. Compared profiles:
+
+    sqlite-default  SQLite's own journal and sync settings, a new connection per request
+    sqlite-tuned    the SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap, busy_timeout) and persistent connections
+    postgresql      the DB_* environment variables, persistent health-checked connections (opt-in)
+
+The postgresql profile migrates the database and writes to it, so it only runs against a scratch database
+named explicitly with DB_NAME, never the application's default database.
+
+Run from the project directory:
+    python -m benchmarks.database [--threads 8] [--seconds 5] [--profiles sqlite-default sqlite-tuned]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+PROFILES = {
+    'sqlite-default': {'DB_ENGINE': 'sqlite', 'DB_SQLITE_TUNING': '0', 'DB_CONN_MAX_AGE': '0'},
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite', 'DB_SQLITE_TUNING': '1', 'DB_CONN_MAX_AGE': '60'},
+    'postgresql': {'DB_ENGINE': 'postgresql'},
+}
+
+
+def run_profile(threads, seconds):
+    """ Runs the workload in this process, with the database settings taken from the environment.
+    """
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindred_causes.settings')
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections, connection, transaction
+    from django.utils import timezone
+    from main.models import Event, Notification
+
+    call_command('migrate', verbosity=0)
+    Event.objects.bulk_create([
+        Event(name=f"Event {i}", description="Benchmark event", location="Houston", date=timezone.now())
+        for i in range(500)
+    ])
+    event = Event.objects.first()
+    close_old_connections()
+    connection.close()
+
+    counts = {'requests': 0, 'errors': 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        done, errors, timings = 0, 0, []
+        while time.perf_counter() < deadline:
+            close_old_connections()
+            start = time.perf_counter()
+            try:
+                list(Event.objects.order_by('-date', '-pk').values_list('pk', 'name')[:50])
+                with transaction.atomic():
+                    Notification.objects.create(event=event, subject="Benchmark", body="")
+                done += 1
+                timings.append(time.perf_counter() - start)
+            except OperationalError:
+                errors += 1
+        close_old_connections()
+        connection.close()
+        with lock:
+            counts['requests'] += done
+            counts['errors'] += errors
+            latencies.extend(timings)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests_per_second': counts['requests'] / seconds,
+        'errors': counts['errors'],
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=['sqlite-default', 'sqlite-tuned'])
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_profile(args.threads, args.seconds)))
+        return
+
+    if 'postgresql' in args.profiles:
+        from kindred_causes.settings import POSTGRESQL_DEFAULT_NAME
+        if os.environ.get('DB_NAME', POSTGRESQL_DEFAULT_NAME) == POSTGRESQL_DEFAULT_NAME:
+            parser.error(f"the postgresql profile writes to its database: set DB_NAME to a scratch database other than {POSTGRESQL_DEFAULT_NAME!r}")
+
+    print(f"{'profile':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, **PROFILES[profile])
+            if env['DB_ENGINE'] == 'sqlite':
+                env['DB_NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+            command = [sys.executable, '-m', 'benchmarks.database', '--child', '--threads', str(args.threads), '--seconds', str(args.seconds)]
+            output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:<16}{result['requests_per_second']:>10.0f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
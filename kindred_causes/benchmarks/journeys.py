@@ -0,0 +1,341 @@
+"""
+Load test of the main user journeys, driven through Django's test client against a synthetic data set.
+
+A fresh SQLite database in a temporary directory is migrated and filled by benchmarks.synthetic, then
+each journey is run by worker threads, each with its own clients and connection:
+
+    login           landing -> login page -> sign in -> home, as a volunteer
+    browse_events   the event browser, first page and a filtered page
+    join_event      a volunteer joins an event and lands on its page
+    assign_task     an admin assigns a volunteer to a task and lands on the task page
+    inbox           a volunteer's inbox page and its JSON feed
+    search          a volunteer types an event's name into the search typeahead, then opens the results page
+    report_csv      the streamed CSV report of an event
+    report_pdf      a PDF report generated from scratch, then downloaded
+
+For every journey the p50/p95 latency of one run, the throughput over all workers and the queries per
+run are recorded; with --repeats, each journey is measured several times and the medians are kept.
+Results are compared with a JSON baseline. A journey regresses when it runs more queries or fails more
+often. A p95 grown by more than the tolerance is only a warning, since one short measurement is noisy,
+unless it is the median of at least LATENCY_GATE_REPEATS repeats or covers LATENCY_GATE_RUNS runs.
+Pass --save to make the results the new baseline.
+
+Run from the project directory:
+    python -m benchmarks.journeys [--scale 1] [--iterations 20] [--threads 1] [--repeats 1] [--save]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+JOURNEYS = ['login', 'browse_events', 'join_event', 'assign_task', 'inbox', 'search', 'report_csv', 'report_pdf']
+
+# A p95 latency regression fails the run only when measured this many times, or over this many runs.
+LATENCY_GATE_REPEATS = 3
+LATENCY_GATE_RUNS = 200
+
+
+class JourneyError(Exception):
+    pass
+
+
+def expect(response, status=200):
+    if response.status_code != status:
+        raise JourneyError(f"{response.request['PATH_INFO']} returned {response.status_code}, expected {status}")
+    return response
+
+
+class Journeys:
+    """ The user journeys, each run as one worker's k-th iteration against the synthetic data set.
+    """
+
+    def __init__(self, dataset, password, report_dir):
+        from django.test import Client
+        self.dataset = dataset
+        self.password = password
+        self.report_dir = report_dir
+        self.Client = Client
+
+    def client(self, username):
+        from django.contrib.auth.models import User
+        client = self.Client()
+        client.force_login(User.objects.get(username=username))
+        return client
+
+    def volunteer(self, k):
+        usernames = self.dataset.volunteer_usernames
+        return usernames[k % len(usernames)]
+
+    def login(self, k):
+        from django.urls import reverse
+        client = self.Client()
+        expect(client.get(reverse('landing')))
+        expect(client.get(reverse('login')))
+        response = client.post(reverse('login'), {'username': self.volunteer(k), 'password': self.password}, follow=True)
+        if response.redirect_chain[-1:] != [(reverse('home'), 302)]:
+            raise JourneyError("Login did not land on the home page")
+
+    def browse_events(self, k):
+        from django.urls import reverse
+        client = self.client(self.volunteer(k))
+        expect(client.get(reverse('event_browser')))
+        expect(client.get(reverse('event_browser'), {'location': 'Houston', 'sort': '-urgency'}))
+
+    def join_event(self, k):
+        from django.urls import reverse
+        client = self.client(self.volunteer(k))
+        event_id = self.dataset.event_ids[k % len(self.dataset.event_ids)]
+        expect(client.get(reverse('join_event', kwargs={'event_id': event_id})))
+        expect(client.post(reverse('join_event', kwargs={'event_id': event_id}), follow=True))
+
+    def assign_task(self, k):
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        client = self.client(self.dataset.admin_username)
+        task_id = self.dataset.task_ids[k % len(self.dataset.task_ids)]
+        user_id = User.objects.get(username=self.volunteer(k)).pk
+        url = reverse('assign_user_to_task', kwargs={'user_id': user_id, 'task_id': task_id})
+        expect(client.get(url))
+        expect(client.post(url, follow=True))
+
+    def inbox(self, k):
+        from django.urls import reverse
+        client = self.client(self.volunteer(k))
+        expect(client.get(reverse('inbox')))
+        expect(client.get(reverse('inbox_json')))
+
+    def search(self, k):
+        from django.urls import reverse
+        client = self.client(self.volunteer(k))
+        query = f"Event {k % len(self.dataset.event_ids)}"
+        for end in range(2, len(query) + 1):
+            expect(client.get(reverse('search_typeahead'), {'q': query[:end]}))
+        expect(client.get(reverse('search'), {'q': query}))
+
+    def report_csv(self, k):
+        from django.urls import reverse
+        client = self.client(self.dataset.admin_username)
+        event_id = self.dataset.event_ids[k % len(self.dataset.event_ids)]
+        response = expect(client.get(reverse('generate_event_report_csv', kwargs={'pk': event_id})))
+        b''.join(response.streaming_content)
+
+    def report_pdf(self, k):
+        from django.urls import reverse
+        client = self.client(self.dataset.admin_username)
+        event_id = self.dataset.event_ids[k % len(self.dataset.event_ids)]
+        # Remove the cached file so the report is generated again, as after an edit to the event.
+        for path in Path(self.report_dir).glob(f"event_{event_id}_*.pdf"):
+            path.unlink(missing_ok=True)
+        url = reverse('generate_event_report_pdf', kwargs={'pk': event_id})
+        expect(client.get(url))
+        response = expect(client.get(url))
+        if not response.streaming:
+            raise JourneyError("The PDF report was not ready after generating it")
+        b''.join(response.streaming_content)
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))] if values else None
+
+
+def run_journey(journeys, name, iterations, threads, warmup):
+    """ Runs a journey on worker threads and summarizes its latency, throughput and queries.
+    """
+    from django.db import close_old_connections, connection
+    from django.test.utils import CaptureQueriesContext
+
+    journey = getattr(journeys, name)
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker(w):
+        timings, counts, failures = [], [], []
+        for i in range(warmup + iterations):
+            k = w * (warmup + iterations) + i
+            start = time.perf_counter()
+            try:
+                with CaptureQueriesContext(connection) as captured:
+                    journey(k)
+            except Exception as exc:
+                failures.append(f"{type(exc).__name__}: {exc}")
+                continue
+            if i >= warmup:
+                timings.append(time.perf_counter() - start)
+                counts.append(len(captured))
+        close_old_connections()
+        connection.close()
+        with lock:
+            latencies.extend(timings)
+            queries.extend(counts)
+            errors.extend(failures)
+
+    workers = [threading.Thread(target=worker, args=(w,)) for w in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'runs': len(latencies),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        # Warm-up runs are included here, since they take part of the elapsed time.
+        'throughput_per_s': round(((warmup + iterations) * threads - len(errors)) / elapsed, 2),
+        'queries_per_run': round(sum(queries) / len(queries), 1) if queries else None,
+    }
+
+
+def run_repeated(journeys, name, iterations, threads, warmup, repeats):
+    """ Runs a journey several times and keeps the median of each measure, and every run's errors.
+    """
+    samples = [run_journey(journeys, name, iterations, threads, warmup) for _ in range(repeats)]
+
+    def median(key):
+        values = sorted(sample[key] for sample in samples if sample[key] is not None)
+        return values[len(values) // 2] if values else None
+
+    return {
+        'runs': sum(sample['runs'] for sample in samples),
+        'repeats': repeats,
+        'errors': sum(sample['errors'] for sample in samples),
+        'first_error': next((sample['first_error'] for sample in samples if sample['first_error']), None),
+        'p50_ms': median('p50_ms'),
+        'p95_ms': median('p95_ms'),
+        'throughput_per_s': median('throughput_per_s'),
+        'queries_per_run': median('queries_per_run'),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """ Compares results with the baseline.
+
+    :return tuple: The regressions, which fail the run, and the latency growths measured too few times
+        to be sure of, each with the journey and the reason.
+    """
+    regressions, warnings = [], []
+    for name, result in results['journeys'].items():
+        before = baseline.get('journeys', {}).get(name)
+        if before is None:
+            continue
+        if result['errors'] > before['errors']:
+            regressions.append(f"{name}: {result['errors']} errors, baseline {before['errors']}")
+        if result['p95_ms'] and before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            message = f"{name}: p95 {result['p95_ms']} ms, baseline {before['p95_ms']} ms"
+            gated = result.get('repeats', 1) >= LATENCY_GATE_REPEATS or result['runs'] >= LATENCY_GATE_RUNS
+            (regressions if gated else warnings).append(message)
+        if result['queries_per_run'] and before['queries_per_run'] and result['queries_per_run'] > before['queries_per_run']:
+            regressions.append(f"{name}: {result['queries_per_run']} queries per run, baseline {before['queries_per_run']}")
+    return regressions, warnings
+
+
+def print_results(results, baseline):
+    before = baseline.get('journeys', {}) if baseline else {}
+    print(f"{'journey':<15}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'runs/s':>10}{'queries':>9}{'errors':>8}   p95 vs baseline")
+    for name, result in results['journeys'].items():
+        delta = ""
+        if name in before and before[name]['p95_ms'] and result['p95_ms']:
+            delta = f"{(result['p95_ms'] / before[name]['p95_ms'] - 1) * 100:+.0f}%"
+        print(
+            f"{name:<15}{result['runs']:>6}{result['p50_ms'] or 0:>10.2f}{result['p95_ms'] or 0:>10.2f}"
+            f"{result['throughput_per_s'] or 0:>10.1f}{result['queries_per_run'] or 0:>9.1f}{result['errors']:>8}   {delta}"
+        )
+        if result['first_error']:
+            print(f"    first error: {result['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=20, help="Runs of each journey per thread.")
+    parser.add_argument('--warmup', type=int, default=2, help="Unrecorded runs per thread before measuring.")
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=1, help="Measurements of each journey, whose medians are kept.")
+    parser.add_argument('--journeys', nargs='+', choices=JOURNEYS, default=JOURNEYS)
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help="Allowed p95 growth over the baseline, as a share. Beyond it, a warning, or a regression when measured enough.",
+    )
+    parser.add_argument('--save', action='store_true', help="Write the results to the baseline file.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='kindred-benchmark-')
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'kindred_causes.settings',
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': os.path.join(directory, 'benchmark.sqlite3'),
+        'CACHE_BACKEND': 'locmem',
+        'REQUEST_PROFILING_SAMPLE_RATE': '0',
+    })
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+    from benchmarks.synthetic import PASSWORD, generate
+
+    report_dir = os.path.join(directory, 'reports')
+    try:
+        # The test client's host, and reports generated inline so a run includes the generation.
+        with override_settings(ALLOWED_HOSTS=['testserver'], BACKGROUND_JOBS_ENABLED=False, REPORT_CACHE_DIR=Path(report_dir)):
+            call_command('migrate', verbosity=0)
+            dataset = generate(args.scale, args.seed)
+            journeys = Journeys(dataset, PASSWORD, report_dir)
+            results = {
+                'meta': {
+                    'scale': args.scale,
+                    'seed': args.seed,
+                    'iterations': args.iterations,
+                    'threads': args.threads,
+                    'repeats': args.repeats,
+                    'rows': dataset.counts,
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'machine': platform.machine(),
+                },
+                'journeys': {
+                    name: run_repeated(journeys, name, args.iterations, args.threads, args.warmup, args.repeats)
+                    for name in args.journeys
+                },
+            }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    print_results(results, baseline)
+
+    if args.save:
+        args.baseline.write_text(json.dumps(results, indent=4) + '\n')
+        print(f"Saved the baseline to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save to record one.")
+        return
+
+    keys = ('scale', 'seed', 'iterations', 'threads')
+    if any(baseline['meta'].get(key) != results['meta'][key] for key in keys):
+        print("Warning: the baseline was recorded with different settings: " + ", ".join(f"{key}={baseline['meta'].get(key)}" for key in keys))
+    regressions, warnings = compare(results, baseline, args.tolerance)
+    for warning in warnings:
+        print(f"WARNING {warning} (rerun with --repeats {LATENCY_GATE_REPEATS} to confirm)")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of ranking volunteers for a task with the skill-bitset matching engine, and of
+searching them by skill through the inverted skill index.
+
+Builds a synthetic in-memory VolunteerIndex, so no database is needed.
+
+Run from the project directory:
+    python -m benchmarks.matching [--volunteers 50000] [--skills 200] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindred_causes.settings')
+django.setup()
+
+from main.matching import VolunteerIndex, score_volunteers
+
+
+CITIES = ["houston", "austin", "dallas", "san antonio", "el paso"]
+
+
+def make_index(volunteers, skills, seed=0):
+    rng = random.Random(seed)
+    index = VolunteerIndex(version=0)
+    for skill_id in range(1, skills + 1):
+        index.bit(skill_id, f"Skill {skill_id}")
+
+    today = date.today()
+    skill_users = {}
+    for user_id in range(1, volunteers + 1):
+        user_skills = rng.sample(range(1, skills + 1), rng.randint(0, 8))
+        for skill_id in user_skills:
+            skill_users.setdefault(skill_id, []).append(user_id - 1)
+        index.positions[user_id] = len(index.user_ids)
+        index.user_ids.append(user_id)
+        index.names.append(f"Volunteer {user_id}")
+        index.masks.append(index.mask(user_skills))
+        index.starts.append(today - timedelta(days=rng.randint(0, 60)))
+        index.ends.append(today + timedelta(days=rng.randint(0, 60)))
+        index.cities.append(rng.choice(CITIES))
+    index.distinct_cities = set(CITIES)
+    for skill_id, positions in skill_users.items():
+        index.skill_volunteers[skill_id] = sum(1 << position for position in positions)
+    return index
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sorted(timings)[len(timings) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--volunteers', type=int, default=50000)
+    parser.add_argument('--skills', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    index = make_index(args.volunteers, args.skills)
+    required = {1, 2, 3}
+    day = date.today() + timedelta(days=10)
+
+    best, median, matches = best_of(args.repeat, lambda: score_volunteers(index, required, day=day, location="Downtown Houston"))
+    print(f"volunteers: {len(index)}")
+    print(f"ranking best: {best * 1000:.1f} ms, median: {median * 1000:.1f} ms")
+    print(f"top match: {matches[0].name} ({matches[0].score})")
+
+    all_mask, any_mask = index.mask([1]), index.mask([2, 3])
+
+    def scan():
+        return [i for i, mask in enumerate(index.masks) if mask & all_mask == all_mask and mask & any_mask]
+
+    def search():
+        return index.search(all_skills=[1], any_skills=[2, 3])
+
+    best, _, scanned = best_of(args.repeat, scan)
+    print(f"skill 1 AND (2 OR 3), per-volunteer scan: {best * 1000:.2f} ms")
+    best, _, found = best_of(args.repeat, search)
+    print(f"skill 1 AND (2 OR 3), inverted index: {best * 1000:.2f} ms ({len(found)} volunteers)")
+    assert scanned == found
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Synthetic data generator for benchmarks: skills, events with tasks, volunteer profiles, attendance,
+assignments, reviews and notifications, scaled by a single factor and reproducible from a seed.
+
+Rows are written with bulk inserts and the counters, search index, coordinates and volunteer stats rebuilt at the
+end, so generating is fast and sends no notifications. Expects Django to be set up and migrated.
+
+Run from the project directory against the configured database (use a scratch DB_NAME):
+    python -m benchmarks.synthetic [--scale 1] [--seed 0]
+"""
+import argparse
+import os
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+
+# Rows per unit of scale.
+EVENTS = 100
+VOLUNTEERS = 200
+SKILLS = 20
+TASKS_PER_EVENT = 3
+ATTENDEES_PER_EVENT = 20
+REVIEWS_PER_EVENT = 3
+NOTIFICATIONS_PER_VOLUNTEER = 20
+
+PASSWORD = "benchmark-password"
+CITIES = ["Houston", "Austin", "Dallas", "San Antonio", "El Paso"]
+
+
+@dataclass
+class Dataset:
+    """ What the generator created, for benchmarks to pick their targets from.
+    """
+    admin_username: str
+    volunteer_usernames: list = field(default_factory=list)
+    event_ids: list = field(default_factory=list)
+    task_ids: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+
+
+def generate(scale=1, seed=0, password=PASSWORD):
+    """ Fills the database with a synthetic data set.
+
+    Every user gets the same password, hashed once. Each volunteer attends a few events and is
+    assigned to one of their tasks, and attendees get notifications from their events.
+
+    :param float scale: Multiplies the number of rows of every kind.
+    :param int seed: Seeds the random choices, so a scale and seed always produce the same data.
+    :param str password: The password of every generated user.
+    :return Dataset: The generated users, events and tasks, and the number of rows of each kind.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Group, User
+    from django.db import transaction
+    from django.utils import timezone
+    from main.geo import geocode_all
+    from main.matching import invalidate_volunteer_index
+    from main.search import rebuild_search_index
+    from main.stats import refresh_volunteer_stats
+    from main.models import Event, EventReview, Notification, Skill, Task, UserProfile
+    from main.roles import ADMIN, VOLUNTEER
+
+    rng = random.Random(seed)
+    n_events = max(1, int(EVENTS * scale))
+    n_volunteers = max(1, int(VOLUNTEERS * scale))
+    n_skills = max(1, int(SKILLS * scale))
+    hashed = make_password(password)
+    now = timezone.now()
+    today = date.today()
+
+    with transaction.atomic():
+        admin = User.objects.create(username="admin", first_name="Ada", last_name="Admin", password=hashed)
+        admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        volunteer_group = Group.objects.get_or_create(name=VOLUNTEER)[0]
+
+        skills = Skill.objects.bulk_create([
+            Skill(name=f"Skill {i}", description=f"Synthetic skill {i}") for i in range(n_skills)
+        ])
+        volunteers = User.objects.bulk_create([
+            User(username=f"volunteer{i}", first_name="Volunteer", last_name=str(i), password=hashed)
+            for i in range(n_volunteers)
+        ])
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.pk, group_id=volunteer_group.pk) for user in volunteers
+        ])
+        profiles = UserProfile.objects.bulk_create([
+            UserProfile(
+                user=user, name=user.get_full_name(), address1=f"{i} Main St", city=rng.choice(CITIES), state="TX",
+                zipcode=f"{77000 + i % 1000:05d}", start_availability=today - timedelta(days=30),
+                end_availability=today + timedelta(days=365),
+            )
+            for i, user in enumerate(volunteers)
+        ])
+        UserProfile.skills.through.objects.bulk_create([
+            UserProfile.skills.through(userprofile_id=profile.pk, skill_id=skill.pk)
+            for profile in profiles for skill in rng.sample(skills, min(len(skills), rng.randint(1, 5)))
+        ])
+
+        events = Event.objects.bulk_create([
+            Event(
+                name=f"Event {i}", description=f"Synthetic event {i}", location=rng.choice(CITIES), admin=admin,
+                urgency=rng.randint(1, 3), date=now + timedelta(days=rng.randint(-60, 120)),
+            )
+            for i in range(n_events)
+        ])
+        tasks = Task.objects.bulk_create([
+            Task(name=f"Task {i}.{j}", description="Synthetic task", event=event, location=event.location, capacity=rng.choice([-1, 10, 25]))
+            for i, event in enumerate(events) for j in range(TASKS_PER_EVENT)
+        ])
+        Task.skills.through.objects.bulk_create([
+            Task.skills.through(task_id=task.pk, skill_id=skill.pk)
+            for task in tasks for skill in rng.sample(skills, min(len(skills), rng.randint(1, 3)))
+        ])
+
+        attendance, assignments, notifications = [], [], []
+        assigned = Counter()
+        for i, event in enumerate(events):
+            event_tasks = tasks[i * TASKS_PER_EVENT:(i + 1) * TASKS_PER_EVENT]
+            for user in rng.sample(volunteers, min(len(volunteers), ATTENDEES_PER_EVENT)):
+                attendance.append(Event.attendees.through(event_id=event.pk, user_id=user.pk))
+                task = rng.choice(event_tasks)
+                if task.capacity < 0 or assigned[task.pk] < task.capacity:
+                    assignments.append(Task.attendees.through(task_id=task.pk, user_id=user.pk))
+                    assigned[task.pk] += 1
+                if len(notifications) < n_volunteers * NOTIFICATIONS_PER_VOLUNTEER:
+                    notifications.append(Notification(event=event, recipient=user, subject=f"{event.name} update", body="Synthetic notification", is_read=rng.random() < 0.5))
+        Event.attendees.through.objects.bulk_create(attendance, batch_size=1000)
+        Task.attendees.through.objects.bulk_create(assignments, batch_size=1000)
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        EventReview.objects.bulk_create([
+            EventReview(event=event, rating=rng.randint(1, 5), comments="Synthetic review", created_by=rng.choice(volunteers))
+            for event in events for _ in range(REVIEWS_PER_EVENT)
+        ])
+
+        Task.objects.all().recount()
+        Event.objects.all().recount()
+        rebuild_search_index()
+        geocode_all()
+        refresh_volunteer_stats()
+    invalidate_volunteer_index()
+
+    return Dataset(
+        admin_username=admin.username,
+        volunteer_usernames=[user.username for user in volunteers],
+        event_ids=[event.pk for event in events],
+        task_ids=[task.pk for task in tasks],
+        counts={
+            'events': len(events), 'tasks': len(tasks), 'skills': len(skills), 'volunteers': len(volunteers),
+            'attendances': len(attendance), 'assignments': len(assignments), 'notifications': len(notifications),
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindred_causes.settings')
+    django.setup()
+
+    dataset = generate(args.scale, args.seed)
+    for kind, count in dataset.counts.items():
+        print(f"{kind:<14}{count:>10}")
+
+
+if __name__ == '__main__':
+    main()
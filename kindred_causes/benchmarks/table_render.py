@@ -0,0 +1,119 @@
+"""
+Benchmark of rendering partials/table.html with 5,000 rows.
+
+Compares the previous per-cell get_attr filter (which re-parsed the dotted field spec and
+printed four lines per cell) with the compiled accessors used by the table_rows tag.
+
+Run from the project directory:
+    python -m benchmarks.table_render [--rows 5000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import os
+import re
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindred_causes.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.template import Context, Engine, Library
+from django.template.loader import get_template
+from django.utils import timezone
+from main.models import Event
+
+
+legacy = Library()
+
+
+@legacy.filter
+def get_attr(obj, attr):
+    """The get_attr filter as it was before the compiled accessors."""
+    print(obj, attr)
+
+    if '.' in attr and type(attr) == str:
+        attribute = get_attr(obj, attr.split('.')[0])
+        return get_attr(attribute, attr.split('.')[1])
+
+    attribute = getattr(obj, attr, '')
+
+    print(type(attribute))
+    print(attribute)
+
+    if type(attribute) is User:
+        print("User")
+        return attribute.get_full_name()
+
+    elif callable(attribute):
+        print("Callable")
+        return attribute()
+
+    return attribute
+
+
+def legacy_table_source():
+    """partials/table.html with its row loop switched back to the per-cell filter.
+
+    The fragment cache tags are dropped too; the legacy library has no such tags, and the
+    benchmark's plain lists of records are never cached anyway.
+    """
+    source = get_template('partials/table.html').template.source
+    source = re.sub(r"\{% (table_cache_key|cache_fragment|endcache_fragment)\b[^%]*%\}\n?", "", source)
+    source = source.replace("{% load custom_tags %}", "{% load legacy %}")
+    source = source.replace("{% table_rows records fields as rows %}", "")
+    source = source.replace("{% for item, cells in rows %}", "{% for item in records %}")
+    source = source.replace("{% for cell in cells %}", "{% for field in fields %}")
+    return source.replace("{{ cell }}", "{{ item|get_attr:field }}")
+
+
+def make_events(rows):
+    admin = User(username="admin", first_name="Ada", last_name="Admin")
+    now = timezone.now()
+    return [
+        Event(pk=i, name=f"Event {i}", description="Description", location="Houston", date=now, admin=admin)
+        for i in range(1, rows + 1)
+    ]
+
+
+def best_of(repeat, render):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    records = make_events(args.rows)
+    fields = ["name", "description", "location", "date", "admin", "urgency_display"]
+    context = {'records': records, 'fields': fields, 'headers': fields, 'table_title': "Events"}
+
+    legacy_template = Engine(libraries={'legacy': 'benchmarks.table_render'}).from_string(legacy_table_source())
+    compiled_template = get_template('partials/table.html')
+
+    def render_legacy():
+        # The legacy filter printed to stdout; write that to /dev/null so the terminal is not the bottleneck.
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            legacy_template.render(Context(context))
+
+    before = best_of(args.repeat, render_legacy)
+    after = best_of(args.repeat, lambda: compiled_template.render(context))
+
+    print(f"rows:   {args.rows}")
+    print(f"before: {before * 1000:.1f} ms (per-cell get_attr with debug printing)")
+    print(f"after:  {after * 1000:.1f} ms (compiled table_rows accessors)")
+    print(f"speedup: {before / after:.1f}x")
+
+
+register = legacy
+
+if __name__ == '__main__':
+    main()
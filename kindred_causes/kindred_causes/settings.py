@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'main.profiling.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,7 +58,7 @@ ROOT_URLCONF = 'kindred_causes.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'main.profiling.ProfiledDjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,13 +84,91 @@ WSGI_APPLICATION = 'kindred_causes.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# The database is chosen with environment variables: DB_ENGINE is 'sqlite' (the default) or 'postgresql'
+# (which needs psycopg installed). Connections are kept open for DB_CONN_MAX_AGE seconds and checked
+# before reuse, instead of reconnecting on every request.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+POSTGRESQL_DEFAULT_NAME = 'kindred_causes'
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', POSTGRESQL_DEFAULT_NAME),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+elif DB_ENGINE == 'sqlite':
+    # SQLite takes the write lock when a transaction begins (IMMEDIATE), so concurrent writers queue for up
+    # to `timeout` seconds instead of failing when a read lock cannot be upgraded. Tests use a file rather
+    # than the in-memory database, whose shared-cache table locks fail at once instead of waiting.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unsupported DB_ENGINE {DB_ENGINE!r}, expected 'sqlite' or 'postgresql'.")
+
+# PRAGMAs run on every new SQLite connection by main.signals: write-ahead logging lets readers and a writer
+# work concurrently, synchronous=NORMAL is durable under WAL without an fsync per commit, and reads go
+# through a memory map. Set DB_SQLITE_TUNING=0 to use SQLite's defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+} if os.environ.get('DB_SQLITE_TUNING', '1') == '1' else {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# CACHE_BACKEND picks the cache: 'locmem' (the default, per process), 'file' (shared by the processes of
+# one host) or 'dummy'. Cached fragments are keyed by version stamps kept in the database
+# (main.cache_versions), so a per-process cache never serves rows another process has changed.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'kindred-causes'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"Unsupported CACHE_BACKEND {CACHE_BACKEND!r}, expected one of {', '.join(CACHE_BACKENDS)}.")
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
     }
 }
 
+# Seconds the navbar profile and unread notification count stay cached per user.
+NAVBAR_CACHE_TIMEOUT = 300
+
+# Seconds a rendered table stays cached. Fragments are invalidated by model version stamps as soon as
+# their rows change; the timeout only bounds staleness of related rows that are not versioned (e.g. users).
+FRAGMENT_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -125,6 +206,64 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Background jobs
+# Report generation and large notification fan-outs run on a local worker pool, no broker needed. Work
+# queued in the pool is lost when the process stops; pending report jobs, and running ones past
+# REPORT_JOB_TIMEOUT, are resumed with run_report_jobs.
+
+BACKGROUND_JOBS_ENABLED = True
+BACKGROUND_WORKER_THREADS = 2
+
+# PDF reports are cached on disk per Event content version.
+REPORT_CACHE_DIR = BASE_DIR / 'report_cache'
+
+# Seconds a report job may stay running before its worker is presumed dead and the job is queued again.
+REPORT_JOB_TIMEOUT = 600
+
+# Rows the streamed CSV report reads from the database at once.
+REPORT_CHUNK_SIZE = 500
+
+# Rows the bulk importer validates and writes at once.
+IMPORT_BATCH_SIZE = 1000
+
+# Notifications are inserted in batches; audiences above the threshold are sent in the background.
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_BACKGROUND_THRESHOLD = 2000
+
+# Notifications per inbox page.
+INBOX_PAGE_SIZE = 50
+
+# Events per event browser page, and the distances it can search within, in miles.
+EVENT_BROWSER_PAGE_SIZE = 50
+EVENT_BROWSER_RADIUS_CHOICES = (5, 10, 25, 50, 100)
+
+# Volunteers within this many miles of a Task count as local to it when matching.
+MATCHING_RADIUS_MILES = 25
+
+# Search: the results shown, how many of the most recent matches are ranked to find them, and the search
+# entries written at once.
+SEARCH_RESULTS_LIMIT = 50
+TYPEAHEAD_LIMIT = 8
+SEARCH_CANDIDATES = 200
+SEARCH_INDEX_BATCH_SIZE = 1000
+
+# Volunteers per volunteer search page.
+VOLUNTEER_SEARCH_PAGE_SIZE = 50
+
+# Volunteer stats: the most recent Events kept per volunteer for history pages and reports, and the volunteers
+# refreshed at once.
+VOLUNTEER_STATS_RECENT_EVENTS = 10
+VOLUNTEER_STATS_BATCH_SIZE = 500
+
+# Request profiling
+# The share of requests (0 to 1) whose SQL and template timings are measured, sent as a Server-Timing
+# header and kept in the admin request stats. Requests that are not sampled are not instrumented at all.
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', 0.1))
+
+# Profiled requests kept per route for the request stats.
+REQUEST_PROFILING_WINDOW = 500
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,7 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 # Register your models here.
-from .models import Skill, Event, Task, AttendeeReview, EventReview, UserProfile, AvatarOption, Notification
+from .notifications import send_event_notification
+from .models import Skill, Event, Task, AttendeeReview, EventReview, UserProfile, AvatarOption, Notification, ReportJob, WaitlistEntry
 
 
 admin.site.register(Skill)
@@ -11,4 +12,30 @@ admin.site.register(Task)
 admin.site.register(AttendeeReview)
 admin.site.register(EventReview)
 admin.site.register(UserProfile)
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(ReportJob)
+admin.site.register(WaitlistEntry)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """Leaving the recipient blank sends the notification to every attendee of its event.
+    """
+    list_display = ['subject', 'event', 'recipient', 'is_read', 'created_at']
+    list_filter = ['is_read']
+
+    def save_model(self, request, obj, form, change):
+        if change or obj.recipient_id is not None or obj.event_id is None:
+            return super().save_model(request, obj, form, change)
+
+        count, queued = send_event_notification(obj.event, obj.subject, obj.body, created_by=request.user)
+        state = "is being sent in the background" if queued else "was sent"
+        self.message_user(request, f"The notification {state} to {count} attendees of {obj.event.name}.", messages.SUCCESS)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        if obj.pk is None:
+            return self.response_post_save_add(request, obj)
+        return super().response_add(request, obj, post_url_continue)
+
+    def log_addition(self, request, obj, message):
+        if obj.pk is not None:
+            return super().log_addition(request, obj, message)
\ No newline at end of file
@@ -0,0 +1,358 @@
+import hashlib
+import heapq
+from dataclasses import dataclass, field
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from .models import Event, Task, UserProfile, WaitlistEntry
+from .stats import refresh_volunteer_stats
+
+
+# Outcomes of assign_volunteer:
+ASSIGNED = "assigned"
+ALREADY_ASSIGNED = "already_assigned"
+WAITLISTED = "waitlisted"
+FULL = "full"
+
+
+class StalePlanError(Exception):
+    """ Raised by apply_assignment when an Event's Tasks or unassigned attendees changed since its plan was solved.
+    """
+
+
+@dataclass
+class Assignment:
+    """ A volunteer placed on a Task by the solver.
+    """
+    task_id: int
+    task_name: str
+    user_id: int
+    name: str
+    matched_skills: list
+
+
+@dataclass
+class AssignmentPlan:
+    """ The solver's proposed staffing of an Event.
+    """
+    event: Event
+    assignments: list = field(default_factory=list)
+    unassigned: list = field(default_factory=list)
+    # A hash of the Tasks' capacities and counters and of the unassigned attendees the plan was solved from.
+    state: str = None
+
+    @property
+    def skill_coverage(self):
+        """ The number of required skills covered across all assignments.
+        """
+        return sum(len(assignment.matched_skills) for assignment in self.assignments)
+
+
+class _FlowNetwork:
+    """ A residual graph solved with successive shortest paths (Dijkstra with potentials).
+    """
+
+    def __init__(self, size):
+        self.graph = [[] for _ in range(size)]
+
+    def add_edge(self, source, target, capacity, cost):
+        """ Adds an edge and its residual twin, returning the forward edge.
+        """
+        forward = [target, capacity, cost, len(self.graph[target])]
+        self.graph[source].append(forward)
+        self.graph[target].append([source, 0, -cost, len(self.graph[source]) - 1])
+        return forward
+
+    def min_cost_max_flow(self, source, sink):
+        """ Pushes as much flow as possible from source to sink at the lowest total cost.
+
+        Every cost must be non-negative, so the potentials start at zero.
+        """
+        size = len(self.graph)
+        potential = [0] * size
+        flow = cost = 0
+
+        while True:
+            distance = [None] * size
+            distance[source] = 0
+            previous = [None] * size
+            queue = [(0, source)]
+            while queue:
+                dist, node = heapq.heappop(queue)
+                if dist > distance[node]:
+                    continue
+                for i, (target, capacity, edge_cost, _) in enumerate(self.graph[node]):
+                    if capacity <= 0:
+                        continue
+                    candidate = dist + edge_cost + potential[node] - potential[target]
+                    if distance[target] is None or candidate < distance[target]:
+                        distance[target] = candidate
+                        previous[target] = (node, i)
+                        heapq.heappush(queue, (candidate, target))
+
+            if distance[sink] is None:
+                return flow, cost
+
+            for node in range(size):
+                if distance[node] is not None:
+                    potential[node] += distance[node]
+
+            pushed = None
+            node = sink
+            while node != source:
+                parent, i = previous[node]
+                capacity = self.graph[parent][i][1]
+                pushed = capacity if pushed is None else min(pushed, capacity)
+                node = parent
+
+            node = sink
+            while node != source:
+                parent, i = previous[node]
+                edge = self.graph[parent][i]
+                edge[1] -= pushed
+                self.graph[node][edge[3]][1] += pushed
+                node = parent
+
+            flow += pushed
+            cost += pushed * (potential[sink] - potential[source])
+
+
+def _unassigned_attendees(event):
+    return event.attendees.exclude(tasks__event=event).order_by('pk')
+
+
+def _staffing_state(task_rows, volunteers):
+    # Everything the solver's choices depend on besides skills: which Tasks have room and who needs one.
+    payload = repr(([(pk, capacity, count) for pk, _, capacity, count in task_rows], [row[0] for row in volunteers]))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def solve_event_assignment(event):
+    """ Staffs an Event's Tasks with its attendees who have no Task yet.
+
+    Solved as a min-cost max-flow: each attendee goes to at most one Task, no Task goes over its
+    capacity, as many attendees as possible are placed and, among those placements, the number of
+    required skills covered is maximized. Attendees with the same set of relevant skills are
+    interchangeable, so they are merged into one node and the network stays small however many
+    attendees the Event has. Nothing is written to the database.
+
+    :param Event event: The Event to staff.
+    :return AssignmentPlan: The proposed assignments and the attendees left without a Task.
+    """
+    task_rows = list(event.tasks.order_by('pk').values_list('pk', 'name', 'capacity', 'attendee_count'))
+    volunteers = list(_unassigned_attendees(event).values_list('pk', 'profile__name', 'username'))
+    plan = AssignmentPlan(event=event, state=_staffing_state(task_rows, volunteers))
+
+    tasks = []
+    for pk, name, capacity, attendee_count in task_rows:
+        remaining = capacity - attendee_count if capacity >= 0 else None
+        if remaining is None or remaining > 0:
+            tasks.append((pk, name, remaining))
+
+    if not volunteers:
+        return plan
+    names = {pk: profile_name or username for pk, profile_name, username in volunteers}
+    if not tasks:
+        plan.unassigned = [(pk, names[pk]) for pk in names]
+        return plan
+
+    # Number the skills the Tasks require, so each skill set is an int bitset.
+    skill_bits, skill_names, task_masks = {}, {}, {}
+    task_skills = Task.skills.through.objects.filter(task_id__in=[pk for pk, _, _ in tasks])
+    for task_id, skill_id, skill_name in task_skills.values_list('task_id', 'skill_id', 'skill__name'):
+        if skill_id not in skill_bits:
+            skill_bits[skill_id] = 1 << len(skill_bits)
+            skill_names[skill_id] = skill_name
+        task_masks[task_id] = task_masks.get(task_id, 0) | skill_bits[skill_id]
+
+    volunteer_masks = dict.fromkeys(names, 0)
+    volunteer_skills = UserProfile.skills.through.objects.filter(
+        userprofile__user_id__in=list(names), skill_id__in=list(skill_bits),
+    )
+    for user_id, skill_id in volunteer_skills.values_list('userprofile__user_id', 'skill_id'):
+        volunteer_masks[user_id] |= skill_bits[skill_id]
+
+    classes = {}
+    for user_id, mask in volunteer_masks.items():
+        classes.setdefault(mask, []).append(user_id)
+    masks = list(classes)
+
+    # Nodes: source, one per skill set, one per Task, sink. An edge costs more the fewer skills it covers.
+    source, sink = 0, len(masks) + len(tasks) + 1
+    network = _FlowNetwork(sink + 1)
+    worst = max((mask.bit_count() for mask in task_masks.values()), default=0) + 1
+    edges = []
+    for c, mask in enumerate(masks, start=1):
+        network.add_edge(source, c, len(classes[mask]), 0)
+        for t, (task_id, _, _) in enumerate(tasks, start=len(masks) + 1):
+            matched = (mask & task_masks.get(task_id, 0)).bit_count()
+            edges.append((mask, task_id, network.add_edge(c, t, len(names), worst - matched)))
+    for t, (_, _, remaining) in enumerate(tasks, start=len(masks) + 1):
+        network.add_edge(t, sink, len(names) if remaining is None else remaining, 0)
+
+    network.min_cost_max_flow(source, sink)
+
+    task_names = {task_id: name for task_id, name, _ in tasks}
+    for mask, task_id, edge in edges:
+        placed = len(names) - edge[1]
+        if not placed:
+            continue
+        matched = sorted(
+            skill_names[skill_id] for skill_id, bit in skill_bits.items()
+            if bit & mask & task_masks.get(task_id, 0)
+        )
+        for user_id in classes[mask][:placed]:
+            plan.assignments.append(Assignment(task_id, task_names[task_id], user_id, names[user_id], matched))
+        del classes[mask][:placed]
+
+    plan.assignments.sort(key=lambda assignment: (assignment.task_id, assignment.user_id))
+    plan.unassigned = sorted((user_id, names[user_id]) for members in classes.values() for user_id in members)
+    return plan
+
+
+def apply_assignment(plan):
+    """ Writes a plan's assignments with one bulk insert and refreshes the affected counters and volunteer stats.
+
+    The plan was solved without locks, so the Event's Tasks are locked and checked again first. A plan with
+    a state, such as one previewed and posted back by an admin, is rejected if the Tasks' capacities or
+    counters or the unassigned attendees changed since it was solved. Otherwise, assignments that no longer
+    fit a Task's remaining capacity, or of volunteers who are not attendees without a Task of the Event,
+    are skipped. Concurrent assign_volunteer() calls wait on the same Task rows.
+
+    :param AssignmentPlan plan: The plan returned by solve_event_assignment, or posted back from its preview.
+    :return int: The number of assignments written.
+    :raises StalePlanError: When the plan has a state and the Event changed since it was solved.
+    """
+    Through = Task.attendees.through
+    with transaction.atomic():
+        task_rows = list(
+            Task.objects.select_for_update().filter(event=plan.event).order_by('pk')
+            .values_list('pk', 'name', 'capacity', 'attendee_count')
+        )
+        eligible = list(_unassigned_attendees(plan.event).values_list('pk', flat=True))
+        if plan.state is not None and plan.state != _staffing_state(task_rows, [(pk,) for pk in eligible]):
+            raise StalePlanError(f"The staffing of Event {plan.event.pk} changed since the plan was solved.")
+
+        remaining = {pk: None if capacity < 0 else capacity - attendee_count for pk, _, capacity, attendee_count in task_rows}
+        eligible = set(eligible)
+        rows = []
+        for assignment in plan.assignments:
+            if assignment.task_id not in remaining or assignment.user_id not in eligible:
+                continue
+            if remaining[assignment.task_id] is not None:
+                if remaining[assignment.task_id] <= 0:
+                    continue
+                remaining[assignment.task_id] -= 1
+            eligible.discard(assignment.user_id)
+            rows.append(Through(task_id=assignment.task_id, user_id=assignment.user_id))
+
+        Through.objects.bulk_create(rows)
+        Task.objects.filter(pk__in={row.task_id for row in rows}).recount()
+        Event.objects.filter(pk=plan.event.pk).recount()
+        refresh_volunteer_stats(row.user_id for row in rows)
+    return len(rows)
+
+
+def assign_volunteer(task, user, waitlist=True):
+    """ Assigns a volunteer to a Task without ever going over its capacity.
+
+    A place is claimed with a conditional UPDATE of the Task's attendee counter, which only succeeds
+    while the Task has room. The database serializes concurrent claims on the Task's row, so two
+    sign-ups for the last place cannot both win. Only then is the assignment itself written.
+
+    :param Task task: The Task to assign.
+    :param User user: The volunteer.
+    :param bool waitlist: Whether to put the volunteer on the Task's waitlist when it is full.
+    :return str: ASSIGNED, ALREADY_ASSIGNED, WAITLISTED or FULL.
+    """
+    with transaction.atomic():
+        has_room = Q(capacity__lt=0) | Q(attendee_count__lt=F('capacity'))
+        claimed = Task.objects.filter(has_room, pk=task.pk).update(attendee_count=F('attendee_count') + 1)
+
+        if task.attendees.filter(pk=user.pk).exists():
+            transaction.set_rollback(True)
+            return ALREADY_ASSIGNED
+
+        if not claimed:
+            if not waitlist:
+                return FULL
+            WaitlistEntry.objects.get_or_create(task=task, user=user)
+            return WAITLISTED
+
+        # The m2m signal recounts the Task and its Event from the assignments, including this one.
+        task.attendees.add(user)
+        WaitlistEntry.objects.filter(task=task, user=user).delete()
+    return ASSIGNED
+
+
+def unassign_volunteer(task, user):
+    """ Removes a volunteer from a Task and gives the freed place to the first volunteer on its waitlist.
+
+    :param Task task: The Task to unassign.
+    :param User user: The volunteer.
+    :return User: The promoted volunteer, if any.
+    """
+    with transaction.atomic():
+        task.attendees.remove(user)
+        WaitlistEntry.objects.filter(task=task, user=user).delete()
+        return promote_waitlist(task)
+
+
+def promote_waitlist(task):
+    """ Assigns waitlisted volunteers to a Task, first come first served, while it has room.
+
+    :param Task task: The Task whose waitlist is promoted.
+    :return User: The first promoted volunteer, if any.
+    """
+    promoted = None
+    for entry in task.waitlist.select_related('user').order_by('created_at', 'pk'):
+        result = assign_volunteer(task, entry.user, waitlist=False)
+        if result == FULL:
+            break
+        if result == ALREADY_ASSIGNED:
+            entry.delete()
+        elif promoted is None:
+            promoted = entry.user
+    return promoted
+
+
+def join_event(event, user):
+    """ Adds a user to an Event's attendees, tolerating a concurrent join by the same user.
+
+    :param Event event: The Event to join.
+    :param User user: The user joining.
+    :return bool: Whether the user was added, False when they already attended.
+    """
+    try:
+        with transaction.atomic():
+            if event.attendees.filter(pk=user.pk).exists():
+                return False
+            event.attendees.add(user)
+    except IntegrityError:
+        return False
+    return True
+
+
+def remove_event_attendees(event, user_ids):
+    """ Removes users from an Event along with their Task assignments and waitlist places in it.
+
+    Each relation is cleared with one DELETE scoped to the Event, all in one transaction, so
+    assignments in other Events are untouched. Freed Task places go to the Tasks' waitlists.
+
+    :param Event event: The Event to remove the users from.
+    :param user_ids: The primary keys of the users to remove.
+    :return int: The number of users removed from the Event.
+    """
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        assignments = Task.attendees.through.objects.filter(task__event=event, user_id__in=user_ids)
+        task_ids = set(assignments.values_list('task_id', flat=True))
+        assignments.delete()
+        WaitlistEntry.objects.filter(task__event=event, user_id__in=user_ids).delete()
+        removed, _ = Event.attendees.through.objects.filter(event=event, user_id__in=user_ids).delete()
+
+        Task.objects.filter(pk__in=task_ids).recount()
+        Event.objects.filter(pk=event.pk).recount()
+        refresh_volunteer_stats(user_ids)
+        for task in Task.objects.filter(pk__in=task_ids, waitlist__isnull=False).distinct():
+            promote_waitlist(task)
+    return removed
@@ -0,0 +1,88 @@
+import hashlib
+import time
+from django.apps import apps
+from django.db.models import QuerySet
+from django.core.exceptions import EmptyResultSet
+
+
+# Models whose rows are rendered from cached fragments. Any change to one of them bumps its version,
+# which changes every fragment key built from it.
+VERSIONED_MODELS = ('main.skill', 'main.event', 'main.task', 'main.eventreview')
+
+
+def _stamps():
+    # Looked up lazily: main.models imports this module to bump versions.
+    return apps.get_model('main', 'VersionStamp').objects
+
+
+def read_versions(labels):
+    """ The current version stamps of the given labels, in one query.
+
+    Stamps are read from the database rather than the cache, so a bump made by any process is seen by
+    every other one. A label that was never bumped has the stamp None.
+
+    :param labels: The labels, such as model labels.
+    :return list: The stamps, in the order of the labels.
+    """
+    versions = dict(_stamps().filter(label__in=labels).values_list('label', 'version'))
+    return [versions.get(label) for label in labels]
+
+
+def stamp_version(label):
+    """ Gives a label a new version stamp: the current time in nanoseconds.
+
+    Inside a transaction the new stamp commits or rolls back with the writes it describes. A stamp is
+    never an increment, so one rolled back cannot be handed out again for different data.
+    """
+    now = time.time_ns()
+    if not _stamps().filter(label=label).update(version=now):
+        _stamps().update_or_create(label=label, defaults={'version': now})
+
+
+def model_versions():
+    """ The current version stamp of every versioned model, in one query.
+    """
+    return read_versions(VERSIONED_MODELS)
+
+
+def bump_version(model):
+    """ Invalidates every fragment keyed on a model.
+
+    :param model: The model class, or its label such as 'main.event'.
+    """
+    label = model if isinstance(model, str) else model._meta.label_lower
+    if label not in VERSIONED_MODELS:
+        return
+    stamp_version(label)
+
+
+def queryset_fragment_key(prefix, queryset, *parts):
+    """ A cache key for a fragment rendered from a queryset of a versioned model.
+
+    The key covers the queryset's SQL and parameters, the extra parts and the version of every versioned
+    model, so it changes whenever the rows it renders could have.
+
+    :param str prefix: The kind of fragment, such as 'table'.
+    :param queryset: The rows the fragment renders.
+    :param parts: Anything else the fragment's output depends on.
+    :return str: The key, or None when the fragment cannot be cached.
+    """
+    if not isinstance(queryset, QuerySet) or queryset.model._meta.label_lower not in VERSIONED_MODELS:
+        return None
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+
+    return versioned_key(f"fragment:{prefix}", sql, params, *parts)
+
+
+def versioned_key(prefix, *parts):
+    """ A cache key that changes whenever any versioned model changes.
+
+    :param str prefix: A readable prefix for the key.
+    :param parts: Anything else the cached value depends on.
+    :return str: The key.
+    """
+    payload = repr((parts, model_versions())).encode()
+    return f"{prefix}:{hashlib.sha1(payload).hexdigest()}"
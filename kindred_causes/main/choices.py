@@ -15,4 +15,20 @@ class EventUrgency(IntegerChoices):
     CRITICAL = 4
     HIGH = 3
     MEDIUM = 2
-    LOW = 1
\ No newline at end of file
+    LOW = 1
+
+class ReportJobStatus(TextChoices):
+    """ Possible values for a ReportJob status.
+    """
+    PENDING = "Pending"
+    RUNNING = "Running"
+    DONE = "Done"
+    FAILED = "Failed"
+
+
+class SearchKind(TextChoices):
+    """ The kinds of records in the search index.
+    """
+    EVENT = "event", "Event"
+    TASK = "task", "Task"
+    SKILL = "skill", "Skill"
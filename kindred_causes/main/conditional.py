@@ -0,0 +1,134 @@
+import functools
+import hashlib
+from django.contrib import messages
+from django.db.models import Count, DateTimeField, IntegerField, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .context_processors import unread_notifications_count, user_profile
+from .matching import index_version
+from .models import Event, EventReview, Task, VolunteerStats, WaitlistEntry
+from .roles import user_roles
+
+
+def _related(model, field, aggregate, output_field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(value=aggregate).values('value')
+    return Subquery(rows, output_field=output_field)
+
+
+def event_state(pk):
+    """ What an Event's pages are rendered from, loaded with one query.
+
+    Attendee and assignment changes reach the Event's updated_at through recount(), and deleted Tasks
+    and reviews through the counts, so the state changes whenever the rendered content can.
+
+    :param int pk: The primary key of the Event.
+    :return tuple: The latest modification time and the parts of the ETag, or None if there is no such Event.
+    """
+    row = Event.objects.filter(pk=pk).values_list(*_event_columns()).first()
+    if row is None:
+        return None
+    return max(value for value in row[:3] if value is not None), row
+
+
+def _event_columns():
+    return (
+        'updated_at',
+        _related(Task, 'event', Max('updated_at'), DateTimeField()),
+        _related(EventReview, 'event', Max('updated_at'), DateTimeField()),
+        _related(Task, 'event', Count('pk'), IntegerField()),
+        _related(EventReview, 'event', Count('pk'), IntegerField()),
+    )
+
+
+def report_state(pk):
+    """ What an Event's CSV report is rendered from, loaded with one query.
+
+    Besides the Event's own state, the report lists the skills and previous events of the assigned
+    volunteers, which change with other Events. Those come from VolunteerStats, so the latest update
+    of the assigned volunteers' stats is part of the state.
+
+    :param int pk: The primary key of the Event.
+    :return tuple: The latest modification time and the parts of the ETag, or None if there is no such Event.
+    """
+    row = Event.objects.filter(pk=pk).values_list(
+        *_event_columns(),
+        _related(VolunteerStats, 'user__tasks__event', Max('updated_at'), DateTimeField()),
+    ).first()
+    if row is None:
+        return None
+    return max(value for value in row[:3] + row[5:] if value is not None), row
+
+
+def task_state(pk):
+    """ What a Task's page is rendered from, loaded with one query.
+
+    The page also lists volunteers' skills, so the ETag includes the volunteer index version; the
+    modification time cannot see profile changes and is therefore not used on its own.
+
+    :param int pk: The primary key of the Task.
+    :return tuple: The latest modification time and the parts of the ETag, or None if there is no such Task.
+    """
+    row = Task.objects.filter(pk=pk).values_list(
+        'updated_at',
+        'event__updated_at',
+        _related(WaitlistEntry, 'task', Max('updated_at'), DateTimeField()),
+        _related(WaitlistEntry, 'task', Count('pk'), IntegerField()),
+    ).first()
+    if row is None:
+        return None
+    return max(value for value in row[:3] if value is not None), row + (index_version(),)
+
+
+def _viewer(request):
+    """ The parts of a page that depend on who is looking at it: the user, their roles and the navbar.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return (None,)
+    profile = user_profile(request)['profile']
+    return (
+        user.pk,
+        tuple(sorted(user_roles(user))),
+        str(unread_notifications_count(request)['unread_notifications']),
+        getattr(profile, 'updated_at', None),
+    )
+
+
+def conditional_page(state_func, per_user=True, use_last_modified=True):
+    """ Answers conditional GETs with 304 Not Modified before the view runs.
+
+    The ETag is a hash of the state returned by state_func and, for pages rendered per user, of the
+    viewer. Requests with pending messages are always rendered, since the messages are part of the page.
+
+    :param state_func: Called with the view's keyword arguments, returns (last_modified, parts) or None.
+    :param bool per_user: Whether the page differs between users.
+    :param bool use_last_modified: Whether the modification time alone can be trusted for If-Modified-Since.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            state = state_func(**kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+
+            last_modified, parts = state
+            if per_user:
+                parts = (parts, _viewer(request))
+            etag = quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+            last_modified = int(last_modified.timestamp()) if use_last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                if last_modified is not None:
+                    response.headers.setdefault('Last-Modified', http_date(last_modified))
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+    return decorator
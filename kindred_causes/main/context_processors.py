@@ -1,16 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
 from .models import UserProfile
 
+_MISSING = object()
+
+
+def profile_cache_key(user_id):
+    return f"navbar:profile:{user_id}"
+
+
+def unread_notifications_cache_key(user_id):
+    return f"navbar:unread:{user_id}"
+
+
+def invalidate_profile(*user_ids):
+    cache.delete_many([profile_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_unread_notifications(*user_ids):
+    cache.delete_many([unread_notifications_cache_key(user_id) for user_id in user_ids])
+
+
+def _cached(key, compute):
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, settings.NAVBAR_CACHE_TIMEOUT)
+    return value
+
+
+def _load_profile(user_id):
+    return UserProfile.objects.select_related('avatar').filter(user_id=user_id).first()
+
+
+def cached_profile(user_id):
+    """The user's profile, or None, cached per user.
+    """
+    return _cached(profile_cache_key(user_id), lambda: _load_profile(user_id))
+
+
 def user_profile(request):
+    """Adds the user's profile, cached per user and only loaded if a template uses it.
+    """
     if request.user.is_authenticated:
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-            return {'profile': profile}
-        except UserProfile.DoesNotExist:
-            return {'profile': None}
+        user_id = request.user.pk
+        return {'profile': SimpleLazyObject(lambda: cached_profile(user_id))}
     return {'profile': None}
 
 def unread_notifications_count(request):
+    """Adds the user's unread notification count, cached per user and only counted if a template uses it.
+    """
     if request.user.is_authenticated:
-        count = request.user.notifications.filter(is_read=False).count()
+        user = request.user
+        count = SimpleLazyObject(lambda: _cached(
+            unread_notifications_cache_key(user.pk),
+            lambda: user.notifications.filter(is_read=False).count(),
+        ))
         return {'unread_notifications': count}
-    return {'unread_notifications': 0}
\ No newline at end of file
+    return {'unread_notifications': 0}
@@ -1,8 +1,13 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import F
 from kindred_causes.widgets import TailwindDateInput, TailwindEmailInput, TailwindInput, TailwindSelect, TailwindTextarea, TailwindRating
-from .models import EventReview, Event, Skill, Task, Notification
-from .choices import EventUrgency
+from .models import EventReview, Event, Skill, Task, Notification, UserProfile
+from .choices import EventUrgency, SearchKind
+from .geo import geocode_text, nearby, with_distance
+from .search import matching_ids
+from .utils import start_of_day
 
 
 class EventReviewForm(forms.ModelForm):
@@ -246,3 +251,280 @@ class NotificationManagementForm(forms.ModelForm):
         }
     )
 )
+
+
+class EventBrowserFilterForm(forms.Form):
+    """ Filters and sort order for the event browser.
+
+    Distances are measured from the place given as near, or else from the origin, usually the user's address.
+
+    :param origin: The (latitude, longitude) to measure distances from when no place is given, or None.
+    """
+    SORT_FIELDS = {
+        'date': ('date', 'pk'),
+        '-date': ('-date', '-pk'),
+        '-urgency': ('-urgency', 'date', 'pk'),
+        'name': ('name', 'pk'),
+    }
+
+    q = forms.CharField(
+        required=False,
+        max_length=200,
+        widget=TailwindInput(attrs={"placeholder": "Search events", "type": "search", "verbose_name": "Search"})
+    )
+
+    date_from = forms.DateField(
+        required=False,
+        widget=TailwindDateInput(attrs={"verbose_name": "From"})
+    )
+
+    date_to = forms.DateField(
+        required=False,
+        widget=TailwindDateInput(attrs={"verbose_name": "To"})
+    )
+
+    urgency = forms.TypedChoiceField(
+        choices=[('', 'Any')] + EventUrgency.choices,
+        coerce=int,
+        empty_value=None,
+        required=False,
+        widget=TailwindSelect(attrs={"placeholder": "Any urgency"})
+    )
+
+    location = forms.CharField(
+        required=False,
+        widget=TailwindInput(attrs={"placeholder": "Any location"})
+    )
+
+    near = forms.CharField(
+        required=False,
+        max_length=100,
+        widget=TailwindInput(attrs={"placeholder": "My address", "verbose_name": "Near ZIP Code or City"})
+    )
+
+    radius = forms.TypedChoiceField(
+        choices=[('', 'Any distance')] + [(miles, f'Within {miles} miles') for miles in settings.EVENT_BROWSER_RADIUS_CHOICES],
+        coerce=int,
+        empty_value=None,
+        required=False,
+        widget=TailwindSelect(attrs={"placeholder": "Any distance", "verbose_name": "Distance"})
+    )
+
+    skill = forms.ModelChoiceField(
+        queryset=Skill.objects.order_by('name'),
+        required=False,
+        empty_label="Any",
+        widget=TailwindSelect(attrs={"placeholder": "Any skill", "verbose_name": "Required Skill"})
+    )
+
+    sort = forms.ChoiceField(
+        choices=[('date', 'Date (soonest first)'), ('-date', 'Date (latest first)'), ('-urgency', 'Urgency'), ('name', 'Name'), ('distance', 'Distance (nearest first)')],
+        required=False,
+        widget=TailwindSelect(attrs={"placeholder": "Sort by"})
+    )
+
+    def __init__(self, *args, origin=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.origin = origin
+        self.point = None
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('near'):
+            self.point = geocode_text(cleaned_data['near'])
+            if self.point is None:
+                self.add_error('near', "No ZIP code or city of that name is known.")
+        elif cleaned_data.get('radius') or cleaned_data.get('sort') == 'distance':
+            self.point = self.origin
+            if self.point is None:
+                raise forms.ValidationError("Enter a ZIP code or city to search by distance, or add your address to your profile.")
+        return cleaned_data
+
+    def filter(self, queryset):
+        """ Applies the cleaned filters and sort order to an Event queryset.
+        """
+        data = self.cleaned_data
+        if data.get('q'):
+            matches = matching_ids(SearchKind.EVENT, data['q'])
+            queryset = queryset.filter(pk__in=matches) if matches is not None else queryset
+        if data.get('date_from'):
+            queryset = queryset.filter(date__gte=start_of_day(data['date_from']))
+        if data.get('date_to'):
+            queryset = queryset.filter(date__lt=start_of_day(data['date_to'], days=1))
+        if data.get('urgency') is not None:
+            queryset = queryset.filter(urgency=data['urgency'])
+        if data.get('location'):
+            queryset = queryset.filter(location__icontains=data['location'])
+        if data.get('skill'):
+            queryset = queryset.filter(pk__in=Task.objects.filter(skills=data['skill']).values('event'))
+        if self.point is None:
+            return queryset.order_by(*self.SORT_FIELDS[data.get('sort') or 'date'])
+
+        # Events are annotated with their distance, found through the grid cell index when within a radius.
+        if data.get('radius'):
+            queryset = nearby(queryset, *self.point, data['radius'])
+        else:
+            queryset = with_distance(queryset, *self.point)
+        if data.get('sort') == 'distance':
+            return queryset.order_by(F('distance_squared').asc(nulls_last=True), 'date', 'pk')
+        return queryset.order_by(*self.SORT_FIELDS[data.get('sort') or 'date'])
+
+
+class VolunteerSearchForm(forms.Form):
+    """ Skill and availability filters for the volunteer search.
+    """
+    skills = forms.ModelMultipleChoiceField(
+        queryset=Skill.objects.order_by('name'),
+        widget=forms.CheckboxSelectMultiple(attrs={
+            'class': 'checkbox mr-2',
+        }),
+        required=False,
+    )
+
+    match = forms.ChoiceField(
+        choices=[('all', 'All selected skills'), ('any', 'Any selected skill')],
+        required=False,
+        widget=TailwindSelect(attrs={"placeholder": "Match"})
+    )
+
+    available_from = forms.DateField(
+        required=False,
+        widget=TailwindDateInput(attrs={"verbose_name": "Available From"})
+    )
+
+    available_until = forms.DateField(
+        required=False,
+        widget=TailwindDateInput(attrs={"verbose_name": "Available Until"})
+    )
+
+    def search(self, index):
+        """ Runs the cleaned filters against a VolunteerIndex, returning volunteer positions.
+        """
+        data = self.cleaned_data
+        skill_ids = [skill.pk for skill in data.get('skills') or ()]
+        any_skills = data.get('match') == 'any'
+        return index.search(
+            all_skills=() if any_skills else skill_ids,
+            any_skills=skill_ids if any_skills else (),
+            available_from=data.get('available_from'),
+            available_until=data.get('available_until'),
+        )
+
+
+class EventAttendeeRemovalForm(forms.Form):
+    """ The attendees to remove from an Event.
+    """
+    attendees = forms.ModelMultipleChoiceField(
+        queryset=User.objects.none(),
+        widget=forms.CheckboxSelectMultiple(attrs={
+            'class': 'checkbox mr-2',
+        }),
+    )
+
+    def __init__(self, *args, event=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['attendees'].queryset = event.attendees.order_by('first_name', 'last_name', 'username')
+        self.fields['attendees'].label_from_instance = lambda user: user.get_full_name() or user.username
+
+
+class LookupChoiceField(forms.Field):
+    """ A choice of model instances by natural key, resolved from an in-memory map instead of a query per value.
+
+    Several values are accepted as a list or a string separated by ';'.
+    """
+    def __init__(self, *args, lookup=None, multiple=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookup = lookup if lookup is not None else {}
+        self.multiple = multiple
+
+    def to_python(self, value):
+        if not self.multiple:
+            value = str(value).strip() if value not in self.empty_values else None
+            if value is None:
+                return None
+            if value not in self.lookup:
+                raise forms.ValidationError(f"Unknown value: {value}.", code='invalid_choice')
+            return self.lookup[value]
+
+        if value in self.empty_values:
+            return []
+        keys = value.split(';') if isinstance(value, str) else value
+        keys = [str(key).strip() for key in keys if str(key).strip()]
+        unknown = [key for key in keys if key not in self.lookup]
+        if unknown:
+            raise forms.ValidationError(f"Unknown values: {', '.join(unknown)}.", code='invalid_choice')
+        return [self.lookup[key] for key in dict.fromkeys(keys)]
+
+    def validate(self, value):
+        if self.required and not value:
+            raise forms.ValidationError(self.error_messages['required'], code='required')
+
+
+class EventImportForm(EventForm):
+    """ EventForm's rules for an imported row, with the admin given by username.
+    """
+    admin = LookupChoiceField()
+
+    def __init__(self, *args, admins=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['admin'].lookup = admins
+
+    def _get_validation_exclusions(self):
+        # The admin was found in the lookup map, so the model need not query for it again.
+        return super()._get_validation_exclusions() | {'admin'}
+
+
+class TaskImportForm(TaskForm):
+    """ TaskForm's rules for an imported row, with the skills given by name.
+    """
+    skills = LookupChoiceField(multiple=True, required=False)
+
+    def __init__(self, *args, skills=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['skills'].lookup = skills
+
+
+class SkillImportForm(SkillManagementForm):
+    """ SkillManagementForm's rules for an imported row.
+    """
+
+
+class VolunteerImportForm(forms.ModelForm):
+    """ A volunteer's account and profile from an imported row, with the skills given by name.
+    """
+    class Meta:
+        model = UserProfile
+        fields = ['name', 'address1', 'address2', 'city', 'state', 'zipcode', 'phone', 'preferences', 'start_availability', 'end_availability', 'skills']
+
+    username = forms.RegexField(regex=r'^[\w.@+-]+\Z', max_length=150)
+    email = forms.EmailField(required=False)
+    first_name = forms.CharField(max_length=150, required=False)
+    last_name = forms.CharField(max_length=150, required=False)
+    skills = LookupChoiceField(multiple=True, required=False)
+
+    def __init__(self, *args, skills=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['skills'].lookup = skills
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start_availability'), cleaned_data.get('end_availability')
+        if start and end and start > end:
+            self.add_error('end_availability', "The availability must end after it starts.")
+        return cleaned_data
+
+
+class ImportUploadForm(forms.Form):
+    """ CSV or JSONL files to import, one per kind of record.
+    """
+    skills = forms.FileField(required=False, label="Skills", widget=forms.FileInput(attrs={"class": "file-input w-full", "accept": ".csv,.jsonl"}))
+    events = forms.FileField(required=False, label="Events", widget=forms.FileInput(attrs={"class": "file-input w-full", "accept": ".csv,.jsonl"}))
+    volunteers = forms.FileField(required=False, label="Volunteers", widget=forms.FileInput(attrs={"class": "file-input w-full", "accept": ".csv,.jsonl"}))
+    tasks = forms.FileField(required=False, label="Tasks", widget=forms.FileInput(attrs={"class": "file-input w-full", "accept": ".csv,.jsonl"}))
+    dry_run = forms.BooleanField(required=False, label="Validate only", widget=forms.CheckboxInput(attrs={"class": "checkbox"}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not any(cleaned_data.get(kind) for kind in ('skills', 'events', 'volunteers', 'tasks')):
+            raise forms.ValidationError("Choose at least one file to import.")
+        return cleaned_data
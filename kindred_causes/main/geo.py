@@ -0,0 +1,215 @@
+import csv
+import math
+import re
+from django.db.models import Avg, Count, F
+from django.db.models.functions import Round, Sqrt
+from .models import Event, UserProfile, ZipCentroid
+from .utils import chunked
+
+
+# Coordinates are bucketed into a grid of CELL_DEGREES square cells, numbered row by row from the south-west
+# corner of the map. Events are indexed by cell and coordinates, so a radius query only reads the index entries
+# of the few cells around a point.
+CELL_DEGREES = 0.5
+_COLUMNS = round(360 / CELL_DEGREES)
+_ROWS = round(180 / CELL_DEGREES)
+
+# Miles per degree of latitude, and of longitude at the equator.
+MILES_PER_DEGREE = 69.09
+
+# The geocoded fields of Events and UserProfiles, and the fields they are geocoded from.
+GEO_FIELDS = ('latitude', 'longitude', 'geocell')
+SOURCE_FIELDS = {Event: ('location',), UserProfile: ('zipcode', 'city', 'state')}
+
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+STATE_CODES = {code for code, _ in UserProfile._meta.get_field('state').choices}
+
+
+def geocell(latitude, longitude):
+    """ The grid cell of a point.
+    """
+    row = min(_ROWS - 1, max(0, int((latitude + 90) // CELL_DEGREES)))
+    column = int((longitude + 180) // CELL_DEGREES) % _COLUMNS
+    return row * _COLUMNS + column
+
+
+def cells_within(latitude, longitude, miles):
+    """ The grid cells overlapping the bounding box of a circle around a point.
+    """
+    rise = miles / MILES_PER_DEGREE
+    first_row = max(0, int((latitude - rise + 90) // CELL_DEGREES))
+    last_row = min(_ROWS - 1, int((latitude + rise + 90) // CELL_DEGREES))
+    # The circle is widest, in degrees of longitude, at its edge nearest a pole.
+    cosine = math.cos(math.radians(min(90.0, abs(latitude) + rise)))
+    run = rise / cosine if cosine > 1e-9 else 360.0
+    first_column = int((longitude - run + 180) // CELL_DEGREES)
+    last_column = int((longitude + run + 180) // CELL_DEGREES)
+    if last_column - first_column + 1 >= _COLUMNS:
+        columns = range(_COLUMNS)
+    else:
+        columns = [column % _COLUMNS for column in range(first_column, last_column + 1)]
+    return [row * _COLUMNS + column for row in range(first_row, last_row + 1) for column in columns]
+
+
+def distance_miles(latitude, longitude, other_latitude, other_longitude):
+    """ The great circle distance between two points, in miles.
+    """
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    half_chord = (
+        math.sin((other_phi - phi) / 2) ** 2
+        + math.cos(phi) * math.cos(other_phi) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * math.degrees(math.asin(min(1.0, math.sqrt(half_chord)))) * MILES_PER_DEGREE
+
+
+def squared_distance(latitude, longitude):
+    """ An expression of the squared distance of a row's coordinates from a point, in squared degrees of latitude.
+
+    The equirectangular approximation is plain arithmetic, so it sorts and filters without database math
+    functions, and is within a fraction of a percent of the great circle distance over a few hundred miles.
+    """
+    scale = math.cos(math.radians(latitude))
+    rise = F('latitude') - latitude
+    run = (F('longitude') - longitude) * scale
+    return rise * rise + run * run
+
+
+def with_distance(queryset, latitude, longitude):
+    """ Annotates a queryset of Events or UserProfiles with distance_squared, to order by, and distance in miles.
+
+    Records without coordinates get None for both.
+    """
+    squared = squared_distance(latitude, longitude)
+    return queryset.annotate(distance_squared=squared, distance=Round(Sqrt(squared) * MILES_PER_DEGREE, 1))
+
+
+def nearby(queryset, latitude, longitude, miles):
+    """ Narrows a queryset of Events or UserProfiles to those within a radius of a point, with their distance.
+    """
+    return with_distance(queryset, latitude, longitude).filter(
+        geocell__in=cells_within(latitude, longitude, miles),
+        distance_squared__lte=(miles / MILES_PER_DEGREE) ** 2,
+    )
+
+
+def parse_location(text):
+    """ The ZIP code and the possible (city, state) pairs of a free-text location, such as "Houston, TX 77002".
+
+    The state is None when the text does not give one.
+    """
+    text = text or ''
+    zipcodes = ZIP_PATTERN.findall(text)
+    state = None
+    places = []
+    for part in text.split(','):
+        words = ZIP_PATTERN.sub('', part).split()
+        if words and words[-1].upper() in STATE_CODES:
+            state = words.pop().upper()
+        if words:
+            places.append(" ".join(words).lower())
+    return (zipcodes[-1] if zipcodes else None), [(place, state) for place in places]
+
+
+def _location_query(instance):
+    if isinstance(instance, UserProfile):
+        zipcodes = ZIP_PATTERN.findall(instance.zipcode or '')
+        city = " ".join((instance.city or '').split()).lower()
+        return (zipcodes[0] if zipcodes else None), [(city, instance.state or None)] if city else []
+    return parse_location(instance.location)
+
+
+class Geocoder:
+    """ Finds the coordinates of locations in the ZipCentroid table, loading what a batch needs with two queries.
+
+    A location is placed at its ZIP code's centre, or failing that at the mean of its city's ZIP code centres.
+    A city named without a state is taken to be the one with the most ZIP codes.
+
+    :param queries: The (zipcode, [(city, state), ...]) pairs of the locations, see parse_location().
+    """
+
+    def __init__(self, queries):
+        queries = list(queries)
+        zipcodes = {zipcode for zipcode, _ in queries if zipcode}
+        self.zipcodes = {}
+        if zipcodes:
+            rows = ZipCentroid.objects.filter(zipcode__in=zipcodes).values_list('zipcode', 'latitude', 'longitude')
+            self.zipcodes = {zipcode: (latitude, longitude) for zipcode, latitude, longitude in rows}
+
+        cities = {city for zipcode, places in queries if zipcode not in self.zipcodes for city, _ in places}
+        self.cities = {}
+        if cities:
+            rows = (
+                ZipCentroid.objects.filter(city__in=cities).order_by().values_list('city', 'state')
+                .annotate(Avg('latitude'), Avg('longitude'), Count('pk'))
+            )
+            for city, state, latitude, longitude, count in rows:
+                self.cities.setdefault(city, {})[state] = (latitude, longitude, count)
+
+    def locate(self, zipcode, places):
+        """ The (latitude, longitude) of a location, or None when it cannot be found.
+        """
+        if zipcode in self.zipcodes:
+            return self.zipcodes[zipcode]
+        for city, state in places:
+            states = self.cities.get(city, {})
+            found = states.get(state) if state else max(states.values(), key=lambda centre: centre[2], default=None)
+            if found:
+                return found[:2]
+        return None
+
+
+def geocode_objects(instances):
+    """ Sets the coordinates and grid cell of Events and UserProfiles from their locations, without saving them.
+
+    Records whose location cannot be found get none.
+    """
+    instances = list(instances)
+    queries = [_location_query(instance) for instance in instances]
+    geocoder = Geocoder(queries)
+    for instance, query in zip(instances, queries):
+        point = geocoder.locate(*query)
+        instance.latitude, instance.longitude = point or (None, None)
+        instance.geocell = geocell(*point) if point else None
+
+
+def geocode_text(text):
+    """ The (latitude, longitude) of a free-text location, a ZIP code or a city, or None.
+    """
+    query = parse_location(text)
+    return Geocoder([query]).locate(*query)
+
+
+def geocode_all(batch_size=1000):
+    """ Geocodes every Event and UserProfile again, for data written without signals or new centroids.
+
+    :return int: The number of records that were located.
+    """
+    located = 0
+    for model in (Event, UserProfile):
+        queryset = model.objects.order_by('pk').only('pk', *SOURCE_FIELDS[model])
+        for batch in chunked(queryset.iterator(chunk_size=batch_size), batch_size):
+            geocode_objects(batch)
+            model.objects.bulk_update(batch, GEO_FIELDS)
+            located += sum(instance.latitude is not None for instance in batch)
+    return located
+
+
+def load_centroids(file):
+    """ Adds or replaces ZIP code centroids from a CSV file with zipcode, city, state, latitude and longitude columns.
+
+    :return int: The number of centroids read.
+    """
+    count = 0
+    for batch in chunked(csv.DictReader(file), 1000):
+        ZipCentroid.objects.bulk_create(
+            [
+                ZipCentroid(
+                    zipcode=row['zipcode'].strip().zfill(5), city=" ".join(row['city'].split()).lower(),
+                    state=row['state'].strip().upper(), latitude=float(row['latitude']), longitude=float(row['longitude']),
+                )
+                for row in batch
+            ],
+            update_conflicts=True, unique_fields=['zipcode'], update_fields=['city', 'state', 'latitude', 'longitude'],
+        )
+        count += len(batch)
+    return count
@@ -0,0 +1,456 @@
+import codecs
+import csv
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .assignment import promote_waitlist
+from .cache_versions import bump_version
+from .context_processors import invalidate_profile
+from .forms import EventImportForm, SkillImportForm, TaskImportForm, VolunteerImportForm
+from .geo import GEO_FIELDS, geocode_objects
+from .matching import invalidate_volunteer_index
+from .models import Event, Skill, Task, UserProfile
+from .roles import ADMIN, VOLUNTEER
+from .search import index_objects
+from .stats import refresh_volunteer_stats
+from .utils import chunked
+
+
+# The kinds of records that can be imported, in the order they are imported, so that rows can refer to
+# records of the kinds before theirs, even ones created by the same import.
+IMPORT_KINDS = ('skills', 'events', 'volunteers', 'tasks')
+
+# Invalid rows reported per kind; any beyond are only counted.
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFileError(Exception):
+    """ A file that cannot be read at all, as opposed to rows that are invalid.
+    """
+
+
+@dataclass
+class ImportResult:
+    """ The outcome of importing one kind of record.
+    """
+    kind: str
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def _cell(value):
+    # JSON values are read as text, like the cells of a CSV file, and lists as values separated by ';'.
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ";".join(str(item) for item in value)
+    return str(value)
+
+
+def _read_csv(file):
+    reader = csv.DictReader(file)
+    try:
+        for row in reader:
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+    except csv.Error as exc:
+        raise ImportFileError(f"after line {reader.line_num}: {exc}.")
+
+
+def _read_jsonl(file):
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ImportFileError(f"line {line}: invalid JSON ({exc.msg}).")
+        if not isinstance(row, dict):
+            raise ImportFileError(f"line {line}: expected a JSON object.")
+        yield line, {key: _cell(value) for key, value in row.items()}
+
+
+def read_rows(file, name):
+    """ Streams the rows of a CSV or JSONL file as dicts of text, with their line numbers.
+
+    :param file: A binary or text file object, UTF-8 encoded.
+    :param str name: The file name, whose extension (.csv or .jsonl) gives the format.
+    :raises ImportFileError: When the file cannot be decoded or parsed.
+    """
+    suffix = Path(name).suffix.lower()
+    if suffix not in ('.csv', '.jsonl'):
+        raise ImportFileError(f"{name}: expected a .csv or .jsonl file.")
+    if 'b' in getattr(file, 'mode', 'b'):
+        file = codecs.getreader('utf-8-sig')(file)
+
+    try:
+        yield from (_read_csv if suffix == '.csv' else _read_jsonl)(file)
+    except UnicodeDecodeError:
+        raise ImportFileError(f"{name}: expected UTF-8 text.")
+    except ImportFileError as exc:
+        raise ImportFileError(f"{name}, {exc}")
+
+
+class _SharedFields(dict):
+    """ Form fields that every form built from them uses as they are, instead of deep-copying them.
+    """
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _text(row, name):
+    value = row.get(name)
+    return str(value).strip() if value is not None else ''
+
+
+def _form_errors(form):
+    return "; ".join(
+        " ".join(errors) if name == '__all__' else f"{name}: {' '.join(errors)}"
+        for name, errors in form.errors.items()
+    )
+
+
+class Importer(ABC):
+    """ Imports the rows of one kind of record, a batch at a time.
+
+    Every row is validated with the kind's import form. Rows whose natural key matches an existing record
+    update it, the others create one, and each batch is written with one bulk insert and one bulk update.
+    References to other records are resolved from the lookup maps shared by the whole import, which are
+    loaded once and extended as records are created, so resolving them costs no queries.
+    """
+    model = None
+    form_class = None
+    # Whether the records are geocoded, see main.geo.
+    geocoded = False
+
+    def __init__(self, lookups, result):
+        self.lookups = lookups
+        self.result = result
+        self.seen = set()
+        fields = [self.model._meta.get_field(name) for name in self.form_class._meta.fields]
+        self.fields = [field.name for field in fields if not field.many_to_many]
+        self.m2m_fields = [field.name for field in fields if field.many_to_many]
+        # Forms deep-copy their fields and widgets when built, which costs about as much as validating a
+        # row. Validating does not change the fields, and the lookup maps are only ever extended, so the
+        # form of every row shares the fields of one form, with the lookups already set.
+        form_class = type(self.form_class.__name__, (self.form_class,), {'__module__': __name__})
+        form_class.base_fields = _SharedFields(self.form_class(**self.form_kwargs()).fields)
+        self.form_class = form_class
+
+    @abstractmethod
+    def key(self, row):
+        """ The natural key of a row, matched against existing records.
+        """
+
+    @abstractmethod
+    def existing(self, keys):
+        """ The existing records with the given natural keys, by key, loaded with one query.
+        """
+
+    def check(self, row):
+        """ Validates what the key depends on, before matching. Raises ValidationError.
+        """
+
+    def form_kwargs(self):
+        """ The arguments of the import form besides the row and the record, such as lookup maps.
+        """
+        return {}
+
+    def get_form(self, row, instance):
+        return self.form_class(row, instance=instance, **self.form_kwargs())
+
+    def state(self, instance, form=None):
+        """ The imported values of a record, as saved or, given its validated form, as imported.
+
+        Related records must be prefetched by existing(), so this costs no queries.
+        """
+        values = [getattr(instance, self.model._meta.get_field(name).attname) for name in self.fields]
+        for name in self.m2m_fields:
+            related = form.cleaned_data[name] if form else getattr(instance, name).all()
+            values.append({obj.pk for obj in related})
+        return values
+
+    def import_batch(self, rows):
+        checked, errors = [], []
+        for line, row in rows:
+            try:
+                self.check(row)
+            except ValidationError as exc:
+                errors.append((line, " ".join(exc.messages)))
+                continue
+            checked.append((line, row))
+
+        existing = self.existing({self.key(row) for _, row in checked})
+        new, changed = [], []
+        for line, row in checked:
+            key = self.key(row)
+            if key in self.seen:
+                errors.append((line, "Duplicate of an earlier row."))
+                continue
+            instance = existing.get(key)
+            saved = self.state(instance) if instance is not None and instance.pk else None
+            form = self.get_form(row, instance)
+            if not form.is_valid():
+                errors.append((line, _form_errors(form)))
+                continue
+            self.seen.add(key)
+            if saved is None:
+                new.append(form)
+            elif self.state(form.instance, form) != saved:
+                changed.append(form)
+            else:
+                # Rewriting an unchanged record would only cost time.
+                self.result.unchanged += 1
+
+        for line, message in sorted(errors):
+            self.result.add_error(line, message)
+        self.write(new, changed)
+        self.result.created += len(new)
+        self.result.updated += len(changed)
+
+    def write(self, new, changed):
+        now = timezone.now()
+        for form in changed:
+            # bulk_update() does not apply auto_now.
+            form.instance.updated_at = now
+        fields = self.fields + ['updated_at']
+        if self.geocoded:
+            geocode_objects(form.instance for form in new + changed)
+            fields += GEO_FIELDS
+        self.model.objects.bulk_create([form.instance for form in new])
+        self.model.objects.bulk_update([form.instance for form in changed], fields)
+        index_objects(form.instance for form in new + changed)
+
+
+def _set_skills(through, owner_field, forms):
+    """ Replaces the skills of a batch of imported records with one DELETE and one INSERT.
+    """
+    through.objects.filter(**{f"{owner_field}__in": [form.instance.pk for form in forms]}).delete()
+    through.objects.bulk_create([
+        through(**{owner_field: form.instance.pk, 'skill_id': skill.pk})
+        for form in forms for skill in form.cleaned_data['skills']
+    ])
+
+
+class SkillImporter(Importer):
+    """ Skills, matched by name.
+    """
+    model = Skill
+    form_class = SkillImportForm
+
+    def key(self, row):
+        return _text(row, 'name')
+
+    def existing(self, keys):
+        return {skill.name: skill for skill in Skill.objects.filter(name__in=keys)}
+
+    def write(self, new, changed):
+        super().write(new, changed)
+        self.lookups['skills'].update((form.instance.name, form.instance) for form in new + changed)
+
+
+class EventImporter(Importer):
+    """ Events, matched by name and date, with their admin given by username.
+    """
+    model = Event
+    form_class = EventImportForm
+    geocoded = True
+
+    def key(self, row):
+        return _text(row, 'name'), EventImportForm.base_fields['date'].clean(row.get('date'))
+
+    def check(self, row):
+        try:
+            self.key(row)
+        except ValidationError as exc:
+            raise ValidationError(f"date: {' '.join(exc.messages)}")
+
+    def existing(self, keys):
+        events = Event.objects.filter(name__in={name for name, _ in keys})
+        return {(event.name, event.date): event for event in events if (event.name, event.date) in keys}
+
+    def form_kwargs(self):
+        return {'admins': self.lookups['admins']}
+
+    def write(self, new, changed):
+        super().write(new, changed)
+        for form in new:
+            self.lookups['events'].setdefault(form.instance.name, set()).add(form.instance.pk)
+
+
+class VolunteerImporter(Importer):
+    """ Volunteers' accounts and profiles, matched by username, with their skills given by name.
+
+    New accounts join the Volunteer group and get an unusable password, to be set through password reset.
+    """
+    model = UserProfile
+    form_class = VolunteerImportForm
+    geocoded = True
+    user_fields = ['email', 'first_name', 'last_name']
+
+    def key(self, row):
+        return _text(row, 'username')
+
+    def existing(self, keys):
+        profiles = UserProfile.objects.select_related('user').prefetch_related('skills').filter(user__username__in=keys)
+        found = {profile.user.username: profile for profile in profiles}
+        # Accounts without a profile are given one.
+        users = User.objects.filter(username__in=keys - found.keys())
+        found.update((user.username, UserProfile(user=user)) for user in users)
+        return found
+
+    def form_kwargs(self):
+        return {'skills': self.lookups['skills']}
+
+    def state(self, instance, form=None):
+        values = super().state(instance, form)
+        user = instance.user
+        return values + [(form.cleaned_data[name] if form else None) or getattr(user, name) for name in self.user_fields]
+
+    def write(self, new, changed):
+        updated = [form for form in new + changed if form.instance.user_id is not None]
+        accounts = [form for form in new if form.instance.user_id is None]
+        users = User.objects.bulk_create([
+            User(
+                username=form.cleaned_data['username'], password=self.lookups['unusable_password'],
+                **{name: form.cleaned_data[name] for name in self.user_fields},
+            )
+            for form in accounts
+        ])
+        for form, user in zip(accounts, users):
+            form.instance.user = user
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.pk, group_id=self.lookups['volunteer_group'].pk) for user in users
+        ])
+
+        for form in updated:
+            for name in self.user_fields:
+                if form.cleaned_data[name]:
+                    setattr(form.instance.user, name, form.cleaned_data[name])
+        User.objects.bulk_update([form.instance.user for form in updated], self.user_fields)
+
+        super().write(new, changed)
+        _set_skills(UserProfile.skills.through, 'userprofile_id', new + changed)
+        self.lookups['profile_user_ids'].update(form.instance.user_id for form in updated)
+
+
+class TaskImporter(Importer):
+    """ Tasks, matched by Event and name. The Event is given by name, which must be unambiguous, and the
+    skills by name.
+    """
+    model = Task
+    form_class = TaskImportForm
+
+    def event_id(self, row):
+        return next(iter(self.lookups['events'][_text(row, 'event')]))
+
+    def key(self, row):
+        return self.event_id(row), _text(row, 'name')
+
+    def check(self, row):
+        name = _text(row, 'event')
+        matches = len(self.lookups['events'].get(name, ()))
+        if matches != 1:
+            raise ValidationError(f"event: {'No' if not matches else 'More than one'} Event is named {name!r}.")
+
+    def existing(self, keys):
+        tasks = Task.objects.prefetch_related('skills').filter(event_id__in={event_id for event_id, _ in keys}, name__in={name for _, name in keys})
+        return {(task.event_id, task.name): task for task in tasks}
+
+    def form_kwargs(self):
+        return {'skills': self.lookups['skills']}
+
+    def get_form(self, row, instance):
+        return super().get_form(row, instance or Task(event_id=self.event_id(row)))
+
+    def write(self, new, changed):
+        super().write(new, changed)
+        _set_skills(Task.skills.through, 'task_id', new + changed)
+        self.lookups['task_event_ids'].update(form.instance.event_id for form in new + changed)
+        self.lookups['changed_task_ids'].update(form.instance.pk for form in changed)
+
+
+IMPORTERS = {'skills': SkillImporter, 'events': EventImporter, 'volunteers': VolunteerImporter, 'tasks': TaskImporter}
+
+
+def import_records(files, batch_size=None, dry_run=False):
+    """ Imports CSV or JSONL files of skills, events, volunteers and tasks in one transaction.
+
+    Rows are validated with the rules of the app's forms, and references (an Event's admin, a Task's
+    Event, skills) are resolved by name from lookup maps loaded once. Valid rows are written with bulk
+    inserts and updates, batch_size rows at a time; invalid rows are skipped and reported by line.
+
+    Bulk writes send no signals, so the search entries and coordinates are written with each batch, and the Event
+    counters, volunteer stats, cache versions, volunteer index and profile cache are refreshed once at the end,
+    after the waitlists of updated Tasks are promoted into any places a higher capacity added.
+
+    :param dict files: A (file, name) pair per kind of record, see IMPORT_KINDS.
+    :param int batch_size: The rows validated and written at once, IMPORT_BATCH_SIZE by default.
+    :param bool dry_run: Whether to roll everything back after validating and writing.
+    :return list: An ImportResult per imported kind, in import order.
+    """
+    unknown = set(files) - set(IMPORT_KINDS)
+    if unknown:
+        raise ImportFileError(f"Unknown kinds of records: {', '.join(sorted(unknown))}.")
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+
+    results = []
+    with transaction.atomic():
+        lookups = {
+            'skills': {skill.name: skill for skill in Skill.objects.all()},
+            'admins': {user.username: user for user in User.objects.filter(groups__name=ADMIN)},
+            'events': {},
+            'volunteer_group': Group.objects.get_or_create(name=VOLUNTEER)[0],
+            'unusable_password': make_password(None),
+            'task_event_ids': set(),
+            'changed_task_ids': set(),
+            'profile_user_ids': set(),
+        }
+        for pk, name in Event.objects.values_list('pk', 'name'):
+            lookups['events'].setdefault(name, set()).add(pk)
+
+        for kind in IMPORT_KINDS:
+            if kind not in files:
+                continue
+            file, name = files[kind]
+            result = ImportResult(kind)
+            importer = IMPORTERS[kind](lookups, result)
+            for batch in chunked(read_rows(file, name), batch_size):
+                importer.import_batch(batch)
+            results.append(result)
+
+        # An Event's capacity is the sum of its Tasks'.
+        for event_ids in chunked(lookups['task_event_ids'], batch_size):
+            Event.objects.filter(pk__in=event_ids).recount()
+        # Places added by a higher capacity go to the waitlist.
+        for task_ids in chunked(lookups['changed_task_ids'], batch_size):
+            for task in Task.objects.filter(pk__in=task_ids, waitlist__isnull=False).distinct():
+                promote_waitlist(task)
+        # Only updated Tasks have assignees, whose skills used may have changed.
+        refresh_volunteer_stats(
+            Task.attendees.through.objects.filter(task_id__in=lookups['changed_task_ids']).values_list('user_id', flat=True)
+        )
+
+        if dry_run:
+            transaction.set_rollback(True)
+            return results
+
+    for model in (Skill, Event, Task):
+        bump_version(model)
+    invalidate_volunteer_index()
+    invalidate_profile(*lookups['profile_user_ids'])
+    return results
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from .choices import ReportJobStatus
+from .models import ReportJob, VolunteerStats
+from .reports import build_event_report, render_event_report_pdf
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def report_version(event):
+    """ Computes the content version of an Event's report.
+
+    Derived from the Event's timestamp and counters plus the latest timestamps and counts of its Tasks
+    and reviews, and the latest refresh of its attendees' stats, whose skills and previous Events the
+    report lists. Any edit that changes the report changes the version.
+
+    :param Event event: The Event the report is for.
+    :return str: A short hash identifying the report content.
+    """
+    tasks = event.tasks.aggregate(latest=Max('updated_at'), count=Count('pk'))
+    reviews = event.event_reviews.aggregate(latest=Max('updated_at'), count=Count('pk'))
+    attendees = VolunteerStats.objects.filter(user__tasks__event=event).aggregate(latest=Max('updated_at'))
+    parts = [
+        event.updated_at, event.attendee_count, event.unassigned_attendee_count,
+        tasks['latest'], tasks['count'], reviews['latest'], reviews['count'], attendees['latest'],
+    ]
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def report_path(event_id, version):
+    """ The on-disk location of a cached report.
+    """
+    return Path(settings.REPORT_CACHE_DIR) / f"event_{event_id}_{version}.pdf"
+
+
+def submit_report_job(event, retry_failed=False):
+    """ Queues a PDF report of an Event, reusing a job for the same content version.
+
+    A finished job whose file is still on disk is returned as-is, so repeat downloads are free. A job
+    still running after REPORT_JOB_TIMEOUT is presumed dead and queued again.
+
+    :param Event event: The Event to report on.
+    :param bool retry_failed: Whether to queue a new job when the latest one for this version failed.
+    :return ReportJob: The new or existing job.
+    """
+    version = report_version(event)
+    job = ReportJob.objects.filter(event=event, version=version).order_by('-created_at').first()
+
+    if job is not None:
+        if job.status == ReportJobStatus.DONE and os.path.exists(job.file_path):
+            return job
+        if job.status == ReportJobStatus.RUNNING and requeue_stale_report_jobs(ReportJob.objects.filter(pk=job.pk)):
+            job.status = ReportJobStatus.PENDING
+            transaction.on_commit(lambda: _dispatch(job.pk))
+            return job
+        if job.status in (ReportJobStatus.PENDING, ReportJobStatus.RUNNING):
+            return job
+        if job.status == ReportJobStatus.FAILED and not retry_failed:
+            return job
+
+    job = ReportJob.objects.create(event=event, version=version)
+    transaction.on_commit(lambda: _dispatch(job.pk))
+    return job
+
+
+def run_report_job(pk):
+    """ Generates the report of a pending job, unless another worker has already claimed it.
+
+    :param int pk: The primary key of the ReportJob.
+    :return bool: Whether this call ran the job.
+    """
+    claimed = ReportJob.objects.filter(pk=pk, status=ReportJobStatus.PENDING).update(
+        status=ReportJobStatus.RUNNING, started_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+
+    job = ReportJob.objects.get(pk=pk)
+    try:
+        path = report_path(job.event_id, job.version)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A requeued job can run while its presumed dead worker is still writing.
+            partial = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.part")
+            with open(partial, 'wb') as file:
+                render_event_report_pdf(build_event_report(job.event_id), file)
+            os.replace(partial, path)
+        job.file_path = str(path)
+        job.status = ReportJobStatus.DONE
+    except Exception:
+        logger.exception("Report job %d failed.", pk)
+        job.error = traceback.format_exc()
+        job.status = ReportJobStatus.FAILED
+
+    job.completed_at = timezone.now()
+    job.save(update_fields=['file_path', 'status', 'error', 'completed_at', 'updated_at'])
+    return True
+
+
+def requeue_stale_report_jobs(jobs=None):
+    """ Queues again the running jobs claimed more than REPORT_JOB_TIMEOUT ago, whose worker presumably died.
+
+    :param jobs: The ReportJobs to check, all of them by default.
+    :return int: The number of jobs queued again.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    stale = (jobs if jobs is not None else ReportJob.objects.all()).filter(
+        Q(started_at__lt=cutoff) | Q(started_at__isnull=True), status=ReportJobStatus.RUNNING,
+    )
+    return stale.update(status=ReportJobStatus.PENDING, started_at=None)
+
+
+def run_pending_report_jobs():
+    """ Runs every pending job in the current process, after queueing stale running ones again.
+
+    :return int: The number of jobs run.
+    """
+    requeue_stale_report_jobs()
+    pending = ReportJob.objects.filter(status=ReportJobStatus.PENDING).order_by('created_at').values_list('pk', flat=True)
+    return sum(run_report_job(pk) for pk in list(pending))
+
+
+def run_in_background(func, *args):
+    """ Runs a function on the local worker pool, or inline when background jobs are disabled.
+
+    The pool lives in this process's memory: work still queued or running when the process stops is
+    lost. Report jobs are stored as ReportJobs and can be resumed with run_report_jobs, running ones
+    once REPORT_JOB_TIMEOUT has passed; other work, such as a notification fan-out, is not, and
+    exceptions it raises are only logged.
+
+    :param func: The function to run. It must not rely on the caller's database connection.
+    """
+    if not settings.BACKGROUND_JOBS_ENABLED:
+        func(*args)
+        return
+
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKER_THREADS, thread_name_prefix="kindred-worker")
+    _executor.submit(_run_in_worker, func, *args)
+
+
+def _dispatch(pk):
+    run_in_background(run_report_job, pk)
+
+
+def _run_in_worker(func, *args):
+    # Nothing waits on the Future, so an exception would otherwise vanish with it.
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background job %s%r failed.", func.__qualname__, args)
+    finally:
+        close_old_connections()
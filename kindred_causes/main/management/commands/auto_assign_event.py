@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from main.assignment import StalePlanError, apply_assignment, solve_event_assignment
+from main.models import Event
+
+
+class Command(BaseCommand):
+    help = "Assigns an Event's attendees without a Task to its Tasks, maximizing skill coverage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_id', type=int, help="The id of the Event to staff.")
+        parser.add_argument('--dry-run', action='store_true', help="Print the plan without writing it.")
+
+    def handle(self, *args, **options):
+        event = Event.objects.filter(pk=options['event_id']).first()
+        if event is None:
+            raise CommandError(f"Event {options['event_id']} does not exist.")
+
+        plan = solve_event_assignment(event)
+        for assignment in plan.assignments:
+            skills = ", ".join(assignment.matched_skills) or "no matching skills"
+            self.stdout.write(f"{assignment.task_name}: {assignment.name} ({skills})")
+        for _, name in plan.unassigned:
+            self.stdout.write(f"Unassigned: {name}")
+
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {len(plan.assignments)} assignments covering {plan.skill_coverage} skills.")
+            return
+
+        try:
+            assigned = apply_assignment(plan)
+        except StalePlanError:
+            raise CommandError(f"Event {event.pk} changed while it was being staffed, run the command again.")
+        self.stdout.write(self.style.SUCCESS(f"Assigned {assigned} volunteers covering {plan.skill_coverage} skills."))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from main.cache_versions import bump_version
+from main.context_processors import invalidate_profile
+from main.geo import geocode_all, load_centroids
+from main.matching import invalidate_volunteer_index
+from main.models import Event, UserProfile
+from main.utils import chunked
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocodes every Event location and volunteer address again from the ZIP code centroid table, after data "
+        "was written without signals. Optionally loads more centroids first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--centroids', metavar='FILE',
+            help="A CSV file of ZIP code centroids with zipcode, city, state, latitude and longitude columns.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records geocoded and written at once.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['centroids']:
+                try:
+                    with open(options['centroids'], newline='') as file:
+                        count = load_centroids(file)
+                except (OSError, KeyError, ValueError) as exc:
+                    raise CommandError(f"{options['centroids']}: {exc}")
+                self.stdout.write(f"Loaded {count} ZIP code centroids.")
+            located = geocode_all(options['batch_size'])
+
+        bump_version(Event)
+        invalidate_volunteer_index()
+        # The cached profiles hold the coordinates nearby Events are found from.
+        user_ids = UserProfile.objects.values_list('user_id', flat=True).iterator(chunk_size=options['batch_size'])
+        for batch in chunked(user_ids, options['batch_size']):
+            invalidate_profile(*batch)
+        self.stdout.write(self.style.SUCCESS(f"Located {located} records."))
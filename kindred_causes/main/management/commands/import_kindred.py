@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from main.imports import IMPORT_KINDS, ImportFileError, import_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports skills, events, volunteers and tasks from CSV or JSONL files, validating every row with the "
+        "app's form rules. Rows matching an existing record by name (events by name and date, tasks by event "
+        "and name, volunteers by username) update it."
+    )
+
+    def add_arguments(self, parser):
+        for kind in IMPORT_KINDS:
+            parser.add_argument(f'--{kind}', metavar='FILE', help=f"A .csv or .jsonl file of {kind}.")
+        parser.add_argument('--batch-size', type=int, help="Rows validated and written at once.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate every row, then roll back.")
+
+    def handle(self, *args, **options):
+        paths = {kind: options[kind] for kind in IMPORT_KINDS if options[kind]}
+        if not paths:
+            raise CommandError(f"Give at least one of --{', --'.join(IMPORT_KINDS)}.")
+
+        files = {}
+        try:
+            for kind, path in paths.items():
+                files[kind] = (open(path, 'rb'), path)
+            results = import_records(files, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            for file, _ in files.values():
+                file.close()
+
+        for result in results:
+            self.stdout.write(f"{result.kind}: {result.created} created, {result.updated} updated, {result.unchanged} unchanged, {result.invalid} invalid")
+            for line, message in result.errors:
+                self.stdout.write(self.style.ERROR(f"  {paths[result.kind]}, line {line}: {message}"))
+            if result.invalid > len(result.errors):
+                self.stdout.write(self.style.ERROR(f"  ...and {result.invalid - len(result.errors)} more"))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was saved."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Import complete."))
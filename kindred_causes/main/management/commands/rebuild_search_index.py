@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from main.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the search index of Events, Tasks and Skills, after data was written without signals."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} records."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from main.models import Event, Task
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the denormalized capacity and attendance counters on every Event and Task."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tasks = Task.objects.all().recount()
+            events = Event.objects.all().recount()
+
+        self.stdout.write(self.style.SUCCESS(f"Recounted {events} events and {tasks} tasks."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from main.stats import refresh_volunteer_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes every volunteer's history and statistics, after data was written without signals."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = refresh_volunteer_stats()
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed the stats of {count} users."))
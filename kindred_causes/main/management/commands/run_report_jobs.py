@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from main.jobs import run_pending_report_jobs
+
+
+class Command(BaseCommand):
+    help = "Runs queued Event report jobs, e.g. ones left pending by a restarted web worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls when watching.")
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending_report_jobs()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f"Ran {count} report jobs."))
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from main.models import Event
+from main.notifications import fan_out_notification
+
+
+class Command(BaseCommand):
+    help = "Sends a notification to every attendee of an Event."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_id', type=int, help="The id of the Event whose attendees are notified.")
+        parser.add_argument('--subject', required=True)
+        parser.add_argument('--body', default="")
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per INSERT, defaults to NOTIFICATION_BATCH_SIZE.")
+
+    def handle(self, *args, **options):
+        if not Event.objects.filter(pk=options['event_id']).exists():
+            raise CommandError(f"Event {options['event_id']} does not exist.")
+
+        sent = fan_out_notification(options['event_id'], options['subject'], options['body'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} notifications."))
@@ -0,0 +1,322 @@
+import functools
+import heapq
+import math
+import operator
+import threading
+from dataclasses import dataclass
+from datetime import date
+from django.conf import settings
+from .cache_versions import read_versions, stamp_version
+from .geo import cells_within, distance_miles, geocode_text
+from .models import UserProfile
+
+
+# The version stamp of the volunteer data the index is built from, see main.cache_versions.
+INDEX_STAMP = "matching:volunteers"
+
+# Weights of the parts of a match score; skill coverage dominates, a local volunteer breaks ties.
+SKILL_WEIGHT = 0.8
+LOCATION_WEIGHT = 0.2
+
+
+@dataclass
+class Match:
+    """ A volunteer ranked for a Task.
+    """
+    user_id: int
+    name: str
+    score: float
+    skill_coverage: float
+    matched_skills: list
+    location_match: bool
+    distance: float = None
+
+
+@dataclass
+class Volunteer:
+    """ A volunteer found by a search of the VolunteerIndex.
+    """
+    user_id: int
+    name: str
+    skill_names: list
+    start_availability: date
+    end_availability: date
+
+
+class VolunteerIndex:
+    """ Every volunteer profile packed into parallel arrays for fast scoring and search.
+
+    Each volunteer's skills are stored as an int bitset (bit n set = has the skill at position n),
+    so matching a task's skills is one AND plus a popcount per volunteer. The inverted index maps
+    each skill to an int bitset of volunteer positions, so AND/OR skill queries are a handful of
+    big-int operations whatever the number of volunteers. Located volunteers are also listed by grid
+    cell (see main.geo), so finding the ones near a point only measures the distance of a few.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.skill_bits = {}
+        self.skill_names = {}
+        self.skill_volunteers = {}
+        self.positions = {}
+        self.user_ids = []
+        self.names = []
+        self.masks = []
+        self.starts = []
+        self.ends = []
+        self.cities = []
+        self.distinct_cities = set()
+        self.latitudes = []
+        self.longitudes = []
+        self.cells = {}
+
+    @classmethod
+    def build(cls, version):
+        """ Loads the index with two queries, whatever the number of volunteers.
+        """
+        index = cls(version)
+        masks = {}
+        skill_users = {}
+        skill_rows = UserProfile.skills.through.objects.values_list('userprofile__user_id', 'skill_id', 'skill__name')
+        for user_id, skill_id, skill_name in skill_rows:
+            masks[user_id] = masks.get(user_id, 0) | index.bit(skill_id, skill_name)
+            skill_users.setdefault(skill_id, []).append(user_id)
+
+        profiles = UserProfile.objects.values_list(
+            'user_id', 'name', 'start_availability', 'end_availability', 'city', 'latitude', 'longitude', 'geocell',
+        )
+        for user_id, name, start, end, city, latitude, longitude, cell in profiles.order_by('user_id').iterator(chunk_size=2000):
+            if cell is not None:
+                index.cells.setdefault(cell, []).append(len(index.user_ids))
+            index.positions[user_id] = len(index.user_ids)
+            index.user_ids.append(user_id)
+            index.names.append(name)
+            index.masks.append(masks.get(user_id, 0))
+            index.starts.append(start)
+            index.ends.append(end)
+            index.cities.append((city or "").strip().lower())
+            index.latitudes.append(latitude)
+            index.longitudes.append(longitude)
+        index.distinct_cities = set(index.cities)
+
+        # Set the bits in a bytearray and convert once; OR-ing one bit at a time into a big int is quadratic.
+        for skill_id, user_ids in skill_users.items():
+            bitmap = bytearray((len(index) + 7) // 8)
+            for user_id in user_ids:
+                position = index.positions.get(user_id)
+                if position is not None:
+                    bitmap[position >> 3] |= 1 << (position & 7)
+            index.skill_volunteers[skill_id] = int.from_bytes(bitmap, 'little')
+        return index
+
+    def bit(self, skill_id, skill_name=None):
+        if skill_id not in self.skill_bits:
+            self.skill_bits[skill_id] = 1 << len(self.skill_bits)
+            self.skill_names[skill_id] = skill_name
+        return self.skill_bits[skill_id]
+
+    def mask(self, skill_ids):
+        mask = 0
+        for skill_id in skill_ids:
+            mask |= self.skill_bits.get(skill_id, 0)
+        return mask
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def search(self, all_skills=(), any_skills=(), available_from=None, available_until=None, user_ids=None):
+        """ Finds volunteers by skill and availability.
+
+        :param all_skills: The primary keys of Skills a volunteer must all have.
+        :param any_skills: The primary keys of Skills a volunteer must have at least one of.
+        :param date available_from: The first day of the window a volunteer must be available for.
+        :param date available_until: The last day of that window.
+        :param user_ids: The user ids to search among, defaults to every volunteer.
+        :return list: The positions of the matching volunteers, in user id order.
+        """
+        bits = (1 << len(self)) - 1
+        for skill_id in all_skills:
+            bits &= self.skill_volunteers.get(skill_id, 0)
+        if any_skills:
+            bits &= functools.reduce(operator.or_, (self.skill_volunteers.get(skill_id, 0) for skill_id in any_skills), 0)
+
+        positions = _set_bits(bits, len(self))
+        if user_ids is not None:
+            user_ids = set(user_ids)
+            positions = [i for i in positions if self.user_ids[i] in user_ids]
+        if available_from is not None or available_until is not None:
+            first = available_from or available_until
+            last = available_until or available_from
+            starts, ends = self.starts, self.ends
+            positions = [
+                i for i in positions
+                if (starts[i] is None or starts[i] <= first) and (ends[i] is None or ends[i] >= last)
+            ]
+        return positions
+
+    def near(self, latitude, longitude, miles):
+        """ The located volunteers within a radius of a point.
+
+        :return dict: The distance in miles of each volunteer's position.
+        """
+        found = {}
+        for cell in cells_within(latitude, longitude, miles):
+            for i in self.cells.get(cell, ()):
+                distance = distance_miles(latitude, longitude, self.latitudes[i], self.longitudes[i])
+                if distance <= miles:
+                    found[i] = distance
+        return found
+
+    def skill_counts(self):
+        """ The number of volunteers with each Skill.
+        """
+        return {skill_id: bits.bit_count() for skill_id, bits in self.skill_volunteers.items()}
+
+    def skill_names_of(self, user_id):
+        """ The names of a volunteer's Skills, empty for users without a profile.
+        """
+        position = self.positions.get(user_id)
+        if position is None:
+            return []
+        mask = self.masks[position]
+        return sorted(self.skill_names[skill_id] for skill_id, bit in self.skill_bits.items() if mask & bit)
+
+    def volunteer(self, position):
+        """ The volunteer at a position, as a Volunteer.
+        """
+        user_id = self.user_ids[position]
+        return Volunteer(
+            user_id=user_id,
+            name=self.names[position],
+            skill_names=self.skill_names_of(user_id),
+            start_availability=self.starts[position],
+            end_availability=self.ends[position],
+        )
+
+
+# The offsets of the set bits of every byte value, to turn a bitset into positions a byte at a time.
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def _set_bits(bits, size):
+    """ The positions of the set bits of an int bitset, in ascending order.
+    """
+    positions = []
+    for offset, value in enumerate(bits.to_bytes((size + 7) // 8, 'little')):
+        if value:
+            base = offset * 8
+            positions.extend(base + bit for bit in _BYTE_BITS[value])
+    return positions
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_version():
+    """ The current version of the volunteer data.
+
+    Read from the database rather than the cache, so a change made through any process rebuilds the
+    index of every process. None until the data first changes.
+    """
+    return read_versions([INDEX_STAMP])[0]
+
+
+def get_volunteer_index():
+    """ The process-wide volunteer index, rebuilt when profiles or their skills have changed.
+    """
+    global _index
+    version = index_version()
+    if _index is None or _index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = VolunteerIndex.build(version)
+    return _index
+
+
+def invalidate_volunteer_index():
+    stamp_version(INDEX_STAMP)
+
+
+def rank_volunteers(task, limit=25):
+    """ Ranks volunteers for a Task.
+
+    Volunteers already assigned to the Task or unavailable on the Event's date are skipped. The rest
+    are scored on the share of the Task's required skills they have and on whether they live within
+    MATCHING_RADIUS_MILES of the Task's location, or of its Event's. A full Task has no matches.
+
+    :param Task task: The Task to staff.
+    :param int limit: The maximum number of matches to return.
+    :return list: The best Matches, highest score first.
+    """
+    if task.capacity >= 0 and task.attendee_count >= task.capacity:
+        return []
+
+    event = task.event
+    origin = geocode_text(task.location) if task.location else None
+    if origin is None and event is not None and event.latitude is not None:
+        origin = (event.latitude, event.longitude)
+    return score_volunteers(
+        get_volunteer_index(),
+        required=set(task.skills.values_list('pk', flat=True)),
+        exclude=set(task.attendees.values_list('pk', flat=True)),
+        day=event.date.date() if event is not None and event.date else None,
+        location=" ".join(part for part in (task.location, event.location if event else "") if part),
+        origin=origin,
+        radius=settings.MATCHING_RADIUS_MILES,
+        limit=limit,
+    )
+
+
+def score_volunteers(index, required, exclude=(), day=None, location="", origin=None, radius=None, limit=25):
+    """ Scores every volunteer of an index against a set of required skills.
+
+    :param VolunteerIndex index: The volunteers.
+    :param set required: The primary keys of the required Skills.
+    :param set exclude: The user ids to skip.
+    :param date day: The day volunteers must be available on, if known.
+    :param str location: Where the work takes place; volunteers whose city appears in it are local,
+        unless both they and the work are located.
+    :param tuple origin: The (latitude, longitude) of the work, if known.
+    :param float radius: The miles from the origin within which volunteers are local; nearer ones
+        rank first among equal scores.
+    :param int limit: The maximum number of matches to return.
+    :return list: The best Matches, highest score first.
+    """
+    required_mask = index.mask(required)
+    required_count = len(required)
+    location = location.lower()
+    local_cities = {city: bool(city) and city in location for city in index.distinct_cities}
+    distances = index.near(*origin, radius) if origin is not None else {}
+
+    scored = []
+    rows = zip(range(len(index)), index.user_ids, index.masks, index.starts, index.ends, index.cities, index.latitudes)
+    for i, user_id, mask, start, end, city, latitude in rows:
+        if user_id in exclude:
+            continue
+        if day is not None and ((start and start > day) or (end and end < day)):
+            continue
+        coverage = (mask & required_mask).bit_count() / required_count if required_count else 1.0
+        distance = distances.get(i)
+        local = distance is not None if origin is not None and latitude is not None else local_cities[city]
+        nearness = -distance if distance is not None else -math.inf
+        scored.append((SKILL_WEIGHT * coverage + LOCATION_WEIGHT * local, nearness, -user_id, coverage, local, distance, i))
+
+    best = heapq.nlargest(limit, scored)
+
+    matches = []
+    for score, _, _, coverage, local, distance, i in best:
+        matched = [
+            index.skill_names[skill_id] for skill_id in required
+            if index.masks[i] & index.skill_bits.get(skill_id, 0)
+        ]
+        matches.append(Match(
+            user_id=index.user_ids[i],
+            name=index.names[i],
+            score=round(score, 3),
+            skill_coverage=coverage,
+            matched_skills=sorted(matched),
+            location_match=local,
+            distance=round(distance, 1) if distance is not None else None,
+        ))
+    return matches
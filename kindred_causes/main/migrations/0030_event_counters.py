@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:32
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _aggregate_subquery(queryset, outer_field, aggregate):
+    subquery = queryset.filter(**{outer_field: OuterRef('pk')}).order_by().values(outer_field).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def recount(apps, schema_editor):
+    Event = apps.get_model('main', 'Event')
+    Task = apps.get_model('main', 'Task')
+    TaskAttendees = Task.attendees.through
+    EventAttendees = Event.attendees.through
+
+    Task.objects.update(
+        attendee_count=_aggregate_subquery(TaskAttendees.objects.all(), 'task', Count('pk')),
+    )
+    Event.objects.update(
+        capacity=_aggregate_subquery(Task.objects.all(), 'event', Sum('capacity')),
+        attendee_count=_aggregate_subquery(EventAttendees.objects.all(), 'event', Count('pk')),
+        unassigned_attendee_count=_aggregate_subquery(TaskAttendees.objects.all(), 'task__event', Count('pk')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0029_remove_userprofile_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='attendee_count',
+            field=models.IntegerField(default=0, editable=False, help_text='The number of attendees of the Event. Maintained by signals.', verbose_name='Attendee Count'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.IntegerField(default=0, editable=False, help_text="The total capacity of the Event's Tasks. Maintained by signals.", verbose_name='Capacity'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='unassigned_attendee_count',
+            field=models.IntegerField(default=0, editable=False, help_text="The number of attendee assignments across the Event's Tasks. Maintained by signals.", verbose_name='Unassigned Attendee Count'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='attendee_count',
+            field=models.IntegerField(default=0, editable=False, help_text='The number of Volunteers assigned to the Task. Maintained by signals.', verbose_name='Attendee Count'),
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0030_event_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the record was created.', verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='The date and time the record was last udpated.', verbose_name='Updated At')),
+                ('version', models.CharField(help_text="The version of the Event's content the report was generated from.", max_length=64, verbose_name='Content Version')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Pending', help_text='The status of the report job.', max_length=20, verbose_name='Status')),
+                ('file_path', models.CharField(blank=True, help_text='The path of the generated report file.', max_length=500, verbose_name='File Path')),
+                ('error', models.TextField(blank=True, help_text='The error raised while generating the report, if any.', verbose_name='Error')),
+                ('completed_at', models.DateTimeField(blank=True, help_text='The date and time the report finished generating.', null=True, verbose_name='Completed At')),
+                ('created_by', models.ForeignKey(blank=True, help_text='The user who created the record.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+                ('event', models.ForeignKey(help_text='The Event the report is for.', on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to='main.event', verbose_name='Related Event')),
+                ('updated_by', models.ForeignKey(blank=True, help_text='The user who last updated the record.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_updated_by', to=settings.AUTH_USER_MODEL, verbose_name='Updated By')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'version'], name='main_report_event_i_c1b78a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 19:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0033_event_browser_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the record was created.', verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='The date and time the record was last udpated.', verbose_name='Updated At')),
+                ('created_by', models.ForeignKey(blank=True, help_text='The user who created the record.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+                ('task', models.ForeignKey(help_text='The full Task the Volunteer is waiting for.', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='main.task', verbose_name='Related Task')),
+                ('updated_by', models.ForeignKey(blank=True, help_text='The user who last updated the record.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_updated_by', to=settings.AUTH_USER_MODEL, verbose_name='Updated By')),
+                ('user', models.ForeignKey(help_text='The Volunteer waiting for a place.', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL, verbose_name='Volunteer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', 'created_at', 'id'], name='waitlist_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'user'), name='unique_waitlist_entry')],
+            },
+        ),
+    ]
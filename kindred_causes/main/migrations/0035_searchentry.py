@@ -0,0 +1,78 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:42
+
+from django.db import migrations, models
+
+
+# The full-text index over SearchEntry: an FTS5 table kept in sync by triggers on SQLite, and a generated
+# tsvector column with a GIN index on PostgreSQL. Both match words case-insensitively without stemming,
+# so prefixes of what is typed match the same way on both. On SQLite the kind is indexed too, so searches
+# restricted to some kinds are filtered inside the index.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE main_searchentry_fts USING fts5("
+    "kind, title, body, content='main_searchentry', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE TRIGGER main_searchentry_fts_insert AFTER INSERT ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(rowid, kind, title, body) VALUES (new.id, new.kind, new.title, new.body); END",
+    "CREATE TRIGGER main_searchentry_fts_delete AFTER DELETE ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts, rowid, kind, title, body) VALUES ('delete', old.id, old.kind, old.title, old.body); END",
+    "CREATE TRIGGER main_searchentry_fts_update AFTER UPDATE ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts, rowid, kind, title, body) VALUES ('delete', old.id, old.kind, old.title, old.body); "
+    "INSERT INTO main_searchentry_fts(rowid, kind, title, body) VALUES (new.id, new.kind, new.title, new.body); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER main_searchentry_fts_update",
+    "DROP TRIGGER main_searchentry_fts_delete",
+    "DROP TRIGGER main_searchentry_fts_insert",
+    "DROP TABLE main_searchentry_fts",
+]
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE main_searchentry ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED",
+    "CREATE INDEX main_searchentry_vector_idx ON main_searchentry USING GIN (search_vector)",
+]
+POSTGRESQL_REVERSE = [
+    "DROP INDEX main_searchentry_vector_idx",
+    "ALTER TABLE main_searchentry DROP COLUMN search_vector",
+]
+
+# Existing records are indexed with the same fields as main.search.SEARCH_FIELDS.
+POPULATE = [
+    "INSERT INTO main_searchentry (kind, object_id, title, body) SELECT 'event', id, name, description || ' ' || location FROM main_event",
+    "INSERT INTO main_searchentry (kind, object_id, title, body) SELECT 'task', id, name, description FROM main_task",
+    "INSERT INTO main_searchentry (kind, object_id, title, body) SELECT 'skill', id, name, description FROM main_skill",
+]
+
+
+def create_full_text_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}.get(schema_editor.connection.vendor, [])
+    for sql in statements + POPULATE:
+        schema_editor.execute(sql)
+
+
+def drop_full_text_index(apps, schema_editor):
+    for sql in {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0034_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event', 'Event'), ('task', 'Task'), ('skill', 'Skill')], help_text='The kind of the indexed record.', max_length=10, verbose_name='Kind')),
+                ('object_id', models.IntegerField(help_text='The primary key of the indexed record.', verbose_name='Object ID')),
+                ('title', models.CharField(help_text='The name of the indexed record.', max_length=254, verbose_name='Title')),
+                ('body', models.TextField(blank=True, help_text="The rest of the indexed record's searchable text.", verbose_name='Body')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry')],
+            },
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+    ]
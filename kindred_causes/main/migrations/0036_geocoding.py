@@ -0,0 +1,147 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:57
+
+import csv
+import re
+from pathlib import Path
+from django.conf import settings
+from django.db import migrations, models
+
+
+# The ZIP code centroids bundled with the app; a fuller table can be loaded with geocode_locations --centroids.
+CENTROIDS = Path(__file__).resolve().parent.parent / 'data' / 'zip_centroids.csv'
+
+
+def load_centroids(apps, schema_editor):
+    ZipCentroid = apps.get_model('main', 'ZipCentroid')
+    with open(CENTROIDS, newline='') as file:
+        ZipCentroid.objects.bulk_create([
+            ZipCentroid(
+                zipcode=row['zipcode'], city=row['city'].strip().lower(), state=row['state'].upper(),
+                latitude=float(row['latitude']), longitude=float(row['longitude']),
+            )
+            for row in csv.DictReader(file)
+        ])
+
+
+# A frozen copy of main.geo as of this migration, so later changes to the app cannot change what it does.
+CELL_DEGREES = 0.5
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+def geocell(latitude, longitude):
+    columns, rows = round(360 / CELL_DEGREES), round(180 / CELL_DEGREES)
+    row = min(rows - 1, max(0, int((latitude + 90) // CELL_DEGREES)))
+    column = int((longitude + 180) // CELL_DEGREES) % columns
+    return row * columns + column
+
+
+def geocode_locations(apps, schema_editor):
+    # Records saved from now on are geocoded by signals; the existing ones are located once here, from
+    # the centroids loaded above, held in memory.
+    ZipCentroid = apps.get_model('main', 'ZipCentroid')
+    Event = apps.get_model('main', 'Event')
+    UserProfile = apps.get_model('main', 'UserProfile')
+    state_codes = {code for code, _ in UserProfile._meta.get_field('state').choices}
+
+    zipcodes, cities = {}, {}
+    for zipcode, city, state, latitude, longitude in ZipCentroid.objects.values_list('zipcode', 'city', 'state', 'latitude', 'longitude'):
+        zipcodes[zipcode] = (latitude, longitude)
+        totals = cities.setdefault(city, {}).setdefault(state, [0.0, 0.0, 0])
+        totals[0] += latitude
+        totals[1] += longitude
+        totals[2] += 1
+
+    def locate(zipcode, places):
+        if zipcode in zipcodes:
+            return zipcodes[zipcode]
+        for city, state in places:
+            states = cities.get(city, {})
+            found = states.get(state) if state else max(states.values(), key=lambda totals: totals[2], default=None)
+            if found:
+                return found[0] / found[2], found[1] / found[2]
+        return None
+
+    def event_query(event):
+        found = ZIP_PATTERN.findall(event.location or '')
+        state, places = None, []
+        for part in (event.location or '').split(','):
+            words = ZIP_PATTERN.sub('', part).split()
+            if words and words[-1].upper() in state_codes:
+                state = words.pop().upper()
+            if words:
+                places.append(" ".join(words).lower())
+        return (found[-1] if found else None), [(place, state) for place in places]
+
+    def profile_query(profile):
+        found = ZIP_PATTERN.findall(profile.zipcode or '')
+        city = " ".join((profile.city or '').split()).lower()
+        return (found[0] if found else None), [(city, profile.state or None)] if city else []
+
+    for model, fields, query in ((Event, ('location',), event_query), (UserProfile, ('zipcode', 'city', 'state'), profile_query)):
+        batch = []
+        for instance in model.objects.order_by('pk').only('pk', *fields).iterator(chunk_size=1000):
+            point = locate(*query(instance))
+            instance.latitude, instance.longitude = point or (None, None)
+            instance.geocell = geocell(*point) if point else None
+            batch.append(instance)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['latitude', 'longitude', 'geocell'])
+                batch = []
+        model.objects.bulk_update(batch, ['latitude', 'longitude', 'geocell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0035_searchentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZipCentroid',
+            fields=[
+                ('zipcode', models.CharField(help_text='The five digit ZIP code.', max_length=5, primary_key=True, serialize=False, verbose_name='ZIP Code')),
+                ('city', models.CharField(db_index=True, help_text="The lowercase name of the ZIP code's city.", max_length=100, verbose_name='City')),
+                ('state', models.CharField(help_text="The two letter code of the ZIP code's state.", max_length=2, verbose_name='State')),
+                ('latitude', models.FloatField(help_text='The latitude of the centre of the ZIP code area.', verbose_name='Latitude')),
+                ('longitude', models.FloatField(help_text='The longitude of the centre of the ZIP code area.', verbose_name='Longitude')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='geocell',
+            field=models.IntegerField(blank=True, editable=False, help_text="The grid cell of the Event's coordinates, see main.geo. Maintained by signals.", null=True, verbose_name='Geocell'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, help_text="The latitude of the Event's location, geocoded from it. Maintained by signals.", null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, help_text="The longitude of the Event's location, geocoded from it. Maintained by signals.", null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='geocell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, help_text="The grid cell of the user's coordinates, see main.geo. Maintained by signals.", null=True, verbose_name='Geocell'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, help_text="The latitude of the user's address, geocoded from it. Maintained by signals.", null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, help_text="The longitude of the user's address, geocoded from it. Maintained by signals.", null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['geocell', 'latitude', 'longitude', 'date'], name='event_geocell_idx'),
+        ),
+        migrations.RunPython(load_centroids, migrations.RunPython.noop),
+        migrations.RunPython(geocode_locations, migrations.RunPython.noop),
+    ]
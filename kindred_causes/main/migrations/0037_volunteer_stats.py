@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-17 21:10
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0036_geocoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VolunteerStats',
+            fields=[
+                ('user', models.OneToOneField(help_text='The volunteer these statistics describe.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='volunteer_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Volunteer')),
+                ('events_attended', models.IntegerField(default=0, help_text='The number of Events the volunteer has joined.', verbose_name='Events Attended')),
+                ('tasks_assigned', models.IntegerField(default=0, help_text='The number of Tasks the volunteer has been assigned to.', verbose_name='Tasks Assigned')),
+                ('review_count', models.IntegerField(default=0, help_text='The number of reviews of the volunteer.', verbose_name='Reviews')),
+                ('average_rating', models.FloatField(blank=True, help_text="The mean rating of the volunteer's reviews, if any.", null=True, verbose_name='Average Rating')),
+                ('skills_used', models.JSONField(blank=True, default=list, help_text="The sorted names of the Skills required by the volunteer's Tasks.", verbose_name='Skills Used')),
+                ('recent_events', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text="The id, name and date of the volunteer's most recent Events, most recent first.", verbose_name='Recent Events')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='The date and time the statistics were last computed.', verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name_plural': 'volunteer stats',
+            },
+        ),
+    ]
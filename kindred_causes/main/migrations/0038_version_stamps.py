@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0037_volunteer_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('label', models.CharField(help_text='What the stamp versions, such as a model label.', max_length=64, primary_key=True, serialize=False, verbose_name='Label')),
+                ('version', models.BigIntegerField(help_text='The time the data last changed, in nanoseconds since the epoch.', verbose_name='Version')),
+            ],
+        ),
+    ]
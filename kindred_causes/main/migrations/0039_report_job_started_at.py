@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0038_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='The date and time a worker last claimed the job.', null=True, verbose_name='Started At'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.1.5 on 2026-10-17 23:01
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# The full-text index of 0035_searchentry is rebuilt over text with accents folded by main.search, the
+# name through the new folded_title column, so matching ignores accents on PostgreSQL too. The index is
+# dropped before the column is added, since SQLite adds it by remaking the table, which drops its triggers.
+OLD_SQLITE = [
+    "CREATE VIRTUAL TABLE main_searchentry_fts USING fts5("
+    "kind, title, body, content='main_searchentry', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE TRIGGER main_searchentry_fts_insert AFTER INSERT ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(rowid, kind, title, body) VALUES (new.id, new.kind, new.title, new.body); END",
+    "CREATE TRIGGER main_searchentry_fts_delete AFTER DELETE ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts, rowid, kind, title, body) VALUES ('delete', old.id, old.kind, old.title, old.body); END",
+    "CREATE TRIGGER main_searchentry_fts_update AFTER UPDATE ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts, rowid, kind, title, body) VALUES ('delete', old.id, old.kind, old.title, old.body); "
+    "INSERT INTO main_searchentry_fts(rowid, kind, title, body) VALUES (new.id, new.kind, new.title, new.body); END",
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts) VALUES ('rebuild')",
+]
+NEW_SQLITE = [
+    "CREATE VIRTUAL TABLE main_searchentry_fts USING fts5("
+    "kind, folded_title, body, content='main_searchentry', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE TRIGGER main_searchentry_fts_insert AFTER INSERT ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(rowid, kind, folded_title, body) VALUES (new.id, new.kind, new.folded_title, new.body); END",
+    "CREATE TRIGGER main_searchentry_fts_delete AFTER DELETE ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts, rowid, kind, folded_title, body) VALUES ('delete', old.id, old.kind, old.folded_title, old.body); END",
+    "CREATE TRIGGER main_searchentry_fts_update AFTER UPDATE ON main_searchentry BEGIN "
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts, rowid, kind, folded_title, body) VALUES ('delete', old.id, old.kind, old.folded_title, old.body); "
+    "INSERT INTO main_searchentry_fts(rowid, kind, folded_title, body) VALUES (new.id, new.kind, new.folded_title, new.body); END",
+    "INSERT INTO main_searchentry_fts(main_searchentry_fts) VALUES ('rebuild')",
+]
+DROP_SQLITE = [
+    "DROP TRIGGER main_searchentry_fts_update",
+    "DROP TRIGGER main_searchentry_fts_delete",
+    "DROP TRIGGER main_searchentry_fts_insert",
+    "DROP TABLE main_searchentry_fts",
+]
+OLD_POSTGRESQL = [
+    "ALTER TABLE main_searchentry ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED",
+    "CREATE INDEX main_searchentry_vector_idx ON main_searchentry USING GIN (search_vector)",
+]
+NEW_POSTGRESQL = [
+    "ALTER TABLE main_searchentry ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', folded_title), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED",
+    "CREATE INDEX main_searchentry_vector_idx ON main_searchentry USING GIN (search_vector)",
+]
+DROP_POSTGRESQL = [
+    "DROP INDEX main_searchentry_vector_idx",
+    "ALTER TABLE main_searchentry DROP COLUMN search_vector",
+]
+
+BATCH_SIZE = 1000
+
+
+def fold_accents(text):
+    # A frozen copy of main.search.fold_accents.
+    return "".join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+
+def fold_entries(apps, schema_editor):
+    SearchEntry = apps.get_model('main', 'SearchEntry')
+    entries = SearchEntry.objects.order_by('pk').only('title', 'body')
+    batch = []
+    for entry in entries.iterator(chunk_size=BATCH_SIZE):
+        entry.folded_title = fold_accents(entry.title)
+        entry.body = fold_accents(entry.body)
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            SearchEntry.objects.bulk_update(batch, ['folded_title', 'body'])
+            batch = []
+    SearchEntry.objects.bulk_update(batch, ['folded_title', 'body'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0039_report_job_started_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': DROP_SQLITE, 'postgresql': DROP_POSTGRESQL}),
+            run({'sqlite': OLD_SQLITE, 'postgresql': OLD_POSTGRESQL}),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='folded_title',
+            field=models.CharField(blank=True, help_text='The name of the indexed record without accents, as indexed.', max_length=254, verbose_name='Folded Title'),
+        ),
+        migrations.AlterField(
+            model_name='searchentry',
+            name='body',
+            field=models.TextField(blank=True, help_text="The rest of the indexed record's searchable text, without accents.", verbose_name='Body'),
+        ),
+        # Bodies stay folded when unapplied; the old index still matches them, only not with accented queries.
+        migrations.RunPython(fold_entries, migrations.RunPython.noop),
+        migrations.RunPython(
+            run({'sqlite': NEW_SQLITE, 'postgresql': NEW_POSTGRESQL}),
+            run({'sqlite': DROP_SQLITE, 'postgresql': DROP_POSTGRESQL}),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
 from django.contrib.auth.models import User
-from .choices import EventUrgency
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from .choices import EventUrgency, ReportJobStatus, SearchKind
+from .cache_versions import bump_version
 
 # Base Model:
 class Base(models.Model):
@@ -15,6 +20,65 @@ class Base(models.Model):
         abstract = True
 
 
+class CounterBase(Base):
+    """Abstract base class for models that carry denormalized counter columns.
+
+    Counter columns are only ever written with a single UPDATE by the
+    recount() queryset methods, so a regular save() of a stale instance
+    must never write them back.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def _aggregate_subquery(queryset, outer_field, aggregate):
+    """Correlated subquery returning one aggregate per outer row, or 0 when there are no related rows.
+    """
+    subquery = queryset.filter(**{outer_field: OuterRef('pk')}).order_by().values(outer_field).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+class TaskQuerySet(models.QuerySet):
+    def recount(self):
+        """Rebuild the attendee counter of every Task in the queryset with a single UPDATE.
+
+        updated_at is refreshed too, since a changed assignment changes what the Task's pages show.
+        """
+        updated = self.update(
+            attendee_count=_aggregate_subquery(Task.attendees.through.objects.all(), 'task', Count('pk')),
+            updated_at=Now(),
+        )
+        bump_version(Task)
+        return updated
+
+
+class EventQuerySet(models.QuerySet):
+    def recount(self):
+        """Rebuild the capacity and attendance counters of every Event in the queryset with a single UPDATE.
+
+        updated_at is refreshed too, since a changed attendance changes what the Event's pages show.
+        """
+        updated = self.update(
+            capacity=_aggregate_subquery(Task.objects.all(), 'event', Sum('capacity')),
+            attendee_count=_aggregate_subquery(Event.attendees.through.objects.all(), 'event', Count('pk')),
+            unassigned_attendee_count=_aggregate_subquery(Task.attendees.through.objects.all(), 'task__event', Count('pk')),
+            updated_at=Now(),
+        )
+        # Attendance changes reach the Event only through this UPDATE, which sends no post_save.
+        bump_version(Event)
+        return updated
+
+
 # Models:
 class Skill(Base):
     """ A skill that is required at an Event and that a Volunteer can have.
@@ -25,9 +89,11 @@ class Skill(Base):
         return self.name
 
 
-class Event(Base):
+class Event(CounterBase):
     """ An Event.
     """
+    counter_fields = ('capacity', 'attendee_count', 'unassigned_attendee_count')
+
     admin = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name="admin_events", verbose_name="Event Admin", help_text="The admin who is in charge of the Event.")
     attendees = models.ManyToManyField(User, blank=True, related_name="events")
     name = models.CharField(max_length=100, null=False, blank=False, verbose_name="Name", help_text="The name of the Event.")
@@ -35,6 +101,21 @@ class Event(Base):
     location = models.CharField(max_length=254,null=False, blank=False, verbose_name="Location", help_text="The location of the event.")
     urgency = models.IntegerField(null=False, blank=False, default=EventUrgency.MEDIUM, choices=EventUrgency.choices, verbose_name="Urgency", help_text="The urgency of the event.")
     date = models.DateTimeField(null=True, blank=True, verbose_name="Date", help_text="The date and time of the Event.")
+    capacity = models.IntegerField(default=0, editable=False, verbose_name="Capacity", help_text="The total capacity of the Event's Tasks. Maintained by signals.")
+    attendee_count = models.IntegerField(default=0, editable=False, verbose_name="Attendee Count", help_text="The number of attendees of the Event. Maintained by signals.")
+    unassigned_attendee_count = models.IntegerField(default=0, editable=False, verbose_name="Unassigned Attendee Count", help_text="The number of attendee assignments across the Event's Tasks. Maintained by signals.")
+    latitude = models.FloatField(null=True, blank=True, editable=False, verbose_name="Latitude", help_text="The latitude of the Event's location, geocoded from it. Maintained by signals.")
+    longitude = models.FloatField(null=True, blank=True, editable=False, verbose_name="Longitude", help_text="The longitude of the Event's location, geocoded from it. Maintained by signals.")
+    geocell = models.IntegerField(null=True, blank=True, editable=False, verbose_name="Geocell", help_text="The grid cell of the Event's coordinates, see main.geo. Maintained by signals.")
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='event_date_idx'),
+            models.Index(fields=['urgency', 'date'], name='event_urgency_date_idx'),
+            models.Index(fields=['geocell', 'latitude', 'longitude', 'date'], name='event_geocell_idx'),
+        ]
 
     def __str__(self):
         return "{}: {}".format(self.name, self.description)
@@ -42,31 +123,13 @@ class Event(Base):
     @property
     def urgency_display(self):
         return self.get_urgency_display()
-     
-    @property
-    def capacity(self):
-        count = 0
-        for task in self.tasks.all():
-            count += task.capacity
-
-        return count
-
-    @property
-    def attendee_count(self):
-        return self.attendees.count()
-
-    @property
-    def unassigned_attendee_count(self):
-        count = 0
-        for task in self.tasks.all():
-            count += task.attendee_count
 
-        return count
 
-
-class Task(Base):
+class Task(CounterBase):
     """ A Task to be performed by Volunteers at an Event.
     """
+    counter_fields = ('attendee_count',)
+
     event = models.ForeignKey(Event, null=True, blank=True, on_delete=models.CASCADE, related_name="tasks", verbose_name="Related Event", help_text="The parent Event record this task is for.")
     attendees = models.ManyToManyField(User, blank=True, related_name="tasks")
     name = models.CharField(max_length=254, null=False, blank=False, verbose_name="Name", help_text="The name of the task.")
@@ -74,14 +137,27 @@ class Task(Base):
     capacity = models.IntegerField(null=False, blank=False, default=-1, verbose_name="Capacity", help_text="The maximum number of Volunteers the Task can hold.")
     location = models.CharField(max_length=254,null=False, blank=True, verbose_name="Location", help_text="The location of the task.")
     skills = models.ManyToManyField(Skill, blank=True)
+    attendee_count = models.IntegerField(default=0, editable=False, verbose_name="Attendee Count", help_text="The number of Volunteers assigned to the Task. Maintained by signals.")
+
+    objects = TaskQuerySet.as_manager()
 
     def __str__(self):
         return self.name
     
-    @property
-    def attendee_count(self):
-        return self.attendees.count()
-    
+
+class WaitlistEntry(Base):
+    """ A Volunteer waiting for a place on a full Task.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="waitlist", verbose_name="Related Task", help_text="The full Task the Volunteer is waiting for.")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="waitlist_entries", verbose_name="Volunteer", help_text="The Volunteer waiting for a place.")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['task', 'user'], name='unique_waitlist_entry')]
+        indexes = [models.Index(fields=['task', 'created_at', 'id'], name='waitlist_order_idx')]
+
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.task.name}"
+
 
 class Notification(Base):
     """ A notification to be sent to users.
@@ -93,6 +169,12 @@ class Notification(Base):
     subject = models.CharField(max_length=254, null=False, blank=False, verbose_name="Subject", help_text="The subject of the message.")
     body = models.TextField(max_length=254,null=False, blank=True, verbose_name="Body", help_text="The content of the message.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_inbox_idx'),
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_unread_idx'),
+        ]
+
     def __str__(self):
         return self.subject + " " + self.body
     
@@ -123,6 +205,95 @@ class EventReview(Review):
     def __str__(self):
         return self.event.name + " : " + str(self.rating)
 
+class ReportJob(Base):
+    """ A queued Event report, generated in the background and cached on disk.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="report_jobs", verbose_name="Related Event", help_text="The Event the report is for.")
+    version = models.CharField(max_length=64, verbose_name="Content Version", help_text="The version of the Event's content the report was generated from.")
+    status = models.CharField(max_length=20, default=ReportJobStatus.PENDING, choices=ReportJobStatus.choices, verbose_name="Status", help_text="The status of the report job.")
+    file_path = models.CharField(max_length=500, blank=True, verbose_name="File Path", help_text="The path of the generated report file.")
+    error = models.TextField(blank=True, verbose_name="Error", help_text="The error raised while generating the report, if any.")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Started At", help_text="The date and time a worker last claimed the job.")
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Completed At", help_text="The date and time the report finished generating.")
+
+    class Meta:
+        indexes = [models.Index(fields=['event', 'version'])]
+
+    def __str__(self):
+        return f"Report for {self.event.name} ({self.status})"
+
+
+class SearchEntry(models.Model):
+    """ The searchable text of an Event, Task or Skill, kept in sync by main.search.
+
+    The full-text index over it is created by migration, since it differs between database backends.
+    """
+    kind = models.CharField(max_length=10, choices=SearchKind.choices, verbose_name="Kind", help_text="The kind of the indexed record.")
+    object_id = models.IntegerField(verbose_name="Object ID", help_text="The primary key of the indexed record.")
+    title = models.CharField(max_length=254, verbose_name="Title", help_text="The name of the indexed record.")
+    folded_title = models.CharField(max_length=254, blank=True, verbose_name="Folded Title", help_text="The name of the indexed record without accents, as indexed.")
+    body = models.TextField(blank=True, verbose_name="Body", help_text="The rest of the indexed record's searchable text, without accents.")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_entry')]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class ZipCentroid(models.Model):
+    """ The centre of a ZIP code area, used to geocode locations offline. See main.geo.
+    """
+    zipcode = models.CharField(max_length=5, primary_key=True, verbose_name="ZIP Code", help_text="The five digit ZIP code.")
+    city = models.CharField(max_length=100, db_index=True, verbose_name="City", help_text="The lowercase name of the ZIP code's city.")
+    state = models.CharField(max_length=2, verbose_name="State", help_text="The two letter code of the ZIP code's state.")
+    latitude = models.FloatField(verbose_name="Latitude", help_text="The latitude of the centre of the ZIP code area.")
+    longitude = models.FloatField(verbose_name="Longitude", help_text="The longitude of the centre of the ZIP code area.")
+
+    def __str__(self):
+        return f"{self.zipcode} ({self.city.title()}, {self.state})"
+
+
+class VolunteerStats(models.Model):
+    """ The attendance and review history of a volunteer, summarized into one row and kept current by main.stats.
+    """
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name="volunteer_stats", verbose_name="Volunteer", help_text="The volunteer these statistics describe.")
+    events_attended = models.IntegerField(default=0, verbose_name="Events Attended", help_text="The number of Events the volunteer has joined.")
+    tasks_assigned = models.IntegerField(default=0, verbose_name="Tasks Assigned", help_text="The number of Tasks the volunteer has been assigned to.")
+    review_count = models.IntegerField(default=0, verbose_name="Reviews", help_text="The number of reviews of the volunteer.")
+    average_rating = models.FloatField(null=True, blank=True, verbose_name="Average Rating", help_text="The mean rating of the volunteer's reviews, if any.")
+    skills_used = models.JSONField(default=list, blank=True, verbose_name="Skills Used", help_text="The sorted names of the Skills required by the volunteer's Tasks.")
+    recent_events = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder, verbose_name="Recent Events", help_text="The id, name and date of the volunteer's most recent Events, most recent first.")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At", help_text="The date and time the statistics were last computed.")
+
+    class Meta:
+        verbose_name_plural = "volunteer stats"
+
+    def __str__(self):
+        return f"Stats for {self.user}"
+
+    def previous_events(self, exclude_event_id=None):
+        """ The recent Events as unsaved Event instances carrying only their id, name and date.
+        """
+        return [
+            Event(pk=entry['id'], name=entry['name'], date=parse_datetime(entry['date']) if entry['date'] else None)
+            for entry in self.recent_events
+            if entry['id'] != exclude_event_id
+        ]
+
+
+class VersionStamp(models.Model):
+    """ The version of data that processes cache derived values of, such as rendered fragments. See main.cache_versions.
+
+    Stamps live in the database, so every process sees a change as soon as the transaction that made it commits.
+    """
+    label = models.CharField(max_length=64, primary_key=True, verbose_name="Label", help_text="What the stamp versions, such as a model label.")
+    version = models.BigIntegerField(verbose_name="Version", help_text="The time the data last changed, in nanoseconds since the epoch.")
+
+    def __str__(self):
+        return f"{self.label} @ {self.version}"
+
+
 class AvatarOption(Base):
     """A model to store available avatar options."""
     name = models.CharField(max_length=100, verbose_name="Avatar Name", help_text="The name of the avatar.")
@@ -162,6 +333,9 @@ class UserProfile(Base):
     end_availability = models.DateField(blank=True, null=True) 
     skills = models.ManyToManyField(Skill, blank=True) 
     avatar = models.ForeignKey(AvatarOption, on_delete=models.SET_NULL, blank=True, null=True, related_name="users", verbose_name="Avatar", help_text="The avatar selected by the user.")
+    latitude = models.FloatField(null=True, blank=True, editable=False, verbose_name="Latitude", help_text="The latitude of the user's address, geocoded from it. Maintained by signals.")
+    longitude = models.FloatField(null=True, blank=True, editable=False, verbose_name="Longitude", help_text="The longitude of the user's address, geocoded from it. Maintained by signals.")
+    geocell = models.IntegerField(null=True, blank=True, editable=False, db_index=True, verbose_name="Geocell", help_text="The grid cell of the user's coordinates, see main.geo. Maintained by signals.")
 
     @property
     def email(self):
@@ -0,0 +1,70 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from .context_processors import invalidate_unread_notifications
+from .jobs import run_in_background
+from .models import Event, Notification
+from .utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out_notification(event_id, subject, body, created_by_id=None, batch_size=None):
+    """ Sends a Notification to every attendee of an Event.
+
+    Notifications are inserted with bulk_create in batches, all inside one transaction, and the
+    recipients' cached unread counts are invalidated once the transaction commits.
+
+    :param int event_id: The primary key of the Event whose attendees are notified.
+    :param str subject: The subject of the Notification.
+    :param str body: The body of the Notification.
+    :param int created_by_id: The primary key of the sending user, if any.
+    :param int batch_size: The number of rows per INSERT, defaults to NOTIFICATION_BATCH_SIZE.
+    :return int: The number of notifications sent.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    event = Event.objects.get(pk=event_id)
+    sent = 0
+
+    with transaction.atomic():
+        attendee_ids = event.attendees.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+        for batch in chunked(attendee_ids, batch_size):
+            Notification.objects.bulk_create([
+                Notification(
+                    event=event,
+                    recipient_id=attendee_id,
+                    subject=subject,
+                    body=body,
+                    is_read=False,
+                    created_by_id=created_by_id,
+                    updated_by_id=created_by_id,
+                )
+                for attendee_id in batch
+            ], batch_size=batch_size)
+            transaction.on_commit(lambda batch=batch: invalidate_unread_notifications(*batch))
+            sent += len(batch)
+
+    logger.info("Sent %d notifications for event %d.", sent, event.pk)
+    return sent
+
+
+def send_event_notification(event, subject, body, created_by=None):
+    """ Notifies an Event's attendees, in the background when the audience is large.
+
+    A background fan-out is not stored, so it is lost if the process stops before it commits; its
+    notifications are sent all or none, and the sender can send it again.
+
+    :param Event event: The Event whose attendees are notified.
+    :param str subject: The subject of the Notification.
+    :param str body: The body of the Notification.
+    :param User created_by: The sending user, if any.
+    :return tuple: The number of recipients, and whether sending was handed to the background.
+    """
+    created_by_id = created_by.pk if created_by is not None else None
+    audience = event.attendees.count()
+
+    if audience <= settings.NOTIFICATION_BACKGROUND_THRESHOLD:
+        return fan_out_notification(event.pk, subject, body, created_by_id), False
+
+    transaction.on_commit(lambda: run_in_background(fan_out_notification, event.pk, subject, body, created_by_id))
+    return audience, True
@@ -0,0 +1,52 @@
+import base64
+from datetime import datetime
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+
+class KeysetPage:
+    """ One page of a keyset-paginated queryset, plus the cursor of the next page.
+    """
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(obj, field):
+    raw = f"{getattr(obj, field).isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except ValueError:
+        raise BadRequest("Invalid cursor.")
+
+
+def keyset_paginate(queryset, cursor=None, page_size=50, field='created_at'):
+    """ Returns the page of a queryset that follows a cursor, newest first.
+
+    Rows are ordered by (field, pk) descending and the page starts strictly after the cursor's
+    row, so each page is a single index range scan no matter how deep the user pages.
+
+    :param QuerySet queryset: The rows to paginate.
+    :param str cursor: The cursor returned with the previous page, or None for the first page.
+    :param int page_size: The maximum number of rows per page.
+    :param str field: The datetime field to order by.
+    :return KeysetPage: The page.
+    """
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(items[page_size - 1], field) if len(items) > page_size else None
+    return KeysetPage(items[:page_size], next_cursor)
@@ -0,0 +1,235 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from .roles import ADMIN, has_role
+
+
+# The profile of the request being handled by the current thread, if it was sampled.
+_current_profile = ContextVar('request_profile', default=None)
+
+# Placeholder runs such as "IN (%s, %s, %s)" differ only in length, so they are collapsed before hashing.
+_PLACEHOLDER_RUN = re.compile(r"%s(?:\s*,\s*%s)+")
+
+
+def query_fingerprint(sql):
+    """ Identifies a query by its SQL with the parameters left out, so repeats of one query share it.
+
+    :param str sql: The SQL as sent to the driver, with placeholders for the parameters.
+    :return str: A short hash of the normalized SQL.
+    """
+    normalized = _PLACEHOLDER_RUN.sub("%s", " ".join(sql.split()))
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+class RequestProfile:
+    """ The SQL and template timings of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """ Database execute wrapper, timing every query run while the profile is capturing.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.query_count += 1
+            fingerprint = query_fingerprint(sql)
+            self.fingerprints[fingerprint] += 1
+            self.samples.setdefault(fingerprint, sql[:300])
+
+    @contextmanager
+    def capture(self):
+        """ Records the queries and template renders of the enclosed block.
+        """
+        token = _current_profile.set(self)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield
+        finally:
+            _current_profile.reset(token)
+
+    @contextmanager
+    def rendering(self):
+        """ Times a template render; templates rendered from inside another are counted once.
+        """
+        self._template_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template_time += time.perf_counter() - start
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    @property
+    def duplicates(self):
+        """ The fingerprints of queries run more than once, with their counts.
+        """
+        return {fingerprint: count for fingerprint, count in self.fingerprints.items() if count > 1}
+
+    def server_timing(self):
+        """ The profile as a Server-Timing header value, in milliseconds.
+
+        SQL run while a template renders is counted in both the db and tpl metrics.
+        """
+        duplicates = sum(count - 1 for count in self.duplicates.values())
+        return ", ".join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'dup;desc="{duplicates} repeated queries"',
+            f'total;dur={self.duration * 1000:.1f}',
+        ])
+
+
+class RequestStats:
+    """ Rolling per-route statistics of the most recent profiled requests in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(self._new_window)
+        self._samples = {}
+
+    @staticmethod
+    def _new_window():
+        return deque(maxlen=settings.REQUEST_PROFILING_WINDOW)
+
+    def record(self, route, profile):
+        entry = (profile.duration, profile.query_count, profile.sql_time, profile.template_time, profile.duplicates)
+        with self._lock:
+            self._routes[route].append(entry)
+            for fingerprint in entry[4]:
+                self._samples.setdefault(fingerprint, profile.samples[fingerprint])
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._samples.clear()
+
+    def snapshot(self):
+        """ Summaries of every route seen, slowest 95th percentile first.
+
+        :return list: One dict per route with request counts, latency percentiles, SQL and template
+            averages, and the queries most often repeated within a request.
+        """
+        with self._lock:
+            routes = {route: list(window) for route, window in self._routes.items()}
+            samples = dict(self._samples)
+
+        summaries = []
+        for route, entries in routes.items():
+            durations = sorted(entry[0] for entry in entries)
+            repeated = Counter()
+            for entry in entries:
+                repeated.update(entry[4])
+            summaries.append({
+                'route': route,
+                'requests': len(entries),
+                'p50_ms': round(durations[len(durations) // 2] * 1000, 1),
+                'p95_ms': round(durations[int(len(durations) * 0.95)] * 1000, 1),
+                'avg_queries': round(sum(entry[1] for entry in entries) / len(entries), 1),
+                'max_queries': max(entry[1] for entry in entries),
+                'avg_sql_ms': round(sum(entry[2] for entry in entries) / len(entries) * 1000, 1),
+                'avg_template_ms': round(sum(entry[3] for entry in entries) / len(entries) * 1000, 1),
+                'duplicate_queries': [
+                    {'fingerprint': fingerprint, 'executions': count, 'sql': samples.get(fingerprint, '')}
+                    for fingerprint, count in repeated.most_common(5)
+                ],
+            })
+        summaries.sort(key=lambda summary: summary['p95_ms'], reverse=True)
+        return summaries
+
+
+request_stats = RequestStats()
+
+
+class RequestProfilingMiddleware:
+    """ Profiles a sample of requests: SQL count and time, template render time and repeated queries.
+
+    Every sample is added to request_stats. Sampled responses to admins, or to anyone when DEBUG is on,
+    also get a Server-Timing header, which would otherwise tell anyone how much work a page costs. Streamed
+    responses are profiled until their content is exhausted and get no header, since theirs are sent first.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        with profile.capture():
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._profiled_stream(response.streaming_content, profile, route)
+            return response
+
+        profile.finish()
+        request_stats.record(route, profile)
+        # The user was set by AuthenticationMiddleware, further down the stack.
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and has_role(user, ADMIN)):
+            response['Server-Timing'] = profile.server_timing()
+        return response
+
+    @staticmethod
+    def _profiled_stream(content, profile, route):
+        iterator = iter(content)
+        while True:
+            with profile.capture():
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+            yield chunk
+        profile.finish()
+        request_stats.record(route, profile)
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return super().render(context, request)
+        with profile.rendering():
+            return super().render(context, request)
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """ The Django template backend, timing renders for RequestProfilingMiddleware.
+    """
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,289 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from .models import Event, Task
+from .stats import volunteer_stats
+from .utils import chunked
+
+
+@dataclass
+class ReportAttendee:
+    """ An attendee assigned to a Task, as shown in an Event report.
+    """
+    user: User
+    full_name: str
+    skills: list = field(default_factory=list)
+    previous_events: list = field(default_factory=list)
+    # Whether the attendee has previous Events older than those listed, see VOLUNTEER_STATS_RECENT_EVENTS.
+    earlier_events: bool = False
+
+
+@dataclass
+class ReportTask:
+    """ A Task of the reported Event with its required skills and assigned attendees.
+    """
+    task: Task
+    skills: list = field(default_factory=list)
+    attendees: list = field(default_factory=list)
+
+
+@dataclass
+class EventReport:
+    """ Everything the CSV and PDF Event reports render, loaded up front.
+    """
+    event: Event
+    tasks: list = field(default_factory=list)
+    reviews: list = field(default_factory=list)
+
+
+def build_event_report(pk):
+    """ Collects an Event with its tasks, attendees, skills, previous events and reviews.
+
+    Runs a fixed number of queries regardless of how many tasks or attendees the Event has.
+
+    :param int pk: The primary key of the Event.
+    :return EventReport: The report model rendered by the PDF export.
+    """
+    event = Event.objects.get(pk=pk)
+    tasks = list(
+        event.tasks.order_by('pk').prefetch_related(
+            Prefetch('skills'),
+            Prefetch('attendees', queryset=User.objects.order_by('pk')),
+        )
+    )
+    reviews = list(event.event_reviews.order_by('-created_at'))
+
+    user_ids = {user.pk for task in tasks for user in task.attendees.all()}
+    user_skills, previous_events = _load_attendee_details(user_ids, event.pk)
+
+    report = EventReport(event=event, reviews=reviews)
+    for task in tasks:
+        report_task = ReportTask(task=task, skills=[skill.name for skill in task.skills.all()])
+        for user in task.attendees.all():
+            report_task.attendees.append(_report_attendee(user, user_skills, previous_events))
+        report.tasks.append(report_task)
+
+    return report
+
+
+def render_event_report_pdf(report, file):
+    """ Draws the PDF Event report into a file-like object.
+
+    :param EventReport report: The report to render.
+    :param file: A writable binary file-like object.
+    """
+    event = report.event
+
+    p = canvas.Canvas(file, pagesize=letter)
+    width, height = letter
+    y = height - 50
+
+    def draw_line(p, y, txt, font="Helvetica", size=12, bold=False, indent=0):
+        if bold:
+            p.setFont("Helvetica-Bold", size)
+        else:
+            p.setFont(font, size)
+        p.drawString(50 + indent, y, txt)
+        return y - 18
+
+    # Event Summary
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, y, f"Event Report: {event.name}")
+    y -= 30
+
+    y = draw_line(p, y, f"Description: {event.description}")
+    y = draw_line(p, y, f"Location: {event.location}")
+    y = draw_line(p, y, f"Urgency: {event.get_urgency_display()}")
+    if event.date:
+        y = draw_line(p, y, f"Date: {event.date.strftime('%Y-%m-%d %H:%M')}")
+    y = draw_line(p, y, f"Total Capacity: {event.capacity}")
+    y = draw_line(p, y, f"Total Attendees: {event.attendee_count}")
+    y -= 10
+
+    # Tasks Section
+    y = draw_line(p, y, "Tasks", bold=True, size=14)
+    for report_task in report.tasks:
+        task = report_task.task
+        if y < 120:
+            p.showPage()
+            y = height - 50
+
+        y = draw_line(p, y, f"- {task.name}", bold=True, indent=10)
+        y = draw_line(p, y, f"  Description: {task.description}", indent=10)
+        y = draw_line(p, y, f"  Location: {task.location}", indent=10)
+        y = draw_line(p, y, f"  Capacity: {task.capacity}", indent=10)
+        skills_str = ", ".join(report_task.skills) or "None"
+        y = draw_line(p, y, f"  Required Skills: {skills_str}", indent=10)
+
+        y = draw_line(p, y, "  Assigned Attendees:", indent=10)
+        if not report_task.attendees:
+            y = draw_line(p, y, "    (None)", indent=20)
+        else:
+            for attendee in report_task.attendees:
+                skills_str = f" (Skills: {', '.join(attendee.skills)})" if attendee.skills else ""
+                y = draw_line(p, y, f"    • {attendee.full_name}{skills_str}", indent=20)
+
+                if attendee.previous_events:
+                    for prev_event in attendee.previous_events:
+                        name_date = f"{prev_event.name} ({prev_event.date.strftime('%Y-%m-%d') if prev_event.date else 'No date'})"
+                        y = draw_line(p, y, f"       - {name_date}", indent=30)
+                        if y < 100:
+                            p.showPage()
+                            y = height - 50
+                else:
+                    y = draw_line(p, y, "       - (No previous events)", indent=30)
+                if attendee.earlier_events:
+                    y = draw_line(p, y, "       - (and earlier events)", indent=30)
+
+                if y < 100:
+                    p.showPage()
+                    y = height - 50
+
+    # Reviews Section
+    if y < 150:
+        p.showPage()
+        y = height - 50
+
+    y = draw_line(p, y, "Event Reviews", bold=True, size=14)
+
+    if not report.reviews:
+        y = draw_line(p, y, "No reviews submitted.", indent=10)
+    else:
+        for review in report.reviews:
+            y = draw_line(p, y, f"- Rating: {review.rating}/5", bold=True, indent=10)
+            y = draw_line(p, y, f"  {review.comments}", indent=10)
+            y -= 5
+
+            if y < 100:
+                p.showPage()
+                y = height - 50
+
+    p.showPage()
+    p.save()
+
+
+def iter_event_report_rows(event, chunk_size=None):
+    """ Yields the rows of the CSV Event report one at a time.
+
+    Tasks, assignments and reviews are read with server-side iterators and attendee details are
+    loaded one chunk of assignments at a time, so memory stays flat however large the Event is.
+    The assignments of all Tasks are read with one iterator, walked alongside the Tasks, so the
+    number of queries depends on the number of chunks only.
+
+    :param Event event: The Event to report on.
+    :param int chunk_size: The number of rows fetched from the database at once, REPORT_CHUNK_SIZE by default.
+    """
+    chunk_size = chunk_size or settings.REPORT_CHUNK_SIZE
+
+    # Section: Event Summary
+    yield ["Event Summary"]
+    yield ["Name", event.name]
+    yield ["Description", event.description]
+    yield ["Location", event.location]
+    yield ["Urgency", event.get_urgency_display()]
+    yield ["Date", event.date.strftime('%Y-%m-%d %H:%M') if event.date else "N/A"]
+    yield ["Total Capacity", event.capacity]
+    yield ["Total Attendees", event.attendee_count]
+    yield []
+
+    # Section: Tasks
+    yield ["Tasks"]
+    yield ["Name", "Description", "Location", "Capacity", "Required Skills", "Assigned Attendees", "Attendee Skills", "Attendee Previous Events"]
+
+    tasks = event.tasks.order_by('pk').prefetch_related('skills').iterator(chunk_size=chunk_size)
+    assignments = Task.attendees.through.objects.filter(task__event=event) \
+        .select_related('user') \
+        .order_by('task_id', 'user_id') \
+        .iterator(chunk_size=chunk_size)
+    groups = groupby(_iter_report_attendees(assignments, event.pk, chunk_size), key=itemgetter(0))
+    group = next(groups, None)
+
+    for task in tasks:
+        task_columns = [
+            task.name,
+            task.description,
+            task.location,
+            task.capacity,
+            ", ".join(skill.name for skill in task.skills.all()) or "None",
+        ]
+        # Skip assignments of Tasks deleted since the Tasks were read.
+        while group is not None and group[0] < task.pk:
+            group = next(groups, None)
+
+        if group is None or group[0] != task.pk:
+            yield task_columns + ["(None)", "", ""]
+            continue
+
+        for _, attendee in group[1]:
+            yield task_columns + [
+                attendee.full_name,
+                ", ".join(attendee.skills) or "None",
+                ", ".join(
+                    [f"{e.name} ({e.date.strftime('%Y-%m-%d') if e.date else 'No date'})" for e in attendee.previous_events]
+                    + (["and earlier events"] if attendee.earlier_events else [])
+                ) or "None",
+            ]
+        group = next(groups, None)
+
+    yield []
+
+    # Section: Reviews
+    yield ["Event Reviews"]
+    yield ["Rating", "Comments"]
+
+    reviewed = False
+    for review in event.event_reviews.order_by('-created_at').iterator(chunk_size=chunk_size):
+        reviewed = True
+        yield [review.rating, review.comments]
+
+    if not reviewed:
+        yield ["None", "No reviews submitted."]
+
+
+def _iter_report_attendees(assignments, event_pk, chunk_size):
+    """ Yields (task id, ReportAttendee) for each assignment, loading attendee details a chunk at a time.
+    """
+    for chunk in chunked(assignments, chunk_size):
+        user_skills, previous_events = _load_attendee_details([row.user_id for row in chunk], event_pk)
+        for row in chunk:
+            yield row.task_id, _report_attendee(row.user, user_skills, previous_events)
+
+
+def _report_attendee(user, user_skills, previous_events):
+    events, earlier = previous_events[user.pk]
+    return ReportAttendee(
+        user=user,
+        full_name=user.get_full_name() or user.username,
+        skills=sorted(user_skills[user.pk]),
+        previous_events=events,
+        earlier_events=earlier,
+    )
+
+
+def _load_attendee_details(user_ids, event_pk):
+    """ Loads the skills and previous events of a set of attendees from their VolunteerStats, one row each.
+
+    Only the VOLUNTEER_STATS_RECENT_EVENTS most recent previous events are kept in the stats, so only
+    those are listed, with a flag for attendees who have earlier ones.
+
+    :param user_ids: The primary keys of the attendees.
+    :param int event_pk: The primary key of the reported Event, excluded from previous events.
+    :return tuple: Skill names by user id, and by user id the previous Events (most recent first) and
+        whether there are earlier ones.
+    """
+    limit = settings.VOLUNTEER_STATS_RECENT_EVENTS
+    user_skills = defaultdict(set)
+    previous_events = defaultdict(lambda: ([], False))
+    for user_id, stats in volunteer_stats(user_ids).items():
+        user_skills[user_id].update(stats.skills_used)
+        events = stats.previous_events(exclude_event_id=event_pk)
+        # The stats keep one Event more than is listed, so the reported Event can be left out.
+        earlier = len(events) > limit or stats.events_attended > len(stats.recent_events)
+        previous_events[user_id] = (events[:limit], earlier)
+    return user_skills, previous_events
@@ -0,0 +1,75 @@
+import functools
+from django.contrib.auth.mixins import AccessMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+
+
+ADMIN = "Admin"
+VOLUNTEER = "Volunteer"
+
+
+def user_roles(user):
+    """ The names of the groups a user belongs to.
+
+    Loaded with a single query and memoized on the user object, which Django builds once per
+    request, so every view, mixin and template of the request shares the same lookup.
+
+    :param User user: The user, possibly anonymous.
+    :return frozenset: The user's group names.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    try:
+        return user._role_names
+    except AttributeError:
+        user._role_names = frozenset(user.groups.values_list('name', flat=True))
+        return user._role_names
+
+
+def has_role(user, role):
+    return role in user_roles(user)
+
+
+class RoleRequiredMixin(AccessMixin):
+    """ Restricts a view to members of a group.
+
+    Unauthenticated users are sent to login and users without the role are redirected home. With
+    raise_exception set, both are answered with 403 Forbidden instead, e.g. for JSON endpoints.
+    """
+    required_role = None
+
+    def dispatch(self, request, *args, **kwargs):
+        """Handles authorization
+        """
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        if not has_role(request.user, self.required_role):
+            if self.raise_exception:
+                raise PermissionDenied
+            return HttpResponseRedirect(reverse('home'))
+
+        return super().dispatch(request, *args, **kwargs)
+
+
+class AdminRequiredMixin(RoleRequiredMixin):
+    required_role = ADMIN
+
+
+def role_required(role):
+    """ Restricts a function view to members of a group.
+
+    Unauthenticated users are sent to login and users without the role are answered with 403 Forbidden.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if not has_role(request.user, role):
+                raise PermissionDenied
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
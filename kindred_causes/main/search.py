@@ -0,0 +1,228 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from .choices import SearchKind
+from .models import Event, SearchEntry, Skill, Task
+from .roles import ADMIN, has_role
+from .utils import chunked
+
+
+# The model of each kind of record and its searched fields; the first is the title, the rest are the body.
+SEARCH_FIELDS = {
+    SearchKind.EVENT: (Event, ('name', 'description', 'location')),
+    SearchKind.TASK: (Task, ('name', 'description')),
+    SearchKind.SKILL: (Skill, ('name', 'description')),
+}
+_KINDS = {model: kind for kind, (model, _) in SEARCH_FIELDS.items()}
+
+# Terms of a query used, and the length the term being typed needs before it is matched as a prefix.
+MAX_TERMS = 8
+MIN_PREFIX_LENGTH = 2
+
+# The full-text index itself lives outside the ORM; see migrations 0035_searchentry and 0040_search_accents.
+FTS_TABLE = f"{SearchEntry._meta.db_table}_fts"
+
+
+@dataclass
+class SearchResult:
+    """ A record matching a search, best match first.
+    """
+    kind: str
+    object_id: int
+    title: str
+
+    @property
+    def kind_label(self):
+        return SearchKind(self.kind).label
+
+    @property
+    def url(self):
+        if self.kind == SearchKind.EVENT:
+            return reverse('view_event', kwargs={'pk': self.object_id})
+        if self.kind == SearchKind.TASK:
+            return reverse('view_task', kwargs={'pk': self.object_id})
+        return f"{reverse('event_browser')}?skill={self.object_id}"
+
+
+def search_kinds(user):
+    """ The kinds of records a user can open from search results; Task pages are only for admins.
+    """
+    if has_role(user, ADMIN):
+        return list(SearchKind.values)
+    return [SearchKind.EVENT, SearchKind.SKILL]
+
+
+def fold_accents(text):
+    """ The text without accents or other combining marks.
+
+    Compatibility characters such as ligatures are spelled out too, so "Café" and "cafe" are indexed and
+    searched alike on every database backend.
+    """
+    return "".join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def _search_entry(kind, pk, title, body):
+    title = title or ''
+    body = fold_accents(" ".join(value or '' for value in body))
+    return SearchEntry(kind=kind, object_id=pk, title=title, folded_title=fold_accents(title), body=body)
+
+
+def _entry(instance):
+    kind = _KINDS[type(instance)]
+    title, *body = (getattr(instance, name) for name in SEARCH_FIELDS[kind][1])
+    return _search_entry(kind, instance.pk, title, body)
+
+
+def index_objects(instances):
+    """ Adds or refreshes the search entries of Events, Tasks and Skills, with one query per batch.
+
+    Anything else is ignored, so callers can pass whatever they saved.
+    """
+    entries = [_entry(instance) for instance in instances if type(instance) in _KINDS]
+    for batch in chunked(entries, settings.SEARCH_INDEX_BATCH_SIZE):
+        SearchEntry.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['title', 'folded_title', 'body'],
+        )
+
+
+def unindex_objects(model, pks):
+    """ Removes the search entries of deleted records.
+    """
+    if model in _KINDS:
+        SearchEntry.objects.filter(kind=_KINDS[model], object_id__in=pks).delete()
+
+
+def rebuild_search_index():
+    """ Rebuilds every search entry from the Events, Tasks and Skills, for data written without signals.
+
+    :return int: The number of entries.
+    """
+    SearchEntry.objects.all().delete()
+    count = 0
+    for kind, (model, fields) in SEARCH_FIELDS.items():
+        rows = model.objects.order_by().values_list('pk', *fields).iterator(chunk_size=settings.SEARCH_INDEX_BATCH_SIZE)
+        for batch in chunked(rows, settings.SEARCH_INDEX_BATCH_SIZE):
+            SearchEntry.objects.bulk_create([_search_entry(kind, pk, title, body) for pk, title, *body in batch])
+            count += len(batch)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def query_terms(text):
+    """ The terms of a search query, and whether the last one is still being typed and matched as a prefix.
+
+    Terms are runs of letters and digits, so a query cannot inject full-text query syntax. Accents are
+    folded as in the index.
+    """
+    terms = re.findall(r"\w+", fold_accents(text or '').lower())[:MAX_TERMS]
+    prefix = bool(terms) and not text[-1:].isspace()
+    if prefix and len(terms[-1]) < MIN_PREFIX_LENGTH:
+        # One letter prefixes match too much to be useful.
+        terms.pop()
+        prefix = False
+    return terms, prefix
+
+
+def _sqlite_match(terms, prefix, kinds, names_only=False):
+    # Terms only match names and descriptions, so a query for "event" does not match the kind column.
+    terms = " ".join(f'"{term}"' for term in terms) + ("*" if prefix else "")
+    columns = "folded_title" if names_only else "folded_title body"
+    return f"{{{columns}}} : ({terms}) AND kind : ({' OR '.join(kinds)})"
+
+
+def _postgresql_match(terms, prefix, kinds, names_only=False):
+    # Names are indexed with weight A, so a term labelled A only matches names.
+    weight = "A" if names_only else ""
+    labelled = [f"{term}:{weight}" if weight else term for term in terms]
+    if prefix:
+        labelled[-1] = f"{terms[-1]}:*{weight}"
+    return " & ".join(labelled)
+
+
+def _sqlite_search(name_match, match, kinds, candidates, limit):
+    # FTS5 yields the newest matches first cheaply, so only the latest candidates are ranked, by how many
+    # terms match the name: bm25() would read statistics over every match, which is slow for common terms.
+    # The latest matches in names are candidates too, so many newer matches in descriptions cannot hide
+    # an older name. highlight() marks each matched term in the name with char(1).
+    candidate_sql = (
+        f"SELECT * FROM (SELECT rowid AS id, highlight({FTS_TABLE}, 1, char(1), '') AS marked FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s)"
+    )
+    sql = (
+        f"SELECT e.kind, e.object_id, e.title FROM ("
+        f"SELECT id, MAX(length(marked) - length(replace(marked, char(1), ''))) AS marks FROM ("
+        f"{candidate_sql} UNION ALL {candidate_sql}"
+        f") GROUP BY id"
+        f") m JOIN {SearchEntry._meta.db_table} e ON e.id = m.id ORDER BY m.marks DESC, e.id DESC LIMIT %s"
+    )
+    return sql, [name_match, candidates, match, candidates, limit]
+
+
+def _postgresql_search(name_match, match, kinds, candidates, limit):
+    table = SearchEntry._meta.db_table
+    placeholders = ", ".join(["%s"] * len(kinds))
+    candidate_sql = (
+        f"(SELECT id FROM {table} WHERE search_vector @@ to_tsquery('simple', %s) AND kind IN ({placeholders}) "
+        f"ORDER BY id DESC LIMIT %s)"
+    )
+    sql = (
+        f"SELECT e.kind, e.object_id, e.title FROM ({candidate_sql} UNION {candidate_sql}) m "
+        f"JOIN {table} e ON e.id = m.id "
+        f"ORDER BY ts_rank(e.search_vector, to_tsquery('simple', %s)) DESC, e.id DESC LIMIT %s"
+    )
+    return sql, [name_match, *kinds, candidates, match, *kinds, candidates, match, limit]
+
+
+_BACKENDS = {
+    'sqlite': (_sqlite_match, _sqlite_search),
+    'postgresql': (_postgresql_match, _postgresql_search),
+}
+
+
+def search(text, kinds=SearchKind.values, limit=10):
+    """ Searches the names and descriptions of Events, Tasks and Skills, and the locations of Events.
+
+    Every term must match, the last one as a prefix while it is being typed. The most recent
+    SEARCH_CANDIDATES matches in names and the most recent SEARCH_CANDIDATES matches anywhere are
+    ranked, matches in names before matches in descriptions.
+
+    :param str text: The query as typed.
+    :param kinds: The kinds of records to search, see SearchKind.
+    :param int limit: The most results to return.
+    :return list: SearchResults, best match first.
+    """
+    terms, prefix = query_terms(text)
+    if not terms or not kinds:
+        return []
+    match, build = _BACKENDS[connection.vendor]
+    kinds = list(kinds)
+    sql, params = build(
+        match(terms, prefix, kinds, names_only=True), match(terms, prefix, kinds), kinds,
+        max(limit, settings.SEARCH_CANDIDATES), limit,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [SearchResult(*row) for row in cursor.fetchall()]
+
+
+def matching_ids(kind, text):
+    """ A subquery of the primary keys of every record of a kind matching a search, to filter a queryset by.
+
+    :return RawSQL: For use as field__in, or None when the query has no terms.
+    """
+    terms, prefix = query_terms(text)
+    if not terms:
+        return None
+    match = _BACKENDS[connection.vendor][0](terms, prefix, [kind])
+    table = SearchEntry._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = f"SELECT e.object_id FROM {FTS_TABLE} JOIN {table} e ON e.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s AND e.kind = %s"
+    else:
+        sql = f"SELECT object_id FROM {table} WHERE search_vector @@ to_tsquery('simple', %s) AND kind = %s"
+    return RawSQL(sql, [match, kind])
@@ -0,0 +1,341 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import AttendeeReview, Event, EventReview, Notification, Skill, Task, UserProfile, VolunteerStats
+from .cache_versions import bump_version
+from .context_processors import invalidate_profile, invalidate_unread_notifications
+from .geo import GEO_FIELDS, SOURCE_FIELDS, geocode_objects
+from .matching import invalidate_volunteer_index
+from .search import index_objects, unindex_objects
+from .stats import refresh_volunteer_stats
+
+
+# Event/Task counter maintenance:
+def _recount(task_ids=(), event_ids=()):
+    """Rebuild the counters of the given Tasks and Events.
+    """
+    task_ids = {pk for pk in task_ids if pk is not None}
+    event_ids = {pk for pk in event_ids if pk is not None}
+    if task_ids:
+        Task.objects.filter(pk__in=task_ids).recount()
+    if event_ids:
+        Event.objects.filter(pk__in=event_ids).recount()
+
+
+@receiver(m2m_changed, sender=Event.attendees.through)
+def event_attendees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps Event.attendee_count in sync when attendees are added or removed from either side of the relation.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_event_ids = list(instance.events.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        _recount(event_ids=[instance.pk])
+    elif action == 'post_clear':
+        _recount(event_ids=getattr(instance, '_cleared_event_ids', ()))
+    else:
+        _recount(event_ids=pk_set or ())
+
+
+@receiver(m2m_changed, sender=Task.attendees.through)
+def task_attendees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps Task.attendee_count and the parent Event's assignment count in sync.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_task_ids = list(instance.tasks.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == 'post_clear':
+        task_ids = getattr(instance, '_cleared_task_ids', ())
+    else:
+        task_ids = pk_set or ()
+
+    event_ids = Task.objects.filter(pk__in=task_ids).values_list('event_id', flat=True)
+    _recount(task_ids=task_ids, event_ids=event_ids)
+
+
+@receiver(pre_save, sender=Task)
+def task_pre_save(sender, instance, **kwargs):
+    """Remembers the Event a Task belonged to, so moving it recounts both Events.
+    """
+    if instance.pk is None or instance._state.adding:
+        instance._previous_event_id = None
+    else:
+        instance._previous_event_id = Task.objects.filter(pk=instance.pk).values_list('event_id', flat=True).first()
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, **kwargs):
+    """Keeps Event.capacity in sync with its Tasks' capacities.
+    """
+    _recount(event_ids=[instance.event_id, getattr(instance, '_previous_event_id', None)])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    _recount(event_ids=[instance.event_id])
+
+
+@receiver(pre_delete, sender=User)
+def user_pre_delete(sender, instance, **kwargs):
+    """Remembers the Events and Tasks of a User, since deleting the User cascades without m2m_changed.
+    """
+    instance._counted_task_ids = list(instance.tasks.values_list('pk', flat=True))
+    instance._counted_event_ids = set(instance.events.values_list('pk', flat=True))
+    instance._counted_event_ids.update(instance.tasks.values_list('event_id', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    _recount(
+        task_ids=getattr(instance, '_counted_task_ids', ()),
+        event_ids=getattr(instance, '_counted_event_ids', ()),
+    )
+
+
+# Navbar cache invalidation:
+@receiver(pre_save, sender=Notification)
+def notification_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Remembers the previous recipient, so reassigning a Notification invalidates both users.
+    """
+    if instance.pk is None or instance._state.adding:
+        instance._previous_recipient_id = None
+    elif update_fields is not None and 'recipient' not in update_fields:
+        instance._previous_recipient_id = instance.recipient_id
+    else:
+        instance._previous_recipient_id = Notification.objects.filter(pk=instance.pk).values_list('recipient_id', flat=True).first()
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    user_ids = {instance.recipient_id, getattr(instance, '_previous_recipient_id', None)} - {None}
+    invalidate_unread_notifications(*user_ids)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    invalidate_profile(instance.user_id)
+
+
+# Volunteer matching index invalidation:
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def volunteer_index_changed(sender, **kwargs):
+    invalidate_volunteer_index()
+
+
+@receiver(m2m_changed, sender=UserProfile.skills.through)
+def volunteer_skills_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_volunteer_index()
+
+
+# Fragment cache invalidation (counter updates bump their model in recount()):
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=EventReview)
+@receiver(post_delete, sender=EventReview)
+def versioned_model_changed(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(m2m_changed, sender=Task.skills.through)
+def task_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Marks Tasks as modified when their required Skills change, for fragment caches and conditional GETs.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_skill_task_ids = list(instance.task_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == 'post_clear':
+        task_ids = getattr(instance, '_cleared_skill_task_ids', ())
+    else:
+        task_ids = pk_set or ()
+    Task.objects.filter(pk__in=task_ids).update(updated_at=Now())
+    bump_version(Task)
+
+
+# Search index maintenance:
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Skill)
+def searchable_saved(sender, instance, update_fields=None, **kwargs):
+    """Refreshes the search entry of a saved Event, Task or Skill, unless none of its searched fields were saved.
+    """
+    if update_fields is not None and not set(update_fields) & {'name', 'description', 'location'}:
+        return
+    index_objects([instance])
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Skill)
+def searchable_deleted(sender, instance, **kwargs):
+    unindex_objects(sender, [instance.pk])
+
+
+# Geocoding:
+@receiver(pre_save, sender=Event)
+@receiver(pre_save, sender=UserProfile)
+def locatable_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Geocodes an Event's location or a profile's address, unless the save writes neither it nor the coordinates.
+    """
+    if update_fields is not None and not (set(update_fields) & set(SOURCE_FIELDS[sender]) and set(GEO_FIELDS) <= set(update_fields)):
+        return
+    geocode_objects([instance])
+
+
+@receiver(post_delete, sender=EventReview)
+def event_review_deleted(sender, instance, **kwargs):
+    """A deleted review leaves no timestamp behind, so the Event is marked as modified instead.
+    """
+    Event.objects.filter(pk=instance.event_id).update(updated_at=Now())
+
+
+# Volunteer stats maintenance:
+def _refresh_stats(user_ids):
+    """Recomputes the VolunteerStats of the given users.
+    """
+    refresh_volunteer_stats(user_ids)
+
+
+def _task_attendee_ids(task_ids):
+    return Task.attendees.through.objects.filter(task_id__in=task_ids).values_list('user_id', flat=True)
+
+
+@receiver(m2m_changed, sender=Event.attendees.through)
+@receiver(m2m_changed, sender=Task.attendees.through)
+def attendance_changed_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refreshes the stats of volunteers joining or leaving Events and Tasks, from either side of the relation.
+    """
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_attendee_ids = list(instance.attendees.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        _refresh_stats([instance.pk])
+    elif action == 'post_clear':
+        _refresh_stats(getattr(instance, '_cleared_attendee_ids', ()))
+    else:
+        _refresh_stats(pk_set or ())
+
+
+@receiver(m2m_changed, sender=Task.skills.through)
+def task_skills_changed_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refreshes the skills used by the assignees of Tasks whose required Skills change.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == 'post_clear':
+        # Remembered by task_skills_changed on pre_clear.
+        task_ids = getattr(instance, '_cleared_skill_task_ids', ())
+    else:
+        task_ids = pk_set or ()
+    _refresh_stats(_task_attendee_ids(task_ids))
+
+
+@receiver(pre_save, sender=Event)
+def event_pre_save_stats(sender, instance, update_fields=None, **kwargs):
+    """Remembers an Event's name and date, so only saves changing them refresh its attendees' stats.
+    """
+    if instance.pk is None or instance._state.adding or (update_fields is not None and not {'name', 'date'} & set(update_fields)):
+        instance._previous_name_and_date = None
+    else:
+        instance._previous_name_and_date = Event.objects.filter(pk=instance.pk).values_list('name', 'date').first()
+
+
+@receiver(post_save, sender=Event)
+def event_saved_stats(sender, instance, created, **kwargs):
+    """Refreshes the recent Events of an edited Event's attendees, which show its name and date.
+    """
+    previous = getattr(instance, '_previous_name_and_date', None)
+    if not created and previous is not None and previous != (instance.name, instance.date):
+        _refresh_stats(instance.attendees.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Skill)
+def skill_saved_stats(sender, instance, created, **kwargs):
+    if not created:
+        _refresh_stats(_task_attendee_ids(instance.task_set.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Event)
+@receiver(pre_delete, sender=Task)
+@receiver(pre_delete, sender=Skill)
+def stats_source_pre_delete(sender, instance, **kwargs):
+    """Remembers the volunteers of an Event, Task or Skill, since deleting it cascades without m2m_changed.
+    """
+    if sender is Skill:
+        instance._stats_user_ids = set(_task_attendee_ids(instance.task_set.values_list('pk', flat=True)))
+    else:
+        instance._stats_user_ids = set(instance.attendees.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Skill)
+def stats_source_deleted(sender, instance, **kwargs):
+    _refresh_stats(getattr(instance, '_stats_user_ids', ()))
+
+
+@receiver(pre_save, sender=AttendeeReview)
+def attendee_review_pre_save(sender, instance, **kwargs):
+    """Remembers the attendee a review was about, so moving it refreshes both attendees.
+    """
+    if instance.pk is None or instance._state.adding:
+        instance._previous_attendee_id = None
+    else:
+        instance._previous_attendee_id = AttendeeReview.objects.filter(pk=instance.pk).values_list('attendee_id', flat=True).first()
+
+
+@receiver(post_save, sender=AttendeeReview)
+@receiver(post_delete, sender=AttendeeReview)
+def attendee_review_changed(sender, instance, **kwargs):
+    _refresh_stats([instance.attendee_id, getattr(instance, '_previous_attendee_id', None)])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_stats(sender, instance, **kwargs):
+    """Removes the VolunteerStats a deleted user's cascade wrote again after deleting them.
+
+    Deleting a user's Events or reviews refreshes their attendees, the user included, and the cascade
+    may run those handlers after the user's stats were deleted. The foreign key is checked at commit,
+    so the row is removed here, in the deleting transaction, rather than tracked in process state.
+    """
+    VolunteerStats.objects.filter(user_id=instance.pk).delete()
+
+
+# Database connection tuning:
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Applies SQLITE_PRAGMAS to every new SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Avg, Count, F, Window
+from django.db.models.functions import RowNumber
+from .models import AttendeeReview, Event, Task, VolunteerStats
+from .utils import chunked
+
+
+STAT_FIELDS = ('events_attended', 'tasks_assigned', 'review_count', 'average_rating', 'skills_used', 'recent_events', 'updated_at')
+
+
+def _compute(user_ids):
+    """ The VolunteerStats of a batch of existing users, computed from their history in five queries.
+    """
+    stats = {user_id: VolunteerStats(user_id=user_id) for user_id in user_ids}
+
+    attended = Event.attendees.through.objects.filter(user_id__in=user_ids).order_by() \
+        .values_list('user_id').annotate(Count('pk'))
+    for user_id, count in attended:
+        stats[user_id].events_attended = count
+
+    assigned = Task.attendees.through.objects.filter(user_id__in=user_ids).order_by() \
+        .values_list('user_id').annotate(Count('pk'))
+    for user_id, count in assigned:
+        stats[user_id].tasks_assigned = count
+
+    reviews = AttendeeReview.objects.filter(attendee_id__in=user_ids).order_by() \
+        .values_list('attendee_id').annotate(Count('pk'), Avg('rating'))
+    for user_id, count, average in reviews:
+        stats[user_id].review_count = count
+        stats[user_id].average_rating = round(average, 2)
+
+    skills = Task.attendees.through.objects.filter(user_id__in=user_ids, task__skills__isnull=False) \
+        .values_list('user_id', 'task__skills__name').order_by('task__skills__name').distinct()
+    for user_id, name in skills:
+        stats[user_id].skills_used.append(name)
+
+    # One more than is shown, so a report can leave out the Event it is about and still list enough.
+    recent = Event.attendees.through.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(
+            RowNumber(), partition_by=F('user_id'),
+            order_by=[F('event__date').desc(nulls_last=True), F('event_id').desc()],
+        ),
+    ).filter(position__lte=settings.VOLUNTEER_STATS_RECENT_EVENTS + 1) \
+        .values_list('user_id', 'event_id', 'event__name', 'event__date').order_by('user_id', 'position')
+    for user_id, event_id, name, date in recent:
+        stats[user_id].recent_events.append({'id': event_id, 'name': name, 'date': date})
+
+    return list(stats.values())
+
+
+def refresh_volunteer_stats(user_ids=None):
+    """ Recomputes the VolunteerStats of some users, or of every user, from their full history.
+
+    Users are refreshed a batch at a time, each batch in a fixed number of queries however long their
+    histories are. Ids of users that no longer exist are ignored.
+
+    :param user_ids: The primary keys of the users, every user by default.
+    :return int: The number of users refreshed.
+    """
+    batch_size = settings.VOLUNTEER_STATS_BATCH_SIZE
+    if user_ids is None:
+        users = User.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+    else:
+        user_ids = sorted({pk for pk in user_ids if pk is not None})
+        users = (
+            pk for batch in chunked(user_ids, batch_size)
+            for pk in User.objects.filter(pk__in=batch).order_by('pk').values_list('pk', flat=True)
+        )
+
+    count = 0
+    for batch in chunked(users, batch_size):
+        VolunteerStats.objects.bulk_create(
+            _compute(batch), update_conflicts=True, unique_fields=['user'], update_fields=STAT_FIELDS,
+        )
+        count += len(batch)
+    return count
+
+
+def volunteer_stats(user_ids):
+    """ The VolunteerStats of some users by user id, computing those that were never stored.
+
+    Users that do not exist get empty, unsaved statistics.
+    """
+    user_ids = {pk for pk in user_ids if pk is not None}
+    # A plain IN filter rather than in_bulk(), which splits large id lists into several queries on SQLite.
+    found = {stats.user_id: stats for stats in VolunteerStats.objects.filter(user_id__in=user_ids)}
+    missing = user_ids - found.keys()
+    if missing:
+        refresh_volunteer_stats(missing)
+        found.update((stats.user_id, stats) for stats in VolunteerStats.objects.filter(user_id__in=missing))
+    for user_id in missing - found.keys():
+        found[user_id] = VolunteerStats(user_id=user_id)
+    return found
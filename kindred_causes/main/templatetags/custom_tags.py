@@ -1,35 +1,103 @@
+from functools import lru_cache
 from django import template
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from main import roles
+from main.cache_versions import queryset_fragment_key
 
 register = template.Library()
 
+
+@lru_cache(maxsize=None)
+def compile_accessor(spec):
+    """Compiles a dotted field spec (e.g. "profile.get_skill_names") into a getter chain.
+
+    Each segment is looked up with getattr, Users are shown by full name and callables are
+    called, exactly like get_attr, but the spec is only parsed once per process.
+    """
+    getters = tuple(_segment_getter(name) for name in spec.split('.'))
+
+    def accessor(obj):
+        for getter in getters:
+            obj = getter(obj)
+        return obj
+
+    return accessor
+
+
+def _segment_getter(name):
+    def getter(obj):
+        attribute = getattr(obj, name, '')
+        if type(attribute) is User:
+            return attribute.get_full_name()
+        elif callable(attribute):
+            return attribute()
+        return attribute
+
+    return getter
+
+
 @register.filter
 def get_attr(obj, attr):
-    print(obj, attr)
+    return compile_accessor(attr)(obj)
+
+
+@register.simple_tag
+def table_rows(records, fields):
+    """Yields (record, cells) pairs for a table, resolving the field specs once per table.
+    """
+    accessors = [compile_accessor(field) for field in fields or ()]
+    return ((item, [accessor(item) for accessor in accessors]) for item in records or ())
+
 
-    if '.' in attr and type(attr) == str:
-        attribute = get_attr(obj, attr.split('.')[0])
-        return get_attr(attribute, attr.split('.')[1])
+@register.simple_tag
+def table_cache_key(records, fields, headers=None, table_title=None, view_page=None):
+    """The fragment cache key of a table, or None when its records are not a versioned queryset.
+    """
+    return queryset_fragment_key('table', records, tuple(fields or ()), tuple(headers or ()), table_title, view_page)
 
-    attribute = getattr(obj, attr, '')
 
-    print(type(attribute))
-    print(attribute)
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, key):
+        self.nodelist = nodelist
+        self.key = key
 
-    if type(attribute) is User:
-        print("User")
-        return attribute.get_full_name()
+    def render(self, context):
+        key = self.key.resolve(context)
+        if not key:
+            return self.nodelist.render(context)
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+        return html
 
-    elif callable(attribute):
-        print("Callable")
-        return attribute()
 
+@register.tag
+def cache_fragment(parser, token):
+    """Caches its content under a key computed by the template, e.g. {% cache_fragment key %}...{% endcache_fragment %}.
+
+    Unlike {% cache %}, an empty key renders the content without caching it.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes one argument, the cache key.")
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, parser.compile_filter(bits[1]))
+
+
+@register.filter
+def has_role(user, role):
+    """Whether the user belongs to the named group, e.g. {% if user|has_role:"Admin" %}.
+    """
+    return roles.has_role(user, role)
 
-    return attribute
 
 @register.filter
 def phone_format(value):
     """Formats a 10-digit phone number as XXX-XXX-XXXX"""
     if value and len(value) == 10 and value.isdigit():
         return f"{value[:3]}-{value[3:6]}-{value[6:]}"
-    return value  # fallback if already formatted or invalid
\ No newline at end of file
+    return value  # fallback if already formatted or invalid
@@ -1,17 +1,49 @@
-from django.test import TestCase, Client, RequestFactory
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
-from django.contrib.auth.models import User, AnonymousUser
+from django.template.loader import render_to_string
+from django.contrib.auth.models import User, AnonymousUser, Group
 from django.utils import timezone
 from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+from django.db.migrations.loader import MigrationLoader
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from pathlib import Path
+from contextlib import redirect_stdout
+from importlib import import_module
+from unittest.mock import patch
+import csv
+import json
+import math
+import os
+import tempfile
 
-from .models import Skill, Event, Task, Notification, AttendeeReview, EventReview
-from .forms import EventReviewForm, EventForm
+from .models import Skill, Event, Task, Notification, AttendeeReview, EventReview, ReportJob, SearchEntry, UserProfile, VolunteerStats, WaitlistEntry
+from . import urls as main_urls
+from .context_processors import user_profile, unread_notifications_count
+from .forms import EventReviewForm, EventForm, SkillImportForm
+from .geo import cells_within, distance_miles, geocell, geocode_text, parse_location
+from .imports import Importer, ImportFileError, import_records
+from .search import query_terms, rebuild_search_index, search
+from .stats import refresh_volunteer_stats, volunteer_stats
 from .views import (HomeView, LandingView, EventReviewCreateView, EventReviewUpdateView,
-                  EventCreateView, EventUpdateView, event_browser,
-                  event_preview, volunteer_history,
-                  matching_form, inbox, AccountView, AccountManagementView)
-from .choices import EventStatus, EventUrgency
+                  EventCreateView, EventUpdateView, event_browser, volunteer_history,
+                  matching_form, AccountView, AccountManagementView)
+from .reports import build_event_report, iter_event_report_rows
+from .jobs import _run_in_worker, report_version, run_pending_report_jobs, submit_report_job
+from .notifications import fan_out_notification, send_event_notification
+from .templatetags.custom_tags import compile_accessor
+from .roles import ADMIN, VOLUNTEER, has_role, user_roles
+from .cache_versions import model_versions, queryset_fragment_key
+from .profiling import RequestProfile, query_fingerprint, request_stats
+from .matching import get_volunteer_index, index_version, invalidate_volunteer_index, rank_volunteers
+from .assignment import ALREADY_ASSIGNED, ASSIGNED, FULL, WAITLISTED, StalePlanError, apply_assignment, assign_volunteer, join_event, remove_event_attendees, solve_event_assignment, unassign_volunteer
+from .choices import EventStatus, EventUrgency, ReportJobStatus
 
 
 
@@ -41,7 +73,6 @@ class ModelTestCase(TestCase):
             created_by=self.user,
             updated_by=self.user
         )
-        self.event.required_skills.add(self.skill)
         
         self.task = Task.objects.create(
             event=self.event,
@@ -90,7 +121,6 @@ class ModelTestCase(TestCase):
         self.assertEqual(str(self.event), 'Test Event: Test Event Description')
         self.assertEqual(self.event.location, 'Test Location')
         self.assertEqual(self.event.urgency, EventUrgency.MEDIUM)
-        self.assertTrue(self.event.required_skills.filter(pk=self.skill.pk).exists())
         self.assertEqual(self.event.created_by, self.user)
         self.assertEqual(self.event.updated_by, self.user)
     
@@ -140,6 +170,7 @@ class FormTestCase(TestCase):
             username='testuser',
             password='testpassword'
         )
+        self.user.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
         
         self.skill = Skill.objects.create(
             name='Test Skill',
@@ -157,7 +188,6 @@ class FormTestCase(TestCase):
             created_by=self.user,
             updated_by=self.user
         )
-        self.event.required_skills.add(self.skill)
     
     def test_event_review_form_valid(self):
         """Test EventReviewForm with valid data"""
@@ -171,14 +201,10 @@ class FormTestCase(TestCase):
     
     def test_event_review_form_invalid(self):
         """Test EventReviewForm with invalid data"""
-        # Missing required field 'event'
-        form_data = {
-            'rating': 5,
-            'comments': 'Test Event Review Comments'
-        }
-        form = EventReviewForm(data=form_data)
+        # Missing required field 'rating'
+        form = EventReviewForm(data={'comments': 'Test Event Review Comments'})
         self.assertFalse(form.is_valid())
-        self.assertIn('event', form.errors)
+        self.assertIn('rating', form.errors)
         
         # Invalid rating (out of range)
         form_data = {
@@ -198,7 +224,7 @@ class FormTestCase(TestCase):
             'location': 'New Test Location',
             'urgency': EventUrgency.HIGH,
             'date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         form = EventForm(data=form_data)
         self.assertTrue(form.is_valid())
@@ -211,7 +237,7 @@ class FormTestCase(TestCase):
             'location': 'New Test Location',
             'urgency': EventUrgency.HIGH,
             'date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         form = EventForm(data=form_data)
         self.assertFalse(form.is_valid())
@@ -224,7 +250,7 @@ class FormTestCase(TestCase):
             'location': 'New Test Location',
             'urgency': 10,  # Invalid value
             'date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         form = EventForm(data=form_data)
         self.assertFalse(form.is_valid())
@@ -243,6 +269,7 @@ class ViewTestCase(TestCase):
             username='testuser',
             password='testpassword'
         )
+        self.user.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
         
         self.skill = Skill.objects.create(
             name='Test Skill',
@@ -260,7 +287,6 @@ class ViewTestCase(TestCase):
             created_by=self.user,
             updated_by=self.user
         )
-        self.event.required_skills.add(self.skill)
         
         self.event_review = EventReview.objects.create(
             event=self.event,
@@ -299,17 +325,17 @@ class ViewTestCase(TestCase):
     def test_event_review_create_view_authenticated(self):
         """Test EventReviewCreateView with authenticated user"""
         self.client.login(username='testuser', password='testpassword')
-        response = self.client.get(reverse('new_event_review'))
+        url = reverse('new_event_review', kwargs={'event_pk': self.event.id})
+        response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'event_review_form.html')
         
         # Test POST request
         form_data = {
-            'event': self.event.id,
             'rating': 5,
             'comments': 'New Test Event Review Comments'
         }
-        response = self.client.post(reverse('new_event_review'), form_data)
+        response = self.client.post(url, form_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
         
         # Verify the review was created
@@ -317,7 +343,7 @@ class ViewTestCase(TestCase):
     
     def test_event_review_create_view_unauthenticated(self):
         """Test EventReviewCreateView with unauthenticated user"""
-        response = self.client.get(reverse('new_event_review'))
+        response = self.client.get(reverse('new_event_review', kwargs={'event_pk': self.event.id}))
         self.assertEqual(response.status_code, 302)  # Redirect to login
         self.assertTrue('/login/' in response.url)
     
@@ -350,6 +376,7 @@ class ViewTestCase(TestCase):
     
     def test_event_create_view(self):
         """Test EventCreateView"""
+        self.client.login(username='testuser', password='testpassword')
         response = self.client.get(reverse('new_event'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'event_form.html')
@@ -361,7 +388,7 @@ class ViewTestCase(TestCase):
             'location': 'New Managed Location',
             'urgency': EventUrgency.HIGH,
             'date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         response = self.client.post(reverse('new_event'), form_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
@@ -371,6 +398,7 @@ class ViewTestCase(TestCase):
     
     def test_event_update_view(self):
         """Test EventUpdateView"""
+        self.client.login(username='testuser', password='testpassword')
         response = self.client.get(reverse('edit_event', kwargs={'pk': self.event.id}))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'event_form.html')
@@ -382,7 +410,7 @@ class ViewTestCase(TestCase):
             'location': 'Updated Managed Location',
             'urgency': EventUrgency.LOW,
             'date': (timezone.now() + timedelta(days=7)).strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         response = self.client.post(reverse('edit_event', kwargs={'pk': self.event.id}), form_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
@@ -394,36 +422,17 @@ class ViewTestCase(TestCase):
         self.assertEqual(self.event.urgency, EventUrgency.LOW)
     
     def test_function_based_views(self):
-        """Test function-based views"""
-        # Test event_browser view
-        response = self.client.get(reverse('event_browser'))
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'event_browser.html')
-        self.assertEqual(response.context['test_key'], 'test_value')
-        
-        # Test user_registration view
-        response = self.client.get(reverse('user_registration'))
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'user_registration.html')
-        self.assertEqual(response.context['test_key'], 'test_value')
-        
-        # Test volunteer_history view
-        response = self.client.get(reverse('volunteer_history'))
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'volunteer_history.html')
-        self.assertEqual(response.context['test_key'], 'test_value')
-        
-        # Test matching_form view
-        response = self.client.get(reverse('matching_form'))
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'matching_form.html')
-        self.assertEqual(response.context['test_key'], 'test_value')
-        
-        # Test inbox view
-        response = self.client.get(reverse('inbox'))
-        self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'inbox.html')
-        self.assertEqual(response.context['test_key'], 'test_value')
+        """Test the browsing, history, matching and inbox pages"""
+        self.client.login(username='testuser', password='testpassword')
+        for name, template in [
+            ('event_browser', 'event_browser.html'),
+            ('volunteer_history', 'task_history.html'),
+            ('matching_form', 'matching_form.html'),
+            ('inbox', 'inbox.html'),
+        ]:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateUsed(response, template)
     
     def test_account_view(self):
         """Test AccountView"""
@@ -434,7 +443,7 @@ class ViewTestCase(TestCase):
         self.assertTemplateUsed(response, 'account.html')
         
         # Test context data
-        self.assertTrue('name' in response.context)
+        self.assertTrue('profile' in response.context)
         self.assertTrue('city' in response.context)
         self.assertTrue('state' in response.context)
         self.assertTrue('email' in response.context)
@@ -500,9 +509,7 @@ class UrlPatternTestCase(TestCase):
     def test_url_patterns(self):
         """Test URL patterns resolve to correct views"""
         # Test function-based view URLs
-        self.assertEqual(reverse('user_registration'), '/register/')
         self.assertEqual(reverse('event_browser'), '/browse_events/')
-        self.assertEqual(reverse('event_preview'), '/preview_event/')
         self.assertEqual(reverse('inbox'), '/inbox/')
         self.assertEqual(reverse('account'), '/account/')
         self.assertEqual(reverse('volunteer_history'), '/volunteer_history/')
@@ -517,7 +524,8 @@ class UrlPatternTestCase(TestCase):
                          f'/event/edit/{self.event.id}/')
         self.assertEqual(reverse('edit_event_review', kwargs={'pk': self.event_review.id}),
                          f'/event-review/edit/{self.event_review.id}/')
-        self.assertEqual(reverse('new_event_review'), '/event-review/new/')
+        self.assertEqual(reverse('new_event_review', kwargs={'event_pk': self.event.id}),
+                         f'/event/{self.event.id}/review/new/')
 
 
 class IntegrationTestCase(TestCase):
@@ -531,6 +539,7 @@ class IntegrationTestCase(TestCase):
             username='testuser',
             password='testpassword'
         )
+        self.user.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
         
         self.skill = Skill.objects.create(
             name='Test Skill',
@@ -550,7 +559,7 @@ class IntegrationTestCase(TestCase):
             'location': 'Integration Test Location',
             'urgency': EventUrgency.HIGH,
             'date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         response = self.client.post(reverse('new_event'), event_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
@@ -562,11 +571,10 @@ class IntegrationTestCase(TestCase):
         
         # 2. Create a review for the event
         review_data = {
-            'event': event.id,
             'rating': 5,
             'comments': 'Integration Test Event Review'
         }
-        response = self.client.post(reverse('new_event_review'), review_data)
+        response = self.client.post(reverse('new_event_review', kwargs={'event_pk': event.id}), review_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
         
         # Verify the review was created
@@ -581,7 +589,7 @@ class IntegrationTestCase(TestCase):
             'location': 'Updated Integration Test Location',
             'urgency': EventUrgency.CRITICAL,
             'date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
-            'required_skills': self.skill.id
+            'admin': self.user.id
         }
         response = self.client.post(reverse('edit_event', kwargs={'pk': event.id}), update_event_data)
         self.assertEqual(response.status_code, 302)  # Redirect after successful form submission
@@ -604,4 +612,2119 @@ class IntegrationTestCase(TestCase):
         # Verify the review was updated
         review.refresh_from_db()
         self.assertEqual(review.comments, 'Updated Integration Test Event Review')
-        self.assertEqual(review.rating, 3)
\ No newline at end of file
+        self.assertEqual(review.rating, 3)
+
+
+class EventCounterTestCase(TestCase):
+    """Test cases for the denormalized Event and Task counters"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        self.other_volunteer = User.objects.create_user(username='other_volunteer', password='testpassword')
+
+        self.event = Event.objects.create(
+            name='Test Event',
+            description='Test Event Description',
+            location='Test Location',
+            urgency=EventUrgency.MEDIUM,
+            date=timezone.now()
+        )
+        self.task = Task.objects.create(event=self.event, name='Task A', description='Task A Description', capacity=3)
+        self.other_task = Task.objects.create(event=self.event, name='Task B', description='Task B Description', capacity=2)
+
+    def test_capacity_follows_tasks(self):
+        """Test Event.capacity is updated when Tasks are saved and deleted"""
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.capacity, 5)
+
+        self.task.capacity = 10
+        self.task.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.capacity, 12)
+
+        self.other_task.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.capacity, 10)
+
+    def test_attendance_follows_m2m_changes(self):
+        """Test attendee counters are updated from both sides of the relations"""
+        self.event.attendees.add(self.volunteer, self.other_volunteer)
+        self.task.attendees.add(self.volunteer)
+        self.other_volunteer.tasks.add(self.task, self.other_task)
+
+        self.event.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 2)
+        self.assertEqual(self.event.unassigned_attendee_count, 3)
+        self.assertEqual(self.task.attendee_count, 2)
+
+        self.other_volunteer.tasks.clear()
+        self.volunteer.events.remove(self.event)
+        self.event.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+        self.assertEqual(self.event.unassigned_attendee_count, 1)
+        self.assertEqual(self.task.attendee_count, 1)
+
+        self.volunteer.delete()
+        self.event.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual(self.event.unassigned_attendee_count, 0)
+        self.assertEqual(self.task.attendee_count, 0)
+
+    def test_stale_save_keeps_counters(self):
+        """Test saving a stale instance does not overwrite its counters"""
+        stale_event = Event.objects.get(pk=self.event.pk)
+        self.event.attendees.add(self.volunteer)
+        stale_event.name = 'Renamed Event'
+        stale_event.save()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.name, 'Renamed Event')
+        self.assertEqual(self.event.attendee_count, 1)
+
+    def test_recount_events_command(self):
+        """Test the recount_events management command rebuilds drifted counters"""
+        self.event.attendees.add(self.volunteer)
+        self.task.attendees.add(self.volunteer)
+        Event.objects.update(capacity=0, attendee_count=0, unassigned_attendee_count=0)
+        Task.objects.update(attendee_count=0)
+
+        call_command('recount_events', stdout=StringIO())
+
+        self.event.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual(self.event.capacity, 5)
+        self.assertEqual(self.event.attendee_count, 1)
+        self.assertEqual(self.event.unassigned_attendee_count, 1)
+        self.assertEqual(self.task.attendee_count, 1)
+
+
+@override_settings(BACKGROUND_JOBS_ENABLED=False)
+class EventReportTestCase(TestCase):
+    """Test cases for the Event report builder and exporters"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.report_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.report_dir.cleanup)
+        settings_override = override_settings(REPORT_CACHE_DIR=self.report_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.skill = Skill.objects.create(name='First Aid', description='First Aid Description')
+        self.other_skill = Skill.objects.create(name='Cooking', description='Cooking Description')
+
+        self.event = Event.objects.create(
+            name='Report Event',
+            description='Report Event Description',
+            location='Report Location',
+            urgency=EventUrgency.HIGH,
+            date=timezone.now()
+        )
+        self.previous_event = Event.objects.create(
+            name='Previous Event',
+            description='Previous Event Description',
+            location='Previous Location',
+            date=timezone.now() - timedelta(days=30)
+        )
+        self.task = Task.objects.create(event=self.event, name='Report Task', description='Report Task Description', capacity=100)
+        self.task.skills.add(self.skill)
+        self.previous_task = Task.objects.create(event=self.previous_event, name='Previous Task', description='Previous Task Description', capacity=100)
+        self.previous_task.skills.add(self.other_skill)
+        EventReview.objects.create(event=self.event, rating=5, comments='Great event')
+
+    def add_attendees(self, count):
+        """Create attendees assigned to the report task who also attended the previous event"""
+        for i in range(count):
+            user = User.objects.create_user(username=f'attendee{User.objects.count()}', first_name='Attendee', last_name=str(i))
+            user.events.add(self.event, self.previous_event)
+            user.tasks.add(self.task, self.previous_task)
+
+    def count_report_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            build_event_report(self.event.pk)
+        return len(context.captured_queries)
+
+    def test_report_contents(self):
+        """Test the report collects skills and previous events per attendee"""
+        self.add_attendees(1)
+        report = build_event_report(self.event.pk)
+
+        self.assertEqual(report.event, self.event)
+        self.assertEqual(len(report.reviews), 1)
+        self.assertEqual(report.tasks[0].skills, ['First Aid'])
+        attendee = report.tasks[0].attendees[0]
+        self.assertEqual(attendee.full_name, 'Attendee 0')
+        self.assertEqual(attendee.skills, ['Cooking', 'First Aid'])
+        self.assertEqual(attendee.previous_events, [self.previous_event])
+
+    def test_report_query_count_is_constant(self):
+        """Test the number of report queries does not grow with the number of attendees"""
+        self.add_attendees(2)
+        small = self.count_report_queries()
+        self.add_attendees(25)
+        large = self.count_report_queries()
+        self.assertEqual(small, large)
+
+    def test_exports_render_report(self):
+        """Test the CSV and PDF exports render from the report"""
+        self.add_attendees(3)
+        self.client.force_login(self.admin)
+
+        response = self.client.get(reverse('generate_event_report_csv', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Event Summary', content)
+        self.assertIn('Attendee 2,"Cooking, First Aid",Previous Event', content)
+        self.assertIn('5,Great event', content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse('generate_event_report_pdf', kwargs={'pk': self.event.pk}))
+        self.assertTemplateUsed(response, 'report_job.html')
+
+        response = self.client.get(reverse('generate_event_report_pdf', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_streamed_rows_keep_section_layout(self):
+        """Test the streamed CSV rows keep the report sections in order across chunks"""
+        self.add_attendees(5)
+        Task.objects.create(event=self.event, name='Empty Task', description='Empty Task Description', capacity=1)
+        self.event.refresh_from_db()
+
+        rows = list(iter_event_report_rows(self.event, chunk_size=2))
+        titles = [row[0] for row in rows if len(row) == 1]
+        self.assertEqual(titles, ['Event Summary', 'Tasks', 'Event Reviews'])
+
+        task_rows = [row for row in rows if len(row) == 8 and row[0] != 'Name']
+        self.assertEqual(len(task_rows), 6)
+        self.assertEqual(task_rows[-1][:1] + task_rows[-1][5:], ['Empty Task', '(None)', '', ''])
+        self.assertEqual(rows[-1], [5, 'Great event'])
+
+    def test_report_job_lifecycle(self):
+        """Test submitting, polling and downloading a queued report"""
+        self.add_attendees(2)
+        self.client.force_login(self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('new_report_job', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+
+        response = self.client.get(reverse('report_job_status', kwargs={'pk': job_id}))
+        self.assertEqual(response.json()['status'], ReportJobStatus.DONE)
+
+        response = self.client.get(reverse('report_job_download', kwargs={'pk': job_id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_failed_and_removed_report_jobs(self):
+        """Test a failed job's traceback is not exposed and a job whose file was removed is queued again"""
+        self.client.force_login(self.admin)
+        with patch('main.jobs.render_event_report_pdf', side_effect=RuntimeError('secret detail')), self.assertLogs('main.jobs', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                job = submit_report_job(self.event)
+        response = self.client.get(reverse('report_job_status', kwargs={'pk': job.pk}))
+        self.assertEqual(response.json()['error'], 'The report could not be generated.')
+        self.assertIn('secret detail', ReportJob.objects.get(pk=job.pk).error)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job = submit_report_job(self.event, retry_failed=True)
+        os.remove(ReportJob.objects.get(pk=job.pk).file_path)
+        response = self.client.get(reverse('report_job_download', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], ReportJobStatus.PENDING)
+        self.assertNotEqual(response.json()['id'], job.pk)
+
+    def test_stale_running_report_jobs_are_queued_again(self):
+        """Test a job whose worker died after claiming it is queued again once it times out"""
+        job = ReportJob.objects.create(event=self.event, version=report_version(self.event), status=ReportJobStatus.RUNNING, started_at=timezone.now())
+        self.assertEqual(submit_report_job(self.event).pk, job.pk)
+        self.assertEqual(run_pending_report_jobs(), 0)
+
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(submit_report_job(self.event).pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJobStatus.DONE)
+
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJobStatus.RUNNING, started_at=None)
+        self.assertEqual(run_pending_report_jobs(), 1)
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, ReportJobStatus.DONE)
+
+    def test_reports_are_for_admins(self):
+        """Test volunteers cannot generate, poll or download reports"""
+        with self.captureOnCommitCallbacks(execute=True):
+            job = submit_report_job(self.event)
+        volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.client.force_login(volunteer)
+        self.assertEqual(self.client.get(reverse('generate_event_report_csv', kwargs={'pk': self.event.pk})).status_code, 403)
+        self.assertEqual(self.client.get(reverse('generate_event_report_pdf', kwargs={'pk': self.event.pk})).status_code, 403)
+        self.assertEqual(self.client.post(reverse('new_report_job', kwargs={'pk': self.event.pk})).status_code, 403)
+        self.assertEqual(self.client.get(reverse('report_job_status', kwargs={'pk': job.pk})).status_code, 403)
+        self.assertEqual(self.client.get(reverse('report_job_download', kwargs={'pk': job.pk})).status_code, 403)
+
+    def test_report_job_cache_follows_content_version(self):
+        """Test repeat submissions reuse the cached job until the Event changes"""
+        with self.captureOnCommitCallbacks(execute=True):
+            job = submit_report_job(self.event)
+        self.assertEqual(submit_report_job(self.event).pk, job.pk)
+
+        self.add_attendees(1)
+        self.event.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            job = submit_report_job(self.event)
+        self.assertEqual(submit_report_job(self.event).pk, job.pk)
+
+        # The report lists the attendees' other Events, from their stats.
+        attendee = User.objects.get(username__startswith='attendee')
+        later = Event.objects.create(name='Later Event', description='Later Event Description', location='Later Location', date=timezone.now())
+        attendee.events.add(later)
+        self.assertNotEqual(submit_report_job(self.event).pk, job.pk)
+
+
+class TableRenderingTestCase(TestCase):
+    """Test cases for the compiled table accessors"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.admin = User.objects.create_user(username='admin', first_name='Ada', last_name='Admin')
+        self.event = Event.objects.create(
+            name='Table Event',
+            description='Table Event Description',
+            location='Table Location',
+            urgency=EventUrgency.HIGH,
+            admin=self.admin
+        )
+
+    def test_compiled_accessors_match_get_attr(self):
+        """Test compiled accessors resolve users, callables and dotted paths like get_attr"""
+        self.assertEqual(compile_accessor('admin')(self.event), 'Ada Admin')
+        self.assertEqual(compile_accessor('urgency_display')(self.event), 'High')
+        self.assertEqual(compile_accessor('missing.attribute')(self.event), '')
+        self.assertIs(compile_accessor('name'), compile_accessor('name'))
+
+    def test_table_renders_without_printing(self):
+        """Test the table partial renders cells without writing to stdout"""
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            html = render_to_string('partials/table.html', {
+                'records': Event.objects.all(),
+                'fields': ['name', 'admin', 'urgency_display'],
+                'headers': ['Name', 'Organizer', 'Urgency'],
+            })
+        self.assertInHTML('<td>Ada Admin</td>', html)
+        self.assertInHTML('<td>High</td>', html)
+        self.assertEqual(stdout.getvalue(), '')
+
+
+class RoleTestCase(TestCase):
+    """Test cases for memoized role resolution"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        self.volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.event = Event.objects.create(name='Role Event', description='Role Event Description', location='Role Location')
+
+    def test_roles_are_loaded_once(self):
+        """Test a user's group names are loaded with one query and then memoized"""
+        user = User.objects.get(pk=self.admin.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user_roles(user), frozenset({ADMIN}))
+            self.assertTrue(has_role(user, ADMIN))
+            self.assertFalse(has_role(user, VOLUNTEER))
+        self.assertEqual(user_roles(AnonymousUser()), frozenset())
+
+    def test_admin_required_mixin(self):
+        """Test AdminRequiredMixin views by role"""
+        url = reverse('new_task', kwargs={'event_id': self.event.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response.url)
+
+        self.client.force_login(self.volunteer)
+        self.assertRedirects(self.client.get(url), reverse('home'))
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_event_details_checks_groups_once(self):
+        """Test the event page resolves the user's groups with a single query"""
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('view_event', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Add Task')
+        group_queries = [query for query in context.captured_queries if 'auth_user_groups' in query['sql']]
+        self.assertEqual(len(group_queries), 1)
+
+
+class NavbarContextTestCase(TestCase):
+    """Test cases for the cached navbar context"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='volunteer', password='testpassword')
+        self.profile = UserProfile.objects.create(user=self.user, name='Volunteer', address1='1 Main St', city='Houston', state='TX', zipcode='77001')
+        self.notification = Notification.objects.create(recipient=self.user, subject='Hello', body='World')
+
+    def navbar_context(self, user=None):
+        request = self.factory.get('/')
+        request.user = user or User.objects.get(pk=self.user.pk)
+        return user_profile(request) | unread_notifications_count(request)
+
+    def test_values_are_lazy_and_cached(self):
+        """Test navbar values are computed on first use and then served from the cache"""
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            context = self.navbar_context(user)
+        with self.assertNumQueries(2):
+            self.assertEqual(context['profile'].pk, self.profile.pk)
+            self.assertEqual(context['unread_notifications'], 1)
+
+        context = self.navbar_context()
+        with self.assertNumQueries(0):
+            self.assertEqual(context['profile'].pk, self.profile.pk)
+            self.assertEqual(context['unread_notifications'], 1)
+
+    def test_cache_is_invalidated(self):
+        """Test notification and profile changes invalidate the cached values"""
+        context = self.navbar_context()
+        self.assertEqual(context['unread_notifications'], 1)
+        self.assertEqual(context['profile'].city, 'Houston')
+
+        self.notification.is_read = True
+        self.notification.save(update_fields=['is_read'])
+        self.profile.city = 'Austin'
+        self.profile.save()
+        context = self.navbar_context()
+        self.assertEqual(context['unread_notifications'], 0)
+        self.assertEqual(context['profile'].city, 'Austin')
+
+        Notification.objects.create(recipient=self.user, subject='Again', body='World')
+        self.assertEqual(self.navbar_context()['unread_notifications'], 1)
+
+
+@override_settings(BACKGROUND_JOBS_ENABLED=False, NOTIFICATION_BATCH_SIZE=10)
+class NotificationFanOutTestCase(TestCase):
+    """Test cases for the bulk notification fan-out"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.admin = User.objects.create_superuser(username='admin', password='testpassword')
+        self.event = Event.objects.create(name='Fan-out Event', description='Fan-out Event Description', location='Fan-out Location')
+        self.attendees = [User.objects.create_user(username=f'attendee{i}') for i in range(25)]
+        self.event.attendees.add(*self.attendees)
+
+    def test_fan_out_uses_batched_inserts(self):
+        """Test the fan-out inserts one row per attendee in a fixed number of batches"""
+        with CaptureQueriesContext(connection) as context:
+            sent = fan_out_notification(self.event.pk, 'Subject', 'Body', created_by_id=self.admin.pk)
+        self.assertEqual(sent, 25)
+        self.assertEqual(Notification.objects.filter(event=self.event, is_read=False).count(), 25)
+        inserts = [query for query in context.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+
+    @override_settings(NOTIFICATION_BACKGROUND_THRESHOLD=10)
+    def test_large_audiences_are_sent_in_background(self):
+        """Test audiences above the threshold are handed to the background worker"""
+        with self.captureOnCommitCallbacks(execute=True):
+            count, queued = send_event_notification(self.event, 'Subject', 'Body')
+        self.assertEqual((count, queued), (25, True))
+        self.assertEqual(Notification.objects.filter(event=self.event).count(), 25)
+
+    def test_background_failures_are_logged(self):
+        """Test an exception in background work is logged instead of lost with its Future"""
+        with patch('main.jobs.close_old_connections'), self.assertLogs('main.jobs', 'ERROR') as logs:
+            _run_in_worker(int, 'not a number')
+        self.assertIn("Background job int('not a number',) failed.", logs.output[0])
+        self.assertIn('ValueError', logs.output[0])
+
+    def test_create_view_and_command(self):
+        """Test the notification view and management command report counts sent"""
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('new_notification'), {
+            'event': self.event.pk, 'subject': 'From view', 'body': 'Body',
+        }, follow=True)
+        self.assertContains(response, 'Sent notification to 25 attendees')
+
+        stdout = StringIO()
+        call_command('send_notification', self.event.pk, subject='From command', stdout=stdout)
+        self.assertIn('Sent 25 notifications.', stdout.getvalue())
+
+    def test_admin_fans_out_without_recipient(self):
+        """Test adding a Notification without a recipient in the admin notifies every attendee"""
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:main_notification_add'), {
+            'event': self.event.pk, 'subject': 'From admin', 'body': 'Body',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Notification.objects.filter(subject='From admin').count(), 25)
+
+
+@override_settings(INBOX_PAGE_SIZE=4)
+class InboxPaginationTestCase(TestCase):
+    """Test cases for the keyset-paginated inbox"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='volunteer', password='testpassword')
+        self.other_user = User.objects.create_user(username='other', password='testpassword')
+        self.event = Event.objects.create(name='Inbox Event', description='Inbox Event Description', location='Inbox Location')
+        Notification.objects.bulk_create(
+            [Notification(event=self.event, recipient=self.user, subject=f'Message {i}', is_read=i % 2 == 0) for i in range(10)]
+            + [Notification(event=self.event, recipient=self.other_user, subject='Not mine')]
+        )
+        # Several notifications share a timestamp, so the primary key has to break ties.
+        Notification.objects.filter(subject__in=['Message 3', 'Message 4', 'Message 5']).update(created_at=timezone.now())
+        self.client.force_login(self.user)
+
+    def collect_pages(self, **params):
+        subjects, cursor = [], None
+        while True:
+            response = self.client.get(reverse('inbox_json'), params | ({'cursor': cursor} if cursor else {}))
+            data = response.json()
+            subjects += [item['subject'] for item in data['results']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                return subjects
+
+    def test_pages_cover_inbox_once(self):
+        """Test following cursors returns every notification exactly once, newest first"""
+        subjects = self.collect_pages()
+        expected = list(Notification.objects.filter(recipient=self.user).order_by('-created_at', '-pk').values_list('subject', flat=True))
+        self.assertEqual(subjects, expected)
+        self.assertEqual(len(subjects), 10)
+        self.assertEqual(len(self.collect_pages(unread=1)), 5)
+
+    def test_html_inbox_is_paginated(self):
+        """Test the inbox page shows one page and a link to the next"""
+        response = self.client.get(reverse('inbox'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['inbox']), 4)
+        self.assertContains(response, '?cursor=' + response.context['inbox_page'].next_cursor)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get(reverse('inbox_json'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(EVENT_BROWSER_PAGE_SIZE=5)
+class EventBrowserTestCase(TestCase):
+    """Test cases for the paginated, filterable event browser"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.user = User.objects.create_user(username='volunteer', password='testpassword')
+        self.admin = User.objects.create_user(username='organizer', first_name='Olga', last_name='Organizer')
+        self.skill = Skill.objects.create(name='Forklift', description='Forklift Description')
+        self.client.force_login(self.user)
+
+    def create_events(self, count, **kwargs):
+        start = Event.objects.count()
+        for i in range(start, start + count):
+            Event.objects.create(
+                name=f'Event {i:03}',
+                description='Description',
+                location=kwargs.get('location', 'Houston'),
+                urgency=kwargs.get('urgency', EventUrgency.MEDIUM),
+                date=kwargs.get('date', timezone.now() + timedelta(days=i)),
+                admin=self.admin,
+            )
+
+    def browse(self, **params):
+        return self.client.get(reverse('event_browser'), params)
+
+    def test_pagination(self):
+        """Test the browser shows one page of events at a time"""
+        self.create_events(12)
+        response = self.browse(page=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event.name for event in response.context['events']], ['Event 010', 'Event 011'])
+        self.assertContains(response, 'Page 3 of 3')
+
+    def test_filters_and_sorting(self):
+        """Test filtering by date range, urgency, location and skill, and sorting"""
+        self.create_events(3)
+        self.create_events(1, location='Austin', urgency=EventUrgency.CRITICAL, date=timezone.now() + timedelta(days=100))
+        task = Task.objects.create(event=Event.objects.get(name='Event 001'), name='Lift', description='Lift things', capacity=1)
+        task.skills.add(self.skill)
+
+        def names(**params):
+            return [event.name for event in self.browse(**params).context['events']]
+
+        self.assertEqual(names(location='aus'), ['Event 003'])
+        self.assertEqual(names(urgency=EventUrgency.CRITICAL), ['Event 003'])
+        self.assertEqual(names(skill=self.skill.pk), ['Event 001'])
+        self.assertEqual(names(date_from=(timezone.now() + timedelta(days=50)).date()), ['Event 003'])
+        self.assertEqual(names(date_to=(timezone.now() + timedelta(days=1)).date()), ['Event 000', 'Event 001'])
+        self.assertEqual(names(sort='-date'), ['Event 003', 'Event 002', 'Event 001', 'Event 000'])
+
+    @override_settings(TIME_ZONE='America/Chicago')
+    def test_date_range_uses_local_days(self):
+        """Test the date range covers whole days in the current time zone, without casting the column"""
+        day = datetime(2030, 5, 1).date()
+        local = timezone.get_current_timezone()
+        for hour, minute in [(0, 0), (23, 59)]:
+            self.create_events(1, date=datetime(2030, 5, 1, hour, minute, tzinfo=local))
+        self.create_events(1, date=datetime(2030, 5, 2, 0, 0, tzinfo=local))
+
+        def names(**params):
+            return [event.name for event in self.browse(**params).context['events']]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(names(date_from=day, date_to=day), ['Event 000', 'Event 001'])
+        self.assertFalse([query for query in queries if 'cast_date' in query['sql']])
+        self.assertEqual(names(date_from=day + timedelta(days=1)), ['Event 002'])
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+    def test_query_count_is_constant(self):
+        """Test a page renders in the same number of queries regardless of table size"""
+        self.create_events(5)
+        self.browse()  # Warm the cached navbar context.
+        with CaptureQueriesContext(connection) as small:
+            self.browse()
+        self.create_events(40)
+        with CaptureQueriesContext(connection) as large:
+            response = self.browse()
+        self.assertContains(response, 'Olga Organizer')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class MatchingTestCase(TestCase):
+    """Test cases for the volunteer matching engine"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.first_aid = Skill.objects.create(name='First Aid', description='First Aid Description')
+        self.cooking = Skill.objects.create(name='Cooking', description='Cooking Description')
+        self.event = Event.objects.create(
+            name='Matching Event', description='Matching Event Description',
+            location='Houston Food Bank', date=timezone.now() + timedelta(days=10)
+        )
+        self.task = Task.objects.create(event=self.event, name='Kitchen', description='Kitchen Description', capacity=2)
+        self.task.skills.add(self.first_aid, self.cooking)
+
+        self.expert = self.create_volunteer('expert', 'Austin', [self.first_aid, self.cooking])
+        self.local = self.create_volunteer('local', 'Houston', [self.cooking])
+        self.novice = self.create_volunteer('novice', 'Dallas', [])
+        self.away = self.create_volunteer('away', 'Houston', [self.first_aid, self.cooking], start=timezone.now().date() + timedelta(days=30))
+
+    def create_volunteer(self, username, city, skills, start=None):
+        user = User.objects.create_user(username=username, password='testpassword')
+        profile = UserProfile.objects.create(
+            user=user, name=username.title(), address1='1 Main St', city=city, state='TX', zipcode='77001',
+            start_availability=start,
+        )
+        profile.skills.set(skills)
+        return user
+
+    def test_ranking(self):
+        """Test volunteers are ranked by skill coverage and location, skipping unavailable ones"""
+        matches = rank_volunteers(self.task)
+        self.assertEqual([match.user_id for match in matches], [self.expert.pk, self.local.pk, self.novice.pk])
+        self.assertEqual(matches[0].matched_skills, ['Cooking', 'First Aid'])
+        self.assertTrue(matches[1].location_match)
+        self.assertEqual(matches[1].score, 0.6)
+
+    def test_assigned_and_full(self):
+        """Test assigned volunteers are skipped and a full task has no matches"""
+        self.task.attendees.add(self.expert)
+        self.task.refresh_from_db()
+        self.assertNotIn(self.expert.pk, [match.user_id for match in rank_volunteers(self.task)])
+
+        self.task.attendees.add(self.local)
+        self.task.refresh_from_db()
+        self.assertEqual(rank_volunteers(self.task), [])
+
+    def test_index_is_rebuilt_on_profile_changes(self):
+        """Test the cached index picks up skill changes and is otherwise reused"""
+        rank_volunteers(self.task)
+        with self.assertNumQueries(3):
+            rank_volunteers(self.task)
+
+        self.novice.profile.skills.add(self.first_aid, self.cooking)
+        matches = rank_volunteers(self.task)
+        self.assertEqual(matches[0].user_id, self.expert.pk)
+        self.assertEqual(matches[1].user_id, self.novice.pk)
+
+    def test_matching_page(self):
+        """Test the matching page lists ranked volunteers for the selected task"""
+        admin = User.objects.create_user(username='matching_admin', password='testpassword')
+        admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.client.force_login(admin)
+        response = self.client.get(reverse('matching_form'), {'task': self.task.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('assign_user_to_task', args=[self.local.pk, self.task.pk]))
+        self.assertContains(response, '80%')
+
+        for task in ['abc', '1.5', str(10 ** 30), str(self.task.pk + 100)]:
+            self.assertEqual(self.client.get(reverse('matching_form'), {'task': task}).status_code, 404)
+
+    def test_matching_page_is_for_admins(self):
+        """Test volunteers cannot browse other volunteers' rankings"""
+        self.client.force_login(self.expert)
+        self.assertEqual(self.client.get(reverse('matching_form'), {'task': self.task.pk}).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('matching_form')).status_code, 302)
+
+    def test_index_version_is_shared_by_processes(self):
+        """Test the index version outlives the cache, so a change in one process reaches the others"""
+        before = index_version()
+        cache.clear()
+        self.assertEqual(index_version(), before)
+        self.novice.profile.skills.add(self.cooking)
+        cache.clear()
+        self.assertNotEqual(index_version(), before)
+
+
+class AutoAssignmentTestCase(TestCase):
+    """Test cases for the event auto-assignment solver"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+
+        self.first_aid = Skill.objects.create(name='First Aid', description='First Aid Description')
+        self.cooking = Skill.objects.create(name='Cooking', description='Cooking Description')
+        self.event = Event.objects.create(
+            name='Staffing Event', description='Staffing Event Description',
+            location='Houston', date=timezone.now() + timedelta(days=10)
+        )
+        self.medic = Task.objects.create(event=self.event, name='Medic', description='Medic Description', capacity=1)
+        self.medic.skills.add(self.first_aid)
+        self.kitchen = Task.objects.create(event=self.event, name='Kitchen', description='Kitchen Description', capacity=2)
+        self.kitchen.skills.add(self.cooking)
+
+        self.nurse = self.create_attendee('nurse', [self.first_aid])
+        self.chef = self.create_attendee('chef', [self.cooking])
+        self.allrounder = self.create_attendee('allrounder', [self.first_aid, self.cooking])
+        self.helper = self.create_attendee('helper', [])
+        self.extra = self.create_attendee('extra', [])
+
+    def create_attendee(self, username, skills):
+        user = User.objects.create_user(username=username, password='testpassword')
+        profile = UserProfile.objects.create(
+            user=user, name=username.title(), address1='1 Main St', city='Houston', state='TX', zipcode='77001',
+        )
+        profile.skills.set(skills)
+        self.event.attendees.add(user)
+        return user
+
+    def test_solve_maximizes_skill_coverage(self):
+        """Test the plan respects capacities and covers as many required skills as possible"""
+        plan = solve_event_assignment(self.event)
+        placed = {(assignment.task_id, assignment.user_id) for assignment in plan.assignments}
+
+        self.assertEqual(len(placed), 3)
+        self.assertEqual(plan.skill_coverage, 3)
+        self.assertEqual(sum(1 for task_id, _ in placed if task_id == self.medic.pk), 1)
+        self.assertIn((self.kitchen.pk, self.chef.pk), placed)
+        self.assertEqual(len(plan.unassigned), 2)
+        self.assertFalse(Task.attendees.through.objects.exists())
+
+    def test_existing_assignments_are_kept(self):
+        """Test attendees with a task and full tasks are left alone"""
+        self.medic.attendees.add(self.helper)
+        self.event.refresh_from_db()
+
+        plan = solve_event_assignment(self.event)
+        self.assertNotIn(self.medic.pk, {assignment.task_id for assignment in plan.assignments})
+        self.assertNotIn(self.helper.pk, {assignment.user_id for assignment in plan.assignments})
+        self.assertEqual(len(plan.assignments), 2)
+
+    def test_apply_writes_once_and_recounts(self):
+        """Test applying a plan inserts every assignment in one statement and refreshes counters"""
+        plan = solve_event_assignment(self.event)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(apply_assignment(plan), 3)
+        table = Task.attendees.through._meta.db_table
+        inserts = [query for query in queries if query['sql'].startswith('INSERT') and f'"{table}"' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(VolunteerStats.objects.filter(tasks_assigned=1).count(), 3)
+
+        self.medic.refresh_from_db()
+        self.kitchen.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((self.medic.attendee_count, self.kitchen.attendee_count), (1, 2))
+        self.assertEqual(self.event.unassigned_attendee_count, 3)
+        self.assertEqual(solve_event_assignment(self.event).assignments, [])
+
+    def test_apply_rejects_a_stale_plan(self):
+        """Test a plan is not applied once the Event's staffing changed since it was solved"""
+        plan = solve_event_assignment(self.event)
+        self.assertEqual(assign_volunteer(self.kitchen, self.chef), ASSIGNED)
+
+        with self.assertRaises(StalePlanError):
+            apply_assignment(plan)
+        self.assertEqual(Task.attendees.through.objects.count(), 1)
+
+    def test_apply_rechecks_a_plan_without_state(self):
+        """Test assignments made after solving are not overfilled or duplicated, and only written ones are counted"""
+        plan = solve_event_assignment(self.event)
+        plan.state = None
+        self.assertEqual(assign_volunteer(self.medic, self.helper), ASSIGNED)
+        self.assertEqual(assign_volunteer(self.kitchen, self.chef), ASSIGNED)
+
+        self.assertEqual(apply_assignment(plan), 1)
+        self.medic.refresh_from_db()
+        self.kitchen.refresh_from_db()
+        self.assertEqual((self.medic.attendee_count, self.kitchen.attendee_count), (1, 2))
+        self.assertEqual(self.chef.tasks.count(), 1)
+
+    def test_preview_and_apply_views(self):
+        """Test the preview does not write and posting applies the plan"""
+        self.client.force_login(self.admin)
+        url = reverse('auto_assign_event', args=[self.event.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Chef')
+        self.assertFalse(Task.attendees.through.objects.exists())
+
+        plan = response.context['plan']
+        data = {
+            'state': plan.state,
+            'assignment': [f'{assignment.task_id}:{assignment.user_id}' for assignment in plan.assignments],
+        }
+        response = self.client.post(url, data)
+        self.assertRedirects(response, reverse('view_event', args=[self.event.pk]))
+        self.assertEqual(
+            set(Task.attendees.through.objects.values_list('task_id', 'user_id')),
+            {(assignment.task_id, assignment.user_id) for assignment in plan.assignments},
+        )
+
+    def test_apply_view_rejects_a_changed_event(self):
+        """Test posting a preview after the Event changed applies nothing and shows a new preview"""
+        self.client.force_login(self.admin)
+        url = reverse('auto_assign_event', args=[self.event.pk])
+        plan = self.client.get(url).context['plan']
+        self.assertEqual(assign_volunteer(self.kitchen, self.chef), ASSIGNED)
+
+        data = {
+            'state': plan.state,
+            'assignment': [f'{assignment.task_id}:{assignment.user_id}' for assignment in plan.assignments],
+        }
+        response = self.client.post(url, data)
+        self.assertRedirects(response, url)
+        self.assertEqual(Task.attendees.through.objects.count(), 1)
+
+        self.assertEqual(self.client.post(url, {'state': plan.state, 'assignment': 'chef'}).status_code, 400)
+
+    def test_command_dry_run(self):
+        """Test the management command only writes without --dry-run"""
+        out = StringIO()
+        call_command('auto_assign_event', self.event.pk, '--dry-run', stdout=out)
+        self.assertIn('Dry run: 3 assignments', out.getvalue())
+        self.assertFalse(Task.attendees.through.objects.exists())
+
+        call_command('auto_assign_event', self.event.pk, stdout=StringIO())
+        self.assertEqual(Task.attendees.through.objects.count(), 3)
+
+
+class VolunteerSearchTestCase(TestCase):
+    """Test cases for the inverted skill index and volunteer search"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+
+        self.first_aid = Skill.objects.create(name='First Aid', description='First Aid Description')
+        self.cooking = Skill.objects.create(name='Cooking', description='Cooking Description')
+        self.driving = Skill.objects.create(name='Driving', description='Driving Description')
+        today = timezone.now().date()
+        self.today = today
+
+        self.medic = self.create_volunteer('medic', [self.first_aid, self.driving])
+        self.chef = self.create_volunteer('chef', [self.cooking], start=today + timedelta(days=10))
+        self.both = self.create_volunteer('both', [self.first_aid, self.cooking], end=today + timedelta(days=5))
+        self.none = self.create_volunteer('none', [])
+
+    def create_volunteer(self, username, skills, start=None, end=None):
+        user = User.objects.create_user(username=username, first_name=username.title(), password='testpassword')
+        profile = UserProfile.objects.create(
+            user=user, name=username.title(), address1='1 Main St', city='Houston', state='TX', zipcode='77001',
+            start_availability=start, end_availability=end,
+        )
+        profile.skills.set(skills)
+        return user
+
+    def search(self, **kwargs):
+        index = get_volunteer_index()
+        return [index.user_ids[i] for i in index.search(**kwargs)]
+
+    def test_skill_queries(self):
+        """Test AND and OR skill queries"""
+        self.assertEqual(self.search(all_skills=[self.first_aid.pk]), [self.medic.pk, self.both.pk])
+        self.assertEqual(self.search(all_skills=[self.first_aid.pk, self.cooking.pk]), [self.both.pk])
+        self.assertEqual(self.search(any_skills=[self.cooking.pk, self.driving.pk]), [self.medic.pk, self.chef.pk, self.both.pk])
+        self.assertEqual(self.search(), [self.medic.pk, self.chef.pk, self.both.pk, self.none.pk])
+        self.assertEqual(self.search(all_skills=[self.first_aid.pk], user_ids=[self.both.pk]), [self.both.pk])
+
+    def test_availability_window(self):
+        """Test volunteers must be available for the whole window"""
+        window = {'available_from': self.today + timedelta(days=3), 'available_until': self.today + timedelta(days=12)}
+        self.assertEqual(self.search(**window), [self.medic.pk, self.none.pk])
+        self.assertEqual(self.search(available_from=self.today + timedelta(days=11)), [self.medic.pk, self.chef.pk, self.none.pk])
+
+    def test_counts_follow_skill_changes(self):
+        """Test per-skill counts and that the index is rebuilt when skills change"""
+        self.assertEqual(get_volunteer_index().skill_counts()[self.first_aid.pk], 2)
+        self.none.profile.skills.add(self.first_aid)
+        self.assertEqual(get_volunteer_index().skill_counts()[self.first_aid.pk], 3)
+
+    def test_task_detail_unassigned_users(self):
+        """Test unassigned attendees with the required skills are listed first without a query per user"""
+        event = Event.objects.create(name='Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        task = Task.objects.create(event=event, name='Task', description='Description')
+        task.skills.add(self.cooking)
+        event.attendees.add(self.medic, self.chef, self.both, self.none)
+        task.attendees.add(self.chef)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('view_task', args=[task.pk]))
+        with self.assertNumQueries(13):
+            response = self.client.get(reverse('view_task', args=[task.pk]))
+        self.assertEqual([user.pk for user in response.context['unassigned_users']], [self.both.pk, self.medic.pk, self.none.pk])
+        self.assertEqual(response.context['unassigned_users'][0].skill_names, 'Cooking, First Aid')
+        self.assertEqual(response.context['attendees'][0].skill_names, 'Cooking')
+
+        for username in ('extra1', 'extra2', 'extra3'):
+            event.attendees.add(self.create_volunteer(username, [self.driving]))
+        self.client.get(reverse('view_task', args=[task.pk]))
+        with self.assertNumQueries(13):
+            self.client.get(reverse('view_task', args=[task.pk]))
+
+    def test_search_view(self):
+        """Test the search page filters volunteers and reports the count"""
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('volunteer_search'), {'skills': [self.first_aid.pk, self.cooking.pk], 'match': 'any'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([volunteer.user_id for volunteer in response.context['volunteers']], [self.medic.pk, self.chef.pk, self.both.pk])
+        self.assertContains(response, '3 Volunteers')
+
+        response = self.client.get(reverse('skill_browser'))
+        self.assertEqual([skill.volunteer_count for skill in response.context['skills']], [2, 2, 1])
+
+
+class TaskCapacityTestCase(TestCase):
+    """Test cases for capacity-safe task assignment and the waitlist"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.event = Event.objects.create(name='Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        self.task = Task.objects.create(event=self.event, name='Task', description='Description', capacity=1)
+        self.first = User.objects.create_user(username='first', password='testpassword')
+        self.second = User.objects.create_user(username='second', password='testpassword')
+        self.third = User.objects.create_user(username='third', password='testpassword')
+
+    def test_assign_until_full(self):
+        """Test assignment results and counters at capacity"""
+        self.assertEqual(assign_volunteer(self.task, self.first), ASSIGNED)
+        self.assertEqual(assign_volunteer(self.task, self.first), ALREADY_ASSIGNED)
+        self.assertEqual(assign_volunteer(self.task, self.second, waitlist=False), FULL)
+        self.assertEqual(assign_volunteer(self.task, self.second), WAITLISTED)
+        self.assertEqual(assign_volunteer(self.task, self.third), WAITLISTED)
+
+        self.task.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual(self.task.attendee_count, 1)
+        self.assertEqual(self.event.unassigned_attendee_count, 1)
+        self.assertEqual(list(self.task.attendees.all()), [self.first])
+
+    def test_unlimited_capacity(self):
+        """Test a negative capacity never fills up"""
+        self.task.capacity = -1
+        self.task.save()
+        for user in (self.first, self.second, self.third):
+            self.assertEqual(assign_volunteer(self.task, user), ASSIGNED)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.attendee_count, 3)
+
+    def test_unassign_promotes_waitlist(self):
+        """Test removing a volunteer hands the place to the first waitlisted volunteer"""
+        assign_volunteer(self.task, self.first)
+        assign_volunteer(self.task, self.second)
+        assign_volunteer(self.task, self.third)
+
+        self.assertEqual(unassign_volunteer(self.task, self.first), self.second)
+        self.assertEqual(list(self.task.attendees.all()), [self.second])
+        self.assertEqual(list(self.task.waitlist.values_list('user', flat=True)), [self.third.pk])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.attendee_count, 1)
+
+    def test_raising_capacity_promotes_waitlist(self):
+        """Test raising a Task's capacity in the edit view or an import assigns waitlisted volunteers"""
+        for user in (self.first, self.second, self.third):
+            assign_volunteer(self.task, user)
+        self.client.force_login(self.admin)
+        self.client.post(reverse('edit_task', kwargs={'pk': self.task.pk}), {
+            'name': 'Task', 'description': 'Description', 'capacity': 2, 'location': 'Houston',
+        })
+        self.assertEqual(list(self.task.attendees.order_by('pk')), [self.first, self.second])
+        self.assertEqual(list(self.task.waitlist.values_list('user', flat=True)), [self.third.pk])
+
+        tasks = BytesIO(b"event,name,description,capacity,location\nEvent,Task,Description,5,Houston\n")
+        import_records({'tasks': (tasks, 'tasks.csv')})
+        self.assertEqual(self.task.attendees.count(), 3)
+        self.assertFalse(self.task.waitlist.exists())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.attendee_count, 3)
+
+    def test_join_event_twice(self):
+        """Test joining an event is idempotent"""
+        self.assertTrue(join_event(self.event, self.first))
+        self.assertFalse(join_event(self.event, self.first))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+
+    def test_assign_view_reports_full(self):
+        """Test the assign view waitlists volunteers once the task is full"""
+        self.client.force_login(self.admin)
+        self.client.post(reverse('assign_user_to_task', args=[self.first.pk, self.task.pk]))
+        response = self.client.post(reverse('assign_user_to_task', args=[self.second.pk, self.task.pk]), follow=True)
+        self.assertContains(response, 'is full')
+        self.assertEqual(self.task.attendees.count(), 1)
+        self.assertTrue(WaitlistEntry.objects.filter(task=self.task, user=self.second).exists())
+
+
+class TaskCapacityStressTestCase(TransactionTestCase):
+    """Test capacity holds under concurrent sign-ups"""
+
+    def test_concurrent_assignments(self):
+        """Test 200 concurrent assignments never exceed a task's capacity"""
+        event = Event.objects.create(name='Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        task = Task.objects.create(event=event, name='Task', description='Description', capacity=20)
+        users = User.objects.bulk_create([User(username=f'volunteer{i}') for i in range(200)])
+
+        def assign(user):
+            try:
+                return assign_volunteer(task, user)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(assign, users))
+
+        task.refresh_from_db()
+        self.assertEqual(results.count(ASSIGNED), 20)
+        self.assertEqual(results.count(WAITLISTED), 180)
+        self.assertEqual(task.attendees.count(), 20)
+        self.assertEqual(task.attendee_count, 20)
+        self.assertEqual(task.waitlist.count(), 180)
+
+
+class LeaveEventTestCase(TestCase):
+    """Test cases for removing attendees from an event"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.event = Event.objects.create(name='Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        self.other_event = Event.objects.create(name='Other', description='Description', location='Houston', date=timezone.now() + timedelta(days=2))
+        self.task = Task.objects.create(event=self.event, name='Task', description='Description', capacity=2)
+        self.other_task = Task.objects.create(event=self.other_event, name='Other Task', description='Description')
+
+        self.users = [User.objects.create_user(username=f'volunteer{i}', password='testpassword') for i in range(4)]
+        self.event.attendees.add(*self.users)
+        self.other_event.attendees.add(self.users[0])
+        self.task.attendees.add(self.users[0], self.users[1])
+        self.other_task.attendees.add(self.users[0])
+        assign_volunteer(self.task, self.users[2])
+
+    def test_leave_keeps_other_events(self):
+        """Test leaving an event only drops assignments in that event"""
+        self.client.force_login(self.users[0])
+        self.client.post(reverse('leave_event', args=[self.event.pk]))
+
+        self.assertFalse(self.event.attendees.filter(pk=self.users[0].pk).exists())
+        self.assertTrue(self.other_task.attendees.filter(pk=self.users[0].pk).exists())
+        self.assertTrue(self.other_event.attendees.filter(pk=self.users[0].pk).exists())
+
+        self.task.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual(list(self.task.attendees.order_by('pk')), [self.users[1], self.users[2]])
+        self.assertEqual(self.task.attendee_count, 2)
+        self.assertEqual(self.event.attendee_count, 3)
+        self.assertFalse(self.task.waitlist.exists())
+
+    def test_bulk_removal_query_count(self):
+        """Test removing many attendees takes the same number of queries as removing one"""
+        self.task.waitlist.all().delete()
+        with CaptureQueriesContext(connection) as one:
+            remove_event_attendees(self.event, [self.users[1].pk])
+        with self.assertNumQueries(len(one)):
+            self.assertEqual(remove_event_attendees(self.event, [self.users[0].pk, self.users[2].pk, self.users[3].pk]), 3)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 0)
+
+    def test_bulk_removal_view(self):
+        """Test admins can remove several attendees at once"""
+        self.client.force_login(self.admin)
+        url = reverse('remove_event_attendees', args=[self.event.pk])
+        self.assertContains(self.client.get(url), 'volunteer3')
+
+        response = self.client.post(url, {'attendees': [self.users[1].pk, self.users[3].pk]})
+        self.assertRedirects(response, reverse('view_event', args=[self.event.pk]))
+        self.assertEqual(set(self.event.attendees.all()), {self.users[0], self.users[2]})
+        self.assertEqual(set(self.task.attendees.all()), {self.users[0], self.users[2]})
+
+    def test_bulk_removal_view_checks_permission_first(self):
+        """Test users who are not admins are turned away alike whether or not the Event exists"""
+        for url in [reverse('remove_event_attendees', args=[self.event.pk]), reverse('remove_event_attendees', args=[self.event.pk + 100])]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302)
+            self.assertIn(reverse('login'), response.url)
+
+        self.client.force_login(self.users[0])
+        self.assertRedirects(self.client.get(reverse('remove_event_attendees', args=[self.event.pk + 100])), reverse('home'))
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('remove_event_attendees', args=[self.event.pk + 100])).status_code, 404)
+
+
+class DatabaseTuningTestCase(TestCase):
+    """Test the SQLite connection tuning"""
+
+    def test_sqlite_pragmas(self):
+        """Test new SQLite connections get the configured PRAGMAs"""
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+class FragmentCacheTestCase(TestCase):
+    """Test cases for version-keyed fragment caching"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.user = User.objects.create_user(username='volunteer', password='testpassword')
+        self.user.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.event = Event.objects.create(name='Cached Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        self.client.force_login(self.user)
+
+    def test_table_is_served_from_cache(self):
+        """Test a repeated render skips the table query"""
+        def page_queries(queries):
+            return [query for query in queries if 'FROM "main_event"' in query['sql'] and 'LIMIT' in query['sql']]
+
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse('event_browser'))
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(reverse('event_browser'))
+        self.assertEqual(len(page_queries(first)), 1)
+        self.assertEqual(page_queries(second), [])
+        self.assertContains(response, 'Cached Event')
+
+    def test_edits_invalidate_the_table(self):
+        """Test saving a row changes the rendered table"""
+        self.assertContains(self.client.get(reverse('event_browser')), 'Cached Event')
+        self.event.name = 'Renamed Event'
+        self.event.save()
+        response = self.client.get(reverse('event_browser'))
+        self.assertContains(response, 'Renamed Event')
+        self.assertNotContains(response, 'Cached Event')
+
+    def test_attendance_invalidates_the_table(self):
+        """Test joining an event updates the user's event list"""
+        self.assertNotContains(self.client.get(reverse('home')), 'Cached Event')
+        join_event(self.event, self.user)
+        self.assertContains(self.client.get(reverse('home')), 'Cached Event')
+
+    def test_versions_are_shared_by_processes(self):
+        """Test version stamps outlive the cache, so a bump in one process reaches the others"""
+        before = model_versions()
+        cache.clear()
+        self.assertEqual(model_versions(), before)
+        self.event.name = 'Renamed Event'
+        self.event.save()
+        cache.clear()
+        self.assertNotEqual(model_versions(), before)
+
+    def test_rolled_back_versions_are_not_reused(self):
+        """Test a stamp bumped in a rolled back transaction is never handed out again"""
+        before = model_versions()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.event.save()
+                during = model_versions()
+                raise RuntimeError
+        self.assertEqual(model_versions(), before)
+        self.event.save()
+        self.assertNotIn(model_versions(), (before, during))
+
+    def test_unversioned_records_are_not_cached(self):
+        """Test tables of other records render without caching"""
+        context = {'records': [self.event], 'fields': ['name'], 'headers': ['Name']}
+        self.assertIsNone(queryset_fragment_key('table', context['records']))
+        self.assertIn('Cached Event', render_to_string('partials/table.html', context))
+        self.assertIsNone(queryset_fragment_key('table', Notification.objects.all()))
+
+    def test_skill_browser_is_cached(self):
+        """Test the skill browser serves skills from the cache until a skill changes"""
+        Skill.objects.create(name='Welding', description='Welding Description')
+        self.client.get(reverse('skill_browser'))
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(reverse('skill_browser'))
+        self.assertFalse(any('FROM "main_skill"' in query['sql'] for query in cached))
+
+        Skill.objects.create(name='Painting', description='Painting Description')
+        self.assertContains(self.client.get(reverse('skill_browser')), 'Painting')
+
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test cases for ETag and Last-Modified handling on event, task and report pages"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        self.volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.event = Event.objects.create(name='Conditional Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        self.task = Task.objects.create(name='Setup', description='Setup Description', event=self.event, capacity=5)
+        self.review = EventReview.objects.create(event=self.event, rating=4, comments='Good')
+        self.event_url = reverse('view_event', kwargs={'pk': self.event.pk})
+        self.client.force_login(self.admin)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_event_is_not_modified(self):
+        """Test a repeated request with the ETag or modification time gets a 304 without rendering"""
+        response = self.client.get(self.event_url)
+        self.assertIn('private', response['Cache-Control'])
+
+        with self.assertNumQueries(4):
+            not_modified = self.client.get(self.event_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+        not_modified = self.client.get(self.event_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_event_changes_change_the_etag(self):
+        """Test attendance, task edits and deleted reviews each produce a new ETag"""
+        etags = [self.etag(self.event_url)]
+
+        join_event(self.event, self.volunteer)
+        etags.append(self.etag(self.event_url))
+
+        self.task.name = 'Teardown'
+        self.task.save()
+        etags.append(self.etag(self.event_url))
+
+        self.review.delete()
+        etags.append(self.etag(self.event_url))
+
+        self.assertEqual(len(set(etags)), 4)
+        self.assertEqual(self.client.get(self.event_url, HTTP_IF_NONE_MATCH=etags[-1]).status_code, 304)
+
+    def test_etag_is_per_user(self):
+        """Test users with different roles cannot share a cached event page"""
+        admin_etag = self.etag(self.event_url)
+        self.client.force_login(self.volunteer)
+        self.assertNotEqual(self.etag(self.event_url), admin_etag)
+        self.assertEqual(self.client.get(self.event_url, HTTP_IF_NONE_MATCH=admin_etag).status_code, 200)
+
+    def test_pending_messages_are_rendered(self):
+        """Test a page with messages to show is never answered with a 304"""
+        etag = self.etag(self.event_url)
+        self.client.post(reverse('assign_user_to_task', kwargs={'task_id': self.task.pk, 'user_id': self.volunteer.pk}))
+        response = self.client.get(self.event_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Assigned volunteer to Setup.')
+
+    def test_task_assignment_changes_the_etag(self):
+        """Test the task page's ETag follows its assignments"""
+        url = reverse('view_task', kwargs={'pk': self.task.pk})
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        assign_volunteer(self.task, self.volunteer)
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_report_csv_is_not_modified(self):
+        """Test the CSV report is not regenerated for an unchanged event"""
+        url = reverse('generate_event_report_csv', kwargs={'pk': self.event.pk})
+        response = self.client.get(url)
+        b''.join(response.streaming_content)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        join_event(self.event, self.volunteer)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_report_csv_follows_attendee_history(self):
+        """Test the CSV report's ETag changes when an assigned volunteer joins another event"""
+        assign_volunteer(self.task, self.volunteer)
+        url = reverse('generate_event_report_csv', kwargs={'pk': self.event.pk})
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        other = Event.objects.create(name='Other Event', description='Description', location='Austin', date=timezone.now())
+        join_event(other, self.volunteer)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Other Event', b''.join(response.streaming_content))
+
+
+@override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+class RequestProfilingTestCase(TestCase):
+    """Test cases for the request profiling middleware and stats"""
+
+    def setUp(self):
+        """Set up test data"""
+        request_stats.reset()
+        self.addCleanup(request_stats.reset)
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.event = Event.objects.create(name='Profiled Event', description='Description', location='Houston', date=timezone.now() + timedelta(days=1))
+        self.client.force_login(self.admin)
+
+    def route(self, name):
+        return next(summary for summary in request_stats.snapshot() if summary['route'] == name)
+
+    def test_server_timing_header(self):
+        """Test sampled responses report their SQL, template and total time"""
+        response = self.client.get(reverse('view_event', kwargs={'pk': self.event.pk}))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, dup;desc="\d+ repeated queries", total;dur=[\d.]+$')
+
+        summary = self.route('view_event')
+        self.assertEqual(summary['requests'], 1)
+        self.assertGreater(summary['max_queries'], 0)
+        self.assertGreater(summary['avg_template_ms'], 0)
+
+    def test_server_timing_is_only_sent_to_admins(self):
+        """Test other users get no Server-Timing header unless DEBUG is on, but are still profiled"""
+        url = reverse('view_event', kwargs={'pk': self.event.pk})
+        self.client.logout()
+        self.assertNotIn('Server-Timing', self.client.get(url))
+        volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.client.force_login(volunteer)
+        self.assertNotIn('Server-Timing', self.client.get(url))
+        self.assertEqual(self.route('view_event')['requests'], 2)
+
+        with self.settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(url))
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_profiled(self):
+        """Test a zero sample rate leaves responses and stats untouched"""
+        response = self.client.get(reverse('view_event', kwargs={'pk': self.event.pk}))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(request_stats.snapshot(), [])
+
+    def test_duplicate_queries_are_fingerprinted(self):
+        """Test repeated queries are grouped regardless of their parameters"""
+        self.assertEqual(
+            query_fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s)'),
+            query_fingerprint('SELECT  1 FROM t WHERE id IN (%s, %s, %s)'),
+        )
+        self.assertNotEqual(query_fingerprint('SELECT 1 FROM t'), query_fingerprint('SELECT 2 FROM t'))
+
+        profile = RequestProfile()
+        with profile.capture():
+            for event in Event.objects.all():
+                list(Task.objects.filter(event=event))
+            list(Task.objects.filter(event=self.event))
+        self.assertEqual(profile.query_count, 3)
+        self.assertEqual(list(profile.duplicates.values()), [2])
+
+    def test_streamed_reports_are_profiled_until_exhausted(self):
+        """Test queries run while a report streams are recorded"""
+        response = self.client.get(reverse('generate_event_report_csv', kwargs={'pk': self.event.pk}))
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(any(summary['route'] == 'generate_event_report_csv' for summary in request_stats.snapshot()))
+
+        b''.join(response.streaming_content)
+        self.assertGreater(self.route('generate_event_report_csv')['max_queries'], 0)
+
+    def test_stats_endpoint(self):
+        """Test admins can read and clear the stats and volunteers cannot"""
+        self.client.get(reverse('view_event', kwargs={'pk': self.event.pk}))
+        stats = self.client.get(reverse('request_stats')).json()
+        self.assertEqual(stats['sample_rate'], 1)
+        self.assertIn('view_event', [summary['route'] for summary in stats['routes']])
+
+        self.assertEqual(self.client.post(reverse('request_stats')).status_code, 204)
+        self.assertEqual([summary['route'] for summary in request_stats.snapshot()], ['request_stats'])
+
+        volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.client.force_login(volunteer)
+        self.assertEqual(self.client.get(reverse('request_stats')).status_code, 302)
+
+
+class QueryBudgetTestCase(TestCase):
+    """Test cases for the query counts of every named route, at a small and a large data size
+
+    Each route is requested by an admin and a volunteer with a cold cache, once with SMALL rows of each kind and once with
+    LARGE. The count must not grow with the data and must equal the route's entry in main/query_budgets.json. After a
+    deliberate change to a view's queries, rerun with UPDATE_QUERY_BUDGETS=1 to rewrite the file and commit it with the change.
+    """
+    SMALL = 10
+    LARGE = 1000
+    BUDGET_FILE = Path(__file__).resolve().parent / 'query_budgets.json'
+
+    # The object each URL keyword argument points at, by default and for routes where 'pk' is not an Event.
+    DEFAULT_OBJECTS = {'pk': 'event', 'event_id': 'event', 'event_pk': 'event', 'task_id': 'task', 'user_id': 'volunteer'}
+    ROUTE_OBJECTS = {
+        'view_notification': 'notification',
+        'report_job_status': 'report_job',
+        'report_job_download': 'report_job',
+        'view_task': 'task',
+        'edit_task': 'task',
+        'delete_task': 'task',
+        'edit_event_review': 'event_review',
+        'edit_skill_management': 'skill',
+    }
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword', first_name='Ada', last_name='Admin')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.volunteer = User.objects.create_user(username='volunteer', password='testpassword', first_name='Val', last_name='Volunteer')
+        self.volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        for user in (self.admin, self.volunteer):
+            UserProfile.objects.create(user=user, name=user.get_full_name(), address1='1 Main St', city='Houston', state='TX', zipcode='77001')
+
+        self.skill = Skill.objects.create(name='Skill 0', description='Description')
+        self.event = Event.objects.create(name='Event 0', description='Description', location='Houston', date=timezone.now() + timedelta(days=1), admin=self.admin)
+        self.task = Task.objects.create(name='Task 0', description='Description', event=self.event, capacity=-1)
+        self.task.skills.add(self.skill)
+        self.event.attendees.add(self.volunteer)
+        self.task.attendees.add(self.volunteer)
+        self.event_review = EventReview.objects.create(event=self.event, rating=5, comments='Review 0', created_by=self.volunteer)
+        self.notification = Notification.objects.create(event=self.event, recipient=self.volunteer, subject='Notification 0', body='Body')
+        self.report_job = ReportJob.objects.create(event=self.event, version='0')
+        self.rows = 1
+
+    def grow(self, size):
+        """Adds rows until there are size of each: events, skills, tasks, volunteers, attendances, reviews and notifications"""
+        start, self.rows = self.rows, size
+        numbers = range(start, size)
+        date = timezone.now() + timedelta(days=2)
+
+        skills = Skill.objects.bulk_create([Skill(name=f'Skill {i}', description='Description') for i in numbers])
+        events = Event.objects.bulk_create([Event(name=f'Event {i}', description='Description', location='Austin', date=date) for i in numbers])
+        tasks = Task.objects.bulk_create([Task(name=f'Task {i}', description='Description', event=self.event, capacity=size) for i in numbers])
+        users = User.objects.bulk_create([User(username=f'user{i}', first_name='User', last_name=str(i), password='!') for i in numbers])
+        profiles = UserProfile.objects.bulk_create([
+            UserProfile(user=user, name=user.get_full_name(), address1='1 Main St', city='Houston', state='TX', zipcode='77001') for user in users
+        ])
+        UserProfile.skills.through.objects.bulk_create([
+            UserProfile.skills.through(userprofile_id=profile.pk, skill_id=skill.pk) for profile, skill in zip(profiles, skills)
+        ])
+        Task.skills.through.objects.bulk_create([Task.skills.through(task_id=task.pk, skill_id=self.skill.pk) for task in tasks])
+        Event.attendees.through.objects.bulk_create(
+            [Event.attendees.through(event_id=self.event.pk, user_id=user.pk) for user in users]
+            + [Event.attendees.through(event_id=event.pk, user_id=self.volunteer.pk) for event in events]
+        )
+        Task.attendees.through.objects.bulk_create(
+            [Task.attendees.through(task_id=self.task.pk, user_id=user.pk) for user in users]
+            + [Task.attendees.through(task_id=task.pk, user_id=self.volunteer.pk) for task in tasks]
+        )
+        WaitlistEntry.objects.bulk_create([WaitlistEntry(task=task, user=user) for task, user in zip(tasks, users)])
+        EventReview.objects.bulk_create([EventReview(event=self.event, rating=4, comments=f'Review {i}', created_by=user) for i, user in zip(numbers, users)])
+        Notification.objects.bulk_create([
+            Notification(event=event, recipient=recipient, subject=f'Notification {event.name}', body='Body')
+            for event in events for recipient in (self.admin, self.volunteer)
+        ])
+
+        Task.objects.all().recount()
+        Event.objects.all().recount()
+        refresh_volunteer_stats()
+        # Bulk inserts send no signals, so the volunteer index is invalidated by hand, as imports do.
+        invalidate_volunteer_index()
+
+    def routes(self):
+        """The named routes of main/urls.py with the URLs to request them at"""
+        for pattern in main_urls.urlpatterns:
+            if pattern.name:
+                kwargs = {
+                    name: getattr(self, self.ROUTE_OBJECTS.get(pattern.name, self.DEFAULT_OBJECTS[name])).pk
+                    for name in pattern.pattern.converters
+                }
+                yield pattern.name, reverse(pattern.name, kwargs=kwargs)
+
+    def measure(self):
+        """The number of queries of a cold GET of every route, by role"""
+        counts = {}
+        for role, user in ((ADMIN, self.admin), (VOLUNTEER, self.volunteer)):
+            self.client.force_login(user)
+            counts[role] = {}
+            for name, url in self.routes():
+                # Every request starts cold and from the same state; opening a notification marks it read.
+                cache.clear()
+                Notification.objects.filter(pk=self.notification.pk).update(is_read=False)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 500, f'{name} ({role})')
+                counts[role][name] = len(queries)
+        return counts
+
+    def test_every_route_has_a_budget(self):
+        """Test the budget file lists exactly the named routes"""
+        budgets = json.loads(self.BUDGET_FILE.read_text())
+        names = sorted(name for name, _ in self.routes())
+        for role in (ADMIN, VOLUNTEER):
+            self.assertEqual(sorted(budgets[role]), names, f'Routes in {self.BUDGET_FILE.name} differ from main/urls.py for {role}')
+
+    # Streamed reports query once per chunk of rows by design; one chunk holds all the rows here.
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0, REPORT_CHUNK_SIZE=10 * LARGE)
+    def test_query_counts_do_not_grow_with_data(self):
+        """Test every route runs the same, budgeted number of queries at both data sizes"""
+        self.grow(self.SMALL)
+        small = self.measure()
+        self.grow(self.LARGE)
+        large = self.measure()
+
+        if os.environ.get('UPDATE_QUERY_BUDGETS') == '1':
+            self.BUDGET_FILE.write_text(json.dumps(large, indent=4, sort_keys=True) + '\n')
+        budgets = json.loads(self.BUDGET_FILE.read_text())
+
+        failures = []
+        for role, counts in large.items():
+            for name, count in counts.items():
+                budget = budgets.get(role, {}).get(name)
+                if small[role][name] != count:
+                    failures.append(f'{name} ({role}): {small[role][name]} queries with {self.SMALL} rows, {count} with {self.LARGE}')
+                elif budget != count:
+                    failures.append(f'{name} ({role}): {count} queries, budget {budget}')
+        self.assertFalse(failures, 'Query counts changed; if intended, rerun with UPDATE_QUERY_BUDGETS=1:\n' + '\n'.join(failures))
+
+
+class ImportTestCase(TestCase):
+    """Test cases for the bulk import of skills, events, volunteers and tasks"""
+
+    SKILLS = "name,description\nFirst Aid,Basic first aid\nCooking,Cooking for crowds\n"
+    EVENTS = (
+        '{"name": "Food Drive", "description": "Collect food", "location": "Houston", "admin": "admin", "urgency": 3, "date": "2030-05-01T09:00"}\n'
+        '\n'
+        '{"name": "Park Cleanup", "description": "Clean the park", "location": "Austin", "admin": "admin", "urgency": "1", "date": "2030-06-01T09:00"}\n'
+    )
+    VOLUNTEERS = (
+        "username,email,first_name,last_name,name,address1,city,state,zipcode,start_availability,end_availability,skills\n"
+        "vera,vera@example.com,Vera,Volunteer,Vera Volunteer,1 Main St,Houston,TX,77001,2030-01-01,2030-12-31,First Aid; Cooking\n"
+        "victor,,Victor,Volunteer,Victor Volunteer,2 Main St,Austin,TX,73301,,,\n"
+    )
+    TASKS = "event,name,description,capacity,location,skills\nFood Drive,Sort cans,Sort the cans,5,Warehouse,Cooking\nFood Drive,First aid tent,Staff the tent,2,Gate,First Aid\n"
+
+    def setUp(self):
+        """Set up test data"""
+        self.admin = User.objects.create_user(username='admin', password='testpassword', first_name='Ada', last_name='Admin')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+
+    def files(self, **contents):
+        extensions = {'events': 'jsonl'}
+        return {kind: (BytesIO(text.encode()), f'{kind}.{extensions.get(kind, "csv")}') for kind, text in contents.items()}
+
+    def import_all(self, **kwargs):
+        return import_records(self.files(skills=self.SKILLS, events=self.EVENTS, volunteers=self.VOLUNTEERS, tasks=self.TASKS), **kwargs)
+
+    def test_import_resolves_references(self):
+        """Test a CSV and JSONL import creates every record with its references resolved by name"""
+        results = self.import_all()
+
+        self.assertEqual([(result.kind, result.created, result.updated, result.invalid) for result in results], [
+            ('skills', 2, 0, 0), ('events', 2, 0, 0), ('volunteers', 2, 0, 0), ('tasks', 2, 0, 0),
+        ])
+        event = Event.objects.get(name='Food Drive')
+        self.assertEqual(event.admin, self.admin)
+        self.assertEqual(event.urgency, EventUrgency.HIGH)
+        self.assertEqual(event.capacity, 7)
+        task = Task.objects.get(name='First aid tent')
+        self.assertEqual(task.event, event)
+        self.assertEqual(list(task.skills.values_list('name', flat=True)), ['First Aid'])
+
+        vera = User.objects.get(username='vera')
+        self.assertEqual(vera.email, 'vera@example.com')
+        self.assertFalse(vera.has_usable_password())
+        self.assertTrue(has_role(vera, VOLUNTEER))
+        self.assertEqual(sorted(vera.profile.skills.values_list('name', flat=True)), ['Cooking', 'First Aid'])
+
+    def test_reimport_updates_matching_records(self):
+        """Test importing rows again updates the changed records and skips the others"""
+        self.import_all()
+        skills = self.SKILLS.replace('Basic first aid', 'Advanced first aid')
+        tasks = self.TASKS.replace('Sort cans,Sort the cans,5', 'Sort cans,Sort the cans,10').replace(',Cooking\n', ',\n')
+        results = import_records(self.files(skills=skills, events=self.EVENTS, volunteers=self.VOLUNTEERS, tasks=tasks))
+
+        self.assertEqual([(result.kind, result.created, result.updated, result.unchanged) for result in results], [
+            ('skills', 0, 1, 1), ('events', 0, 0, 2), ('volunteers', 0, 0, 2), ('tasks', 0, 1, 1),
+        ])
+        self.assertEqual(Skill.objects.count(), 2)
+        self.assertEqual(Skill.objects.get(name='First Aid').description, 'Advanced first aid')
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertFalse(Task.objects.get(name='Sort cans').skills.exists())
+        self.assertEqual(Event.objects.get(name='Food Drive').capacity, 12)
+        self.assertEqual(User.objects.filter(username__in=['vera', 'victor']).count(), 2)
+
+    def test_invalid_rows_are_reported_by_line(self):
+        """Test invalid rows are skipped and reported with their line and the form's errors"""
+        events = (
+            '{"name": "Food Drive", "description": "Collect food", "location": "Houston", "admin": "nobody", "urgency": 3, "date": "2030-05-01T09:00"}\n'
+            '{"name": "Park Cleanup", "description": "Clean the park", "location": "Austin", "admin": "admin", "urgency": 1, "date": "soon"}\n'
+            '{"name": "Bake Sale", "description": "Sell cakes", "location": "Dallas", "admin": "admin", "urgency": 2, "date": "2030-07-01T09:00"}\n'
+        )
+        volunteers = self.VOLUNTEERS.replace('2030-01-01,2030-12-31', '2030-12-31,2030-01-01') + "vera,,,,Again,1 Main St,Houston,TX,77001,,,\n"
+        tasks = self.TASKS.replace('Food Drive', 'Bake Sale') + "Bake Sale,Sort cans,Again,5,Warehouse,\nNowhere,Task,Description,1,Here,\nBake Sale,Task,Description,1,Here,Juggling\n"
+        results = import_records(self.files(skills=self.SKILLS, events=events, volunteers=volunteers, tasks=tasks))
+        errors = {result.kind: result.errors for result in results}
+
+        self.assertEqual(errors['events'], [(1, 'admin: Unknown value: nobody.'), (2, 'date: Enter a valid date/time.')])
+        self.assertEqual(errors['volunteers'], [(2, 'end_availability: The availability must end after it starts.')])
+        self.assertEqual([line for line, _ in errors['tasks']], [4, 5, 6])
+        self.assertIn("No Event is named 'Nowhere'", errors['tasks'][1][1])
+        self.assertEqual(errors['tasks'][0][1], 'Duplicate of an earlier row.')
+        self.assertEqual(errors['tasks'][2][1], 'skills: Unknown values: Juggling.')
+        self.assertEqual(list(Event.objects.values_list('name', flat=True)), ['Bake Sale'])
+        self.assertEqual(Task.objects.count(), 2)
+        # The first row for vera was invalid, so the second one is not a duplicate.
+        self.assertEqual(UserProfile.objects.get(user__username='vera').name, 'Again')
+
+    def test_json_values_are_validated_as_text(self):
+        """Test JSON numbers, booleans and lists are validated like CSV cells"""
+        events = (
+            '{"name": "Food Drive", "description": "Collect food", "location": "Houston", "admin": "admin", "urgency": 3, "date": 20300501}\n'
+            '{"name": "Park Cleanup", "description": "Clean the park", "location": "Austin", "admin": ["admin"], "urgency": 1, "date": true}\n'
+        )
+        results = import_records(self.files(events=events))
+
+        self.assertEqual(results[0].errors, [(2, 'date: Enter a valid date/time.')])
+        self.assertEqual(Event.objects.get().date.date(), datetime(2030, 5, 1).date())
+
+    def test_unreadable_files_are_rejected(self):
+        """Test files that are not UTF-8 or not valid CSV raise ImportFileError and import nothing"""
+        latin1 = {'skills': (BytesIO("name,description\nCaf\xe9,Coffee\n".encode('latin-1')), 'skills.csv')}
+        with self.assertRaisesMessage(ImportFileError, 'skills.csv: expected UTF-8 text.'):
+            import_records(latin1)
+        broken = self.files(skills=self.SKILLS + 'Cooking,' + 'x' * (csv.field_size_limit() + 1) + '\n')
+        with self.assertRaisesMessage(ImportFileError, 'skills.csv, after line 3: field larger than field limit'):
+            import_records(broken)
+        self.assertFalse(Skill.objects.exists())
+
+    def test_importers_must_match_records(self):
+        """Test an importer that does not say how rows match existing records cannot be built"""
+        class PartialImporter(Importer):
+            model = Skill
+            form_class = SkillImportForm
+
+            def key(self, row):
+                return row['name']
+
+        with self.assertRaisesMessage(TypeError, 'existing'):
+            PartialImporter({}, None)
+
+    def test_dry_run_saves_nothing(self):
+        """Test a dry run reports the results but rolls everything back"""
+        results = self.import_all(dry_run=True)
+
+        self.assertEqual(sum(result.created for result in results), 8)
+        self.assertFalse(Skill.objects.exists())
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(User.objects.filter(username='vera').exists())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Test a batch costs the same queries whatever its number of rows"""
+        def measure(rows):
+            skills = "name,description\n" + "".join(f"Skill {rows}.{i},Description\n" for i in range(rows))
+            with CaptureQueriesContext(connection) as queries:
+                import_records(self.files(skills=skills))
+            return len(queries)
+
+        measure(1)
+        self.assertEqual(measure(5), measure(50))
+
+    def test_command(self):
+        """Test the import_kindred command imports files and prints a summary"""
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {}
+            for kind, (file, name) in self.files(skills=self.SKILLS, events=self.EVENTS).items():
+                paths[kind] = os.path.join(directory, name)
+                Path(paths[kind]).write_bytes(file.getvalue())
+            out = StringIO()
+            call_command('import_kindred', skills=paths['skills'], events=paths['events'], batch_size=1, stdout=out)
+
+        self.assertIn('skills: 2 created, 0 updated, 0 unchanged, 0 invalid', out.getvalue())
+        self.assertIn('events: 2 created, 0 updated, 0 unchanged, 0 invalid', out.getvalue())
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_upload_view(self):
+        """Test admins can upload files to import and volunteers cannot"""
+        volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        client = Client()
+        client.force_login(volunteer)
+        self.assertEqual(client.get(reverse('import_data')).status_code, 302)  # Redirect to home
+
+        client.force_login(self.admin)
+        upload = {kind: file for kind, (file, name) in self.files(skills=self.SKILLS).items()}
+        upload['skills'].name = 'skills.csv'
+        response = client.post(reverse('import_data'), upload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Skills: 2 created, 0 updated, 0 unchanged, 0 invalid')
+        self.assertEqual(Skill.objects.count(), 2)
+
+
+class SearchTestCase(TestCase):
+    """Test cases for the full-text search of events, tasks and skills"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.admin.groups.add(Group.objects.get_or_create(name=ADMIN)[0])
+        self.volunteer = User.objects.create_user(username='volunteer', password='testpassword')
+        self.volunteer.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        date = timezone.now() + timedelta(days=1)
+        self.food_drive = Event.objects.create(name='Food Drive', description='Collect cans for the food bank', location='Houston', date=date)
+        self.cleanup = Event.objects.create(name='Park Cleanup', description='Bring gloves, food is provided', location='Austin', date=date)
+        self.cafe = Event.objects.create(name='Café Night', description='Serve coffee', location='Dallas', date=date)
+        self.task = Task.objects.create(event=self.food_drive, name='Sort cans', description='Sort the food', capacity=5, location='Warehouse')
+        self.skill = Skill.objects.create(name='Forklift', description='Can drive a forklift')
+
+    def titles(self, text, **kwargs):
+        return [result.title for result in search(text, **kwargs)]
+
+    def test_query_terms(self):
+        """Test queries are split into words, the last one matched as a prefix while it is typed"""
+        self.assertEqual(query_terms('Food dri'), (['food', 'dri'], True))
+        self.assertEqual(query_terms('food '), (['food'], False))
+        self.assertEqual(query_terms('food d'), (['food'], False))
+        self.assertEqual(query_terms('"food" OR* (NEAR'), (['food', 'or', 'near'], True))
+        self.assertEqual(query_terms(''), ([], False))
+        self.assertEqual(query_terms('Café Crème'), (['cafe', 'creme'], True))
+
+    def test_prefix_matching_and_ranking(self):
+        """Test every term must match, the last as a prefix, and names rank above descriptions"""
+        titles = self.titles('foo')
+        self.assertEqual(titles[0], 'Food Drive')
+        self.assertCountEqual(titles, ['Food Drive', 'Sort cans', 'Park Cleanup'])
+        self.assertEqual(self.titles('food dr'), ['Food Drive'])
+        self.assertEqual(self.titles('fork'), ['Forklift'])
+        self.assertEqual(self.titles('houston'), ['Food Drive'])
+        self.assertEqual(self.titles('food', kinds=['task']), ['Sort cans'])
+        self.assertEqual(self.titles('food AND OR "'), self.titles('food and or'))
+
+    @override_settings(SEARCH_CANDIDATES=20)
+    def test_older_name_matches_outrank_newer_description_matches(self):
+        """Test a name match is ranked even when more newer records match in their descriptions"""
+        Skill.objects.create(name='Gardening', description='Plants')
+        Skill.objects.bulk_create([Skill(name=f'Skill {i}', description='Likes gardening') for i in range(50)])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.titles('gardening')[0], 'Gardening')
+        self.assertEqual(self.titles('garden')[0], 'Gardening')
+
+    def test_case_and_diacritics_are_ignored(self):
+        """Test matching ignores case and accents"""
+        self.assertEqual(self.titles('CAFE'), ['Café Night'])
+        self.assertEqual(self.titles('café'), ['Café Night'])
+        self.assertEqual(self.titles('cafe', kinds=['event']), ['Café Night'])
+        Skill.objects.create(name='Resume writing', description='Help with a curriculum vitae, déjà reviewed')
+        self.assertEqual(self.titles('résumé'), ['Resume writing'])
+        self.assertEqual(self.titles('deja'), ['Resume writing'])
+
+        # Names are indexed folded on every backend, and shown as written.
+        entry = SearchEntry.objects.get(kind='event', object_id=self.cafe.pk)
+        self.assertEqual((entry.title, entry.folded_title), ('Café Night', 'Cafe Night'))
+
+    def test_migration_folds_existing_entries(self):
+        """Test the accent folding migration folds the entries written before it, with its historical models"""
+        SearchEntry.objects.filter(object_id=self.cafe.pk, kind='event').update(folded_title='', body='Crème brûlée')
+        migration = import_module('main.migrations.0040_search_accents')
+        state = MigrationLoader(connection).project_state(('main', '0040_search_accents'))
+        migration.fold_entries(state.apps, None)
+
+        entry = SearchEntry.objects.get(kind='event', object_id=self.cafe.pk)
+        self.assertEqual((entry.folded_title, entry.body), ('Cafe Night', 'Creme brulee'))
+
+    def test_index_follows_saves_and_deletes(self):
+        """Test the index is updated when records are saved and deleted"""
+        self.food_drive.name = 'Canned Goods Drive'
+        self.food_drive.save()
+        self.assertEqual(self.titles('canned'), ['Canned Goods Drive'])
+        self.assertNotIn('Food Drive', self.titles('food'))
+
+        self.food_drive.delete()
+        self.assertEqual(self.titles('canned'), [])
+        self.assertEqual(self.titles('sort'), [])  # The Task was deleted with its Event
+
+    def test_rebuild_indexes_bulk_written_records(self):
+        """Test rebuilding the index picks up records written without signals"""
+        Skill.objects.bulk_create([Skill(name='Welding', description='Joins metal')])
+        self.assertEqual(self.titles('weld'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 6 records.', out.getvalue())
+        self.assertEqual(self.titles('weld'), ['Welding'])
+        self.assertEqual(self.titles('food dr'), ['Food Drive'])
+
+    def test_imported_records_are_indexed(self):
+        """Test bulk imports index what they create"""
+        import_records({'skills': (BytesIO(b"name,description\nWelding,Joins metal\n"), 'skills.csv')})
+        self.assertEqual(self.titles('weld'), ['Welding'])
+
+    def test_typeahead(self):
+        """Test the typeahead returns links to the best matches, and tasks only to admins"""
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('search_typeahead'), {'q': 'food'})
+        self.assertEqual(response.status_code, 200)
+        urls = {result['title']: result['url'] for result in response.json()['results']}
+        self.assertEqual(urls, {
+            'Food Drive': reverse('view_event', kwargs={'pk': self.food_drive.pk}),
+            'Park Cleanup': reverse('view_event', kwargs={'pk': self.cleanup.pk}),
+            'Sort cans': reverse('view_task', kwargs={'pk': self.task.pk}),
+        })
+
+        self.client.force_login(self.volunteer)
+        results = self.client.get(reverse('search_typeahead'), {'q': 'food'}).json()['results']
+        self.assertCountEqual([result['title'] for result in results], ['Food Drive', 'Park Cleanup'])
+
+    def test_typeahead_is_cached_until_records_change(self):
+        """Test repeated typeahead queries hit the cache, and changes to the records invalidate it"""
+        self.client.force_login(self.admin)
+        url = reverse('search_typeahead')
+        self.client.get(url, {'q': 'fork'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'q': 'fork'})
+        self.assertFalse([query for query in queries if 'searchentry' in query['sql']])
+
+        Skill.objects.create(name='Forklift Safety', description='Safe driving')
+        results = self.client.get(url, {'q': 'fork'}).json()['results']
+        self.assertEqual(len(results), 2)
+
+    def test_search_page_and_event_browser(self):
+        """Test the search page lists matches and the event browser filters by search"""
+        self.client.force_login(self.volunteer)
+        response = self.client.get(reverse('search'), {'q': 'fork'})
+        self.assertContains(response, 'Forklift')
+        self.assertContains(response, f"{reverse('event_browser')}?skill={self.skill.pk}")
+
+        response = self.client.get(reverse('event_browser'), {'q': 'food'})
+        self.assertEqual([event.name for event in response.context['events']], ['Food Drive', 'Park Cleanup'])
+
+
+class GeoTestCase(TestCase):
+    """Test cases for geocoding and distance queries"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = Client()
+        date = timezone.now() + timedelta(days=1)
+        self.houston = Event.objects.create(name='Houston Drive', description='Description', location='500 Main St, Houston, TX 77002', date=date)
+        self.austin = Event.objects.create(name='Austin Drive', description='Description', location='Austin', date=date + timedelta(days=1))
+        self.dallas = Event.objects.create(name='Dallas Drive', description='Description', location='Dallas, TX', date=date + timedelta(days=2))
+        self.nowhere = Event.objects.create(name='Online Drive', description='Description', location='Online', date=date + timedelta(days=3))
+        self.user = User.objects.create_user(username='volunteer', password='testpassword')
+        self.user.groups.add(Group.objects.get_or_create(name=VOLUNTEER)[0])
+        self.profile = UserProfile.objects.create(user=self.user, name='Volunteer', address1='1 Main St', city='Houston', state='TX', zipcode='77006')
+
+    def test_geocoding(self):
+        """Test locations are placed by ZIP code, or else by city, and saves keep them current"""
+        self.assertEqual(parse_location('500 Main St, Houston, TX 77002'), ('77002', [('500 main st', 'TX'), ('houston', 'TX')]))
+        self.assertEqual(geocode_text('77002'), (29.7563, -95.365))
+        self.assertAlmostEqual(geocode_text('houston tx')[0], 29.75, places=1)
+        self.assertIsNone(geocode_text('Springfield'))
+
+        self.assertEqual((self.houston.latitude, self.houston.longitude), (29.7563, -95.365))
+        self.assertEqual(self.houston.geocell, geocell(29.7563, -95.365))
+        self.assertAlmostEqual(self.austin.latitude, 30.29, places=1)
+        self.assertIsNone(Event.objects.get(pk=self.nowhere.pk).latitude)
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).latitude, 29.7409)
+
+        self.profile.zipcode = '99999'
+        self.profile.city = 'El Paso'
+        self.profile.save()
+        self.assertAlmostEqual(UserProfile.objects.get(pk=self.profile.pk).longitude, -106.48, places=1)
+
+        Event.objects.bulk_create([Event(name='Bulk Drive', description='Description', location='Dallas')])
+        out = StringIO()
+        call_command('geocode_locations', stdout=out)
+        self.assertIn('Located 5 records.', out.getvalue())
+        self.assertAlmostEqual(Event.objects.get(name='Bulk Drive').latitude, 32.8, places=1)
+
+    def test_migration_geocodes_existing_records(self):
+        """Test the geocoding migration locates the records that existed before it, with its historical models"""
+        Event.objects.filter(pk=self.houston.pk).update(latitude=None, longitude=None, geocell=None)
+        UserProfile.objects.filter(pk=self.profile.pk).update(latitude=None, longitude=None, geocell=None)
+        migration = import_module('main.migrations.0036_geocoding')
+        state = MigrationLoader(connection).project_state(('main', '0036_geocoding'))
+        migration.geocode_locations(state.apps, None)
+
+        self.assertEqual(Event.objects.get(pk=self.houston.pk).latitude, 29.7563)
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).latitude, 29.7409)
+
+    def test_command_invalidates_cached_profiles(self):
+        """Test geocoding again refreshes the cached coordinates nearby events are found from"""
+        self.client.force_login(self.user)
+        names = lambda: [event.name for event in self.client.get(reverse('event_browser'), {'radius': 25}).context['events']]
+        self.assertEqual(names(), ['Houston Drive'])
+
+        UserProfile.objects.filter(pk=self.profile.pk).update(city='Dallas', zipcode='')
+        call_command('geocode_locations', stdout=StringIO())
+        self.assertEqual(names(), ['Dallas Drive'])
+
+    def test_cells_cover_the_radius(self):
+        """Test the grid cells of a radius include every point within it"""
+        for latitude, longitude in [(29.76, -95.37), (0.1, 179.9), (64.8, -147.7)]:
+            cells = set(cells_within(latitude, longitude, 50))
+            for step in range(72):
+                bearing = step * 5
+                for miles in (10, 30, 49.9):
+                    rise = miles / 69.09 * math.cos(math.radians(bearing))
+                    run = miles / 69.09 * math.sin(math.radians(bearing)) / math.cos(math.radians(latitude + rise))
+                    point = (latitude + rise, (longitude + run + 180) % 360 - 180)
+                    if distance_miles(latitude, longitude, *point) <= 50:
+                        self.assertIn(geocell(*point), cells)
+
+    def test_event_browser_distance(self):
+        """Test the event browser filters by radius and sorts by distance from the user or a given place"""
+        self.client.force_login(self.user)
+        names = lambda **params: [event.name for event in self.client.get(reverse('event_browser'), params).context['events']]
+        self.assertEqual(names(radius=25), ['Houston Drive'])
+        self.assertEqual(names(sort='distance'), ['Houston Drive', 'Austin Drive', 'Dallas Drive', 'Online Drive'])
+        self.assertEqual(names(near='Dallas', sort='distance')[0], 'Dallas Drive')
+        self.assertEqual(names(near='78701', radius=50), ['Austin Drive'])
+
+        response = self.client.get(reverse('event_browser'), {'radius': 25})
+        self.assertContains(response, 'Miles')
+        self.assertEqual(response.context['events'][0].distance, 1.9)
+
+        UserProfile.objects.filter(pk=self.profile.pk).update(latitude=None, longitude=None, geocell=None)
+        cache.clear()
+        self.assertEqual(len(names(radius=25)), 4)  # Without a place to measure from, the filter is ignored
+
+    def test_imported_records_are_geocoded(self):
+        """Test bulk imports geocode the events and volunteers they write"""
+        volunteers = b"username,name,address1,city,state,zipcode\nvera,Vera,1 Main St,El Paso,TX,79901\nvic,Vic,1 Main St,Austin,TX,00000\n"
+        import_records({'volunteers': (BytesIO(volunteers), 'volunteers.csv')})
+        self.assertEqual(UserProfile.objects.get(user__username='vera').latitude, 31.758)
+        self.assertAlmostEqual(UserProfile.objects.get(user__username='vic').latitude, 30.29, places=1)
+
+    def test_matching_by_distance(self):
+        """Test volunteers near a Task's Event are local, nearest first, and far ones are not"""
+        task = Task.objects.create(event=self.houston, name='Sort', description='Description', capacity=5)
+        for username, zipcode in [('far', '75201'), ('near', '77098'), ('nearest', '77003')]:
+            user = User.objects.create_user(username=username, password='testpassword')
+            UserProfile.objects.create(user=user, name=username.title(), address1='1 Main St', city='Dallas', state='TX', zipcode=zipcode)
+        matches = rank_volunteers(task)
+        self.assertEqual([match.name for match in matches], ['Nearest', 'Volunteer', 'Near', 'Far'])
+        self.assertEqual([match.location_match for match in matches], [True, True, True, False])
+        self.assertLess(matches[0].distance, 2)
+        self.assertIsNone(matches[3].distance)
+
+
+class VolunteerStatsTestCase(TestCase):
+    """Test cases for the materialized volunteer history and statistics"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        now = timezone.now()
+        self.admin = User.objects.create_user(username='admin', password='testpassword')
+        self.user = User.objects.create_user(username='volunteer', password='testpassword')
+        self.cooking = Skill.objects.create(name='Cooking', description='Description')
+        self.driving = Skill.objects.create(name='Driving', description='Description')
+        self.old_event = Event.objects.create(name='Old Drive', description='Description', location='Houston', date=now - timedelta(days=30), admin=self.admin)
+        self.new_event = Event.objects.create(name='New Drive', description='Description', location='Houston', date=now - timedelta(days=1), admin=self.admin)
+        self.task = Task.objects.create(event=self.new_event, name='Cook', description='Description', capacity=5)
+        self.task.skills.add(self.cooking)
+
+    def stats(self):
+        return VolunteerStats.objects.get(user=self.user)
+
+    def test_stats_follow_attendance_and_reviews(self):
+        """Test joining, assignment, skill and review changes refresh the volunteer's row"""
+        self.user.events.add(self.old_event, self.new_event)
+        self.task.attendees.add(self.user)
+        stats = self.stats()
+        self.assertEqual((stats.events_attended, stats.tasks_assigned), (2, 1))
+        self.assertEqual(stats.skills_used, ['Cooking'])
+        self.assertEqual([event['name'] for event in stats.recent_events], ['New Drive', 'Old Drive'])
+
+        self.driving.task_set.add(self.task)
+        self.assertEqual(self.stats().skills_used, ['Cooking', 'Driving'])
+        self.driving.task_set.clear()
+        self.assertEqual(self.stats().skills_used, ['Cooking'])
+
+        AttendeeReview.objects.create(attendee=self.user, event=self.old_event, rating=5)
+        review = AttendeeReview.objects.create(attendee=self.user, event=self.new_event, rating=2)
+        self.assertEqual((self.stats().review_count, self.stats().average_rating), (2, 3.5))
+        review.attendee = self.admin
+        review.save()
+        self.assertEqual((self.stats().review_count, self.stats().average_rating), (1, 5.0))
+        self.assertEqual(VolunteerStats.objects.get(user=self.admin).average_rating, 2.0)
+
+        self.new_event.attendees.clear()
+        unassign_volunteer(self.task, self.user)
+        stats = self.stats()
+        self.assertEqual((stats.events_attended, stats.tasks_assigned, stats.skills_used), (1, 0, []))
+
+    def test_stats_follow_edits_and_deletes(self):
+        """Test editing or deleting Events, Tasks and Skills refreshes their volunteers, and deleting a user cascades"""
+        self.user.events.add(self.old_event, self.new_event)
+        self.admin.events.add(self.old_event)
+        self.task.attendees.add(self.user)
+
+        self.new_event.name = 'Renamed Drive'
+        self.new_event.save()
+        self.cooking.name = 'Baking'
+        self.cooking.save()
+        stats = self.stats()
+        self.assertEqual(stats.recent_events[0]['name'], 'Renamed Drive')
+        self.assertEqual(stats.skills_used, ['Baking'])
+
+        self.cooking.delete()
+        self.assertEqual(self.stats().skills_used, [])
+        self.new_event.delete()
+        stats = self.stats()
+        self.assertEqual((stats.events_attended, stats.tasks_assigned), (1, 0))
+
+        # The admin's Events are deleted with them, without writing their stats again.
+        self.admin.delete()
+        self.assertFalse(VolunteerStats.objects.filter(user_id=self.admin.pk).exists())
+        self.assertEqual(self.stats().events_attended, 0)
+
+    def test_failed_user_delete_keeps_stats_current(self):
+        """Test a user whose deletion failed still has their stats refreshed afterwards"""
+        self.admin.events.add(self.old_event)
+
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError("Deletion failed")
+
+        post_delete.connect(fail, sender=Event)
+        try:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.admin.delete()
+        finally:
+            post_delete.disconnect(fail, sender=Event)
+
+        self.admin.events.add(self.new_event)
+        self.assertEqual(VolunteerStats.objects.get(user=self.admin).events_attended, 2)
+
+    def test_missing_stats_are_computed(self):
+        """Test stats are computed when first read, and the command catches up data written without signals"""
+        Event.attendees.through.objects.bulk_create([Event.attendees.through(event=self.old_event, user=self.user)])
+        self.assertFalse(VolunteerStats.objects.filter(user=self.user).exists())
+        self.assertEqual(volunteer_stats([self.user.pk])[self.user.pk].events_attended, 1)
+        self.assertEqual(volunteer_stats([0])[0].events_attended, 0)
+
+        Event.attendees.through.objects.bulk_create([Event.attendees.through(event=self.new_event, user=self.user)])
+        self.assertEqual(self.stats().events_attended, 1)
+        out = StringIO()
+        call_command('refresh_volunteer_stats', stdout=out)
+        self.assertIn('Refreshed the stats of 2 users.', out.getvalue())
+        self.assertEqual(self.stats().events_attended, 2)
+
+    @override_settings(VOLUNTEER_STATS_RECENT_EVENTS=2)
+    def test_reports_read_recent_events(self):
+        """Test reports list the most recent previous events from the stats, leaving out the reported Event"""
+        events = [
+            Event.objects.create(name=f'Drive {day}', description='Description', location='Houston', date=timezone.now() - timedelta(days=day))
+            for day in (5, 10, 15)
+        ]
+        self.user.events.add(self.new_event, *events)
+        self.task.attendees.add(self.user)
+        self.assertEqual(len(self.stats().recent_events), 3)
+
+        report = build_event_report(self.new_event.pk)
+        attendee = report.tasks[0].attendees[0]
+        self.assertEqual(attendee.previous_events, events[:2])
+        self.assertEqual(attendee.previous_events[0].date.date(), events[0].date.date())
+        self.assertTrue(attendee.earlier_events)
+        rows = [row for row in iter_event_report_rows(self.new_event) if row[:1] == ['Cook']]
+        self.assertTrue(rows[0][-1].endswith('and earlier events'))
+
+        events[2].delete()
+        self.assertFalse(build_event_report(self.new_event.pk).tasks[0].attendees[0].earlier_events)
+
+    def test_only_name_and_date_edits_refresh_attendees(self):
+        """Test saving an Event refreshes its attendees' stats only when its name or date changes"""
+        self.user.events.add(self.new_event)
+        stats_queries = lambda queries: [query for query in queries if 'main_volunteerstats' in query['sql']]
+
+        self.new_event.description = 'New description'
+        with CaptureQueriesContext(connection) as queries:
+            self.new_event.save()
+        self.assertEqual(stats_queries(queries), [])
+        with CaptureQueriesContext(connection) as queries:
+            Event.objects.get(pk=self.new_event.pk).save(update_fields=['description'])
+        self.assertEqual(stats_queries(queries), [])
+
+        self.new_event.date = self.new_event.date - timedelta(days=1)
+        self.new_event.save()
+        self.assertEqual(self.stats().recent_events[0]['date'][:10], str(self.new_event.date.date()))
+
+    def test_task_history_shows_stats(self):
+        """Test the task history page shows the volunteer's stats"""
+        self.user.events.add(self.new_event)
+        self.task.attendees.add(self.user)
+        AttendeeReview.objects.create(attendee=self.user, event=self.new_event, rating=4)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('volunteer_history'))
+        self.assertEqual(response.context['stats'].average_rating, 4.0)
+        self.assertContains(response, 'Events Attended')
+        self.assertContains(response, 'Cooking')
@@ -9,6 +9,7 @@ urlpatterns = [
     
     path('notification/new/', views.NotificationCreateView.as_view(), name='new_notification'),
     path('inbox/', views.NotificationInboxView.as_view(), name='inbox'),
+    path('inbox/json/', views.NotificationInboxJsonView.as_view(), name='inbox_json'),
     path('inbox/view/<int:pk>/', views.NotificationDetailView.as_view(), name='view_notification'),
     
     path('account/', views.AccountView.as_view(), name='account'),
@@ -31,6 +32,13 @@ urlpatterns = [
     path('event/delete/<int:pk>/', views.EventDeleteView.as_view(), name='delete_event'),
     path('event/<int:pk>/report-pdf/', views.generate_event_report_pdf, name='generate_event_report_pdf'),
     path('event/<int:pk>/report-csv/', views.export_event_report_csv, name='generate_event_report_csv'),
+    path('event/<int:pk>/attendees/remove/', views.RemoveEventAttendeesView.as_view(), name='remove_event_attendees'),
+    path('event/<int:pk>/auto-assign/', views.AutoAssignEventView.as_view(), name='auto_assign_event'),
+    path('event/<int:pk>/report-jobs/', views.ReportJobCreateView.as_view(), name='new_report_job'),
+    path('report-job/<int:pk>/', views.ReportJobStatusView.as_view(), name='report_job_status'),
+    path('report-job/<int:pk>/download/', views.ReportJobDownloadView.as_view(), name='report_job_download'),
+    path('stats/requests/', views.RequestStatsView.as_view(), name='request_stats'),
+    path('import/', views.ImportDataView.as_view(), name='import_data'),
 
     path('task/new/<int:event_id>', views.TaskCreateView.as_view(), name='new_task'),
     path('task/view/<int:pk>/', views.TaskDetailView.as_view(), name='view_task'),
@@ -45,4 +53,7 @@ urlpatterns = [
     path('skill-management/', views.SkillManagementCreateView.as_view(), name="new_skill_management"),
     path('skill-management/edit/<int:pk>/', views.SkillManagementUpdateView.as_view(), name='edit_skill_management'),
     path('browse_skills/', views.skill_browser, name='skill_browser'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('search/typeahead/', views.SearchTypeaheadView.as_view(), name='search_typeahead'),
+    path('volunteers/search/', views.VolunteerSearchView.as_view(), name='volunteer_search'),
 ]
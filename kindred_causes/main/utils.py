@@ -0,0 +1,19 @@
+from datetime import datetime, time, timedelta
+from itertools import islice
+from django.utils import timezone
+
+
+def chunked(iterable, size):
+    """ Yields lists of up to size items from an iterable, without materializing it.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def start_of_day(date, days=0):
+    """ The aware datetime at which a date, or the date some days after it, starts in the current time zone.
+
+    Comparing a datetime column with it, rather than the column's date, keeps the column's index usable.
+    """
+    return timezone.make_aware(datetime.combine(date + timedelta(days=days), time.min))
@@ -1,17 +1,41 @@
-from django.shortcuts import render, redirect, reverse
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
-from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from django.shortcuts import get_object_or_404, render, redirect, reverse
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.views.generic.edit import CreateView, UpdateView, DeleteView, FormView
 from django.views.generic import DetailView, TemplateView
-from .models import AvatarOption, EventReview, Event, Task, UserProfile, Skill, Notification
-from .forms import EventReviewForm, EventForm, SkillManagementForm, ReadOnlyEventForm, TaskForm, NotificationManagementForm
+from .models import AvatarOption, EventReview, Event, ReportJob, Task, UserProfile, Skill, Notification
+from .forms import (EventReviewForm, EventForm, EventAttendeeRemovalForm, EventBrowserFilterForm, SkillManagementForm, ReadOnlyEventForm, TaskForm,
+                    NotificationManagementForm, VolunteerSearchForm, ImportUploadForm)
+from .reports import iter_event_report_rows
+from .imports import ImportFileError, import_records
+from .search import search, search_kinds
+from .jobs import submit_report_job
+from .notifications import send_event_notification
+from .choices import ReportJobStatus
+from .matching import get_volunteer_index, rank_volunteers
+from .stats import volunteer_stats
+from .assignment import (ALREADY_ASSIGNED, ASSIGNED, Assignment, AssignmentPlan, StalePlanError, apply_assignment,
+                         assign_volunteer, join_event, promote_waitlist, remove_event_attendees, solve_event_assignment,
+                         unassign_volunteer)
+from .pagination import keyset_paginate
+from .profiling import request_stats
+from .cache_versions import versioned_key
+from .context_processors import cached_profile
+from .conditional import conditional_page, event_state, report_state, task_state
+from .roles import ADMIN, VOLUNTEER, AdminRequiredMixin, has_role, role_required
 from django.contrib.auth.models import User
-from django.contrib.auth.mixins import LoginRequiredMixin, AccessMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
 from django.contrib.auth.models import Group
 from django.contrib import messages
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 import csv
+import os
 
 
 class HomeView(LoginRequiredMixin, TemplateView):
@@ -23,9 +47,9 @@ class HomeView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self,*args, **kwargs):
         context = super(HomeView, self).get_context_data(*args,**kwargs)
-        if self.request.user.groups.filter(name='Volunteer').exists():
+        if has_role(self.request.user, VOLUNTEER):
             context['events'] = self.request.user.events.all()
-        elif self.request.user.groups.filter(name='Admin').exists():
+        elif has_role(self.request.user, ADMIN):
             context['events'] = Event.objects.filter(admin=self.request.user)
 
         context['events_fields'] = ["name","description","location","date","admin","urgency_display"]
@@ -50,7 +74,7 @@ class LandingView(TemplateView):
     
 
 # Event views:
-class EventCreateView(AccessMixin, CreateView):
+class EventCreateView(AdminRequiredMixin, CreateView):
     """Event Create View
     Form for creating a new Event.
 
@@ -61,16 +85,6 @@ class EventCreateView(AccessMixin, CreateView):
     template_name = 'event_form.html'
     extra_context = {'view_type': 'create'}
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-    
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['user'] = self.request.user
@@ -80,6 +94,7 @@ class EventCreateView(AccessMixin, CreateView):
         return reverse('home')
 
 
+@method_decorator(conditional_page(event_state), name='get')
 class EventDetailView(LoginRequiredMixin, DetailView):
     """Event Detail View
     Page showing Event information and child Tasks.
@@ -95,9 +110,9 @@ class EventDetailView(LoginRequiredMixin, DetailView):
         context['event'] = event  
         user = self.request.user
 
-        if user.groups.filter(name='Volunteer').exists():
+        if has_role(user, VOLUNTEER):
             context['tasks'] = user.tasks.filter(event=event)
-        elif user.groups.filter(name='Admin').exists():
+        elif has_role(user, ADMIN):
             context['tasks'] = event.tasks.all()
 
         context['tasks_fields'] = ["name", "description", "attendee_count", "capacity", "location"]
@@ -108,7 +123,7 @@ class EventDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class EventUpdateView(AccessMixin, UpdateView):
+class EventUpdateView(AdminRequiredMixin, UpdateView):
     """Event Update View
     Form for updating an existing Event.
 
@@ -119,16 +134,6 @@ class EventUpdateView(AccessMixin, UpdateView):
     template_name = 'event_form.html'
     extra_context = {'view_type': 'update'}
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         if 'pk' in self.kwargs:
             kwargs = {'pk': self.kwargs['pk']}
@@ -137,7 +142,7 @@ class EventUpdateView(AccessMixin, UpdateView):
             return reverse('home')
 
 
-class EventDeleteView(AccessMixin, DeleteView):
+class EventDeleteView(AdminRequiredMixin, DeleteView):
     """Event Delete View
     Form for deleting an Event.
 
@@ -146,203 +151,196 @@ class EventDeleteView(AccessMixin, DeleteView):
     model = Event
     template_name = 'event_confirm_delete.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse('home')
 
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer rows can be streamed.
+    """
+    def write(self, value):
+        return value
+
+
+@role_required(ADMIN)
+@conditional_page(report_state, per_user=False)
 def export_event_report_csv(request, pk):
     event = Event.objects.get(pk=pk)
-    tasks = event.tasks.all()
-    reviews = event.event_reviews.all().order_by('-created_at')
+    writer = csv.writer(Echo())
 
-    def get_user_skills(user):
-        skill_set = set()
-        for task in user.tasks.all():
-            for skill in task.skills.all():
-                skill_set.add(skill.name)
-        return sorted(skill_set)
-
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in iter_event_report_rows(event)),
+        content_type='text/csv',
+    )
     response['Content-Disposition'] = f'attachment; filename="event_report_{event.id}.csv"'
-
-    writer = csv.writer(response)
-
-    # Section: Event Summary
-    writer.writerow(["Event Summary"])
-    writer.writerow(["Name", event.name])
-    writer.writerow(["Description", event.description])
-    writer.writerow(["Location", event.location])
-    writer.writerow(["Urgency", event.get_urgency_display()])
-    writer.writerow(["Date", event.date.strftime('%Y-%m-%d %H:%M') if event.date else "N/A"])
-    writer.writerow(["Total Capacity", event.capacity])
-    writer.writerow(["Total Attendees", event.attendee_count])
-    writer.writerow([])
-
-    # Section: Tasks
-    writer.writerow(["Tasks"])
-    writer.writerow(["Name", "Description", "Location", "Capacity", "Required Skills", "Assigned Attendees", "Attendee Skills", "Attendee Previous Events"])
-
-    for task in tasks:
-        assigned_users = task.attendees.all()
-        skills = ", ".join([s.name for s in task.skills.all()]) if task.skills.exists() else "None"
-
-        if not assigned_users:
-            writer.writerow([
-                task.name,
-                task.description,
-                task.location,
-                task.capacity,
-                skills,
-                "(None)",
-                "",
-                ""
-            ])
-        else:
-            for user in assigned_users:
-                full_name = user.get_full_name() or user.username
-                user_skills = ", ".join(get_user_skills(user)) or "None"
-                previous_events = user.events.exclude(pk=event.pk).order_by('-date')
-                prev_titles = ", ".join([f"{e.name} ({e.date.strftime('%Y-%m-%d') if e.date else 'No date'})" for e in previous_events]) or "None"
-
-                writer.writerow([
-                    task.name,
-                    task.description,
-                    task.location,
-                    task.capacity,
-                    skills,
-                    full_name,
-                    user_skills,
-                    prev_titles
-                ])
-
-    writer.writerow([])
-
-    # Section: Reviews
-    writer.writerow(["Event Reviews"])
-    writer.writerow(["Rating", "Comments"])
-
-    if not reviews.exists():
-        writer.writerow(["None", "No reviews submitted."])
-    else:
-        for review in reviews:
-            writer.writerow([review.rating, review.comments])
-
     return response
 
+@role_required(ADMIN)
 def generate_event_report_pdf(request, pk):
     event = Event.objects.get(pk=pk)
-    tasks = event.tasks.all()
-    reviews = event.event_reviews.all().order_by('-created_at')  # updated
+    job = submit_report_job(event)
+
+    if job.status == ReportJobStatus.DONE:
+        return _report_file_response(request, job)
+
+    return render(request, 'report_job.html', {'event': event, 'job': job})
+
+
+def _report_file_response(request, job):
+    # A finished report never changes, so its content version is its ETag.
+    etag = quote_etag(job.version)
+    last_modified = int(job.completed_at.timestamp()) if job.completed_at else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(
+            open(job.file_path, 'rb'),
+            as_attachment=True,
+            filename=f"event_report_{job.event_id}.pdf",
+            content_type='application/pdf',
+        )
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="event_report_{event.id}.pdf"'
 
-    p = canvas.Canvas(response, pagesize=letter)
-    width, height = letter
-    y = height - 50
+class ReportJobCreateView(AdminRequiredMixin, View):
+    """Report Job Create View
+    Queues a PDF report of an Event and returns the job id.
 
-    def draw_line(p, y, txt, font="Helvetica", size=12, bold=False, indent=0):
-        if bold:
-            p.setFont("Helvetica-Bold", size)
-        else:
-            p.setFont(font, size)
-        p.drawString(50 + indent, y, txt)
-        return y - 18
-
-    def get_user_skills(user):
-        skill_set = set()
-        for task in user.tasks.all():
-            for skill in task.skills.all():
-                skill_set.add(skill.name)
-        return sorted(skill_set)
-
-    # Event Summary
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, y, f"Event Report: {event.name}")
-    y -= 30
-
-    y = draw_line(p, y, f"Description: {event.description}")
-    y = draw_line(p, y, f"Location: {event.location}")
-    y = draw_line(p, y, f"Urgency: {event.get_urgency_display()}")
-    if event.date:
-        y = draw_line(p, y, f"Date: {event.date.strftime('%Y-%m-%d %H:%M')}")
-    y = draw_line(p, y, f"Total Capacity: {event.capacity}")
-    y = draw_line(p, y, f"Total Attendees: {event.attendee_count}")
-    y -= 10
-
-    # Tasks Section
-    y = draw_line(p, y, "Tasks", bold=True, size=14)
-    for task in tasks:
-        if y < 120:
-            p.showPage()
-            y = height - 50
-
-        y = draw_line(p, y, f"- {task.name}", bold=True, indent=10)
-        y = draw_line(p, y, f"  Description: {task.description}", indent=10)
-        y = draw_line(p, y, f"  Location: {task.location}", indent=10)
-        y = draw_line(p, y, f"  Capacity: {task.capacity}", indent=10)
-        skills = task.skills.all()
-        skills_str = ", ".join([s.name for s in skills]) if skills else "None"
-        y = draw_line(p, y, f"  Required Skills: {skills_str}", indent=10)
-
-        y = draw_line(p, y, "  Assigned Attendees:", indent=10)
-        assigned_users = task.attendees.all()
-        if not assigned_users:
-            y = draw_line(p, y, "    (None)", indent=20)
-        else:
-            for user in assigned_users:
-                full_name = user.get_full_name() or user.username
-                user_skills = get_user_skills(user)
-                skills_str = f" (Skills: {', '.join(user_skills)})" if user_skills else ""
-                y = draw_line(p, y, f"    • {full_name}{skills_str}", indent=20)
-
-                previous_events = user.events.exclude(pk=event.pk).order_by('-date')
-                if previous_events.exists():
-                    for prev_event in previous_events:
-                        name_date = f"{prev_event.name} ({prev_event.date.strftime('%Y-%m-%d') if prev_event.date else 'No date'})"
-                        y = draw_line(p, y, f"       - {name_date}", indent=30)
-                        if y < 100:
-                            p.showPage()
-                            y = height - 50
-                else:
-                    y = draw_line(p, y, "       - (No previous events)", indent=30)
-
-                if y < 100:
-                    p.showPage()
-                    y = height - 50
-
-    # Reviews Section
-    if y < 150:
-        p.showPage()
-        y = height - 50
-
-    y = draw_line(p, y, "Event Reviews", bold=True, size=14)
-
-    if not reviews.exists():
-        y = draw_line(p, y, "No reviews submitted.", indent=10)
-    else:
-        for review in reviews:
-            y = draw_line(p, y, f"- Rating: {review.rating}/5", bold=True, indent=10)
-            y = draw_line(p, y, f"  {review.comments}", indent=10)
-            y -= 5
-
-            if y < 100:
-                p.showPage()
-                y = height - 50
-
-    p.showPage()
-    p.save()
-    return response
+    Only accessible for Admin group members; others are answered with 403 Forbidden.
+    """
+    raise_exception = True
+
+    def post(self, request, *args, **kwargs):
+        event = get_object_or_404(Event, pk=kwargs['pk'])
+        job = submit_report_job(event, retry_failed=True)
+        return JsonResponse(_report_job_json(job), status=202)
+
+
+class ReportJobStatusView(AdminRequiredMixin, View):
+    """Report Job Status View
+    Returns the status of a queued report as JSON.
+
+    Only accessible for Admin group members; others are answered with 403 Forbidden.
+    """
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(ReportJob, pk=kwargs['pk'])
+        return JsonResponse(_report_job_json(job))
+
+
+class ReportJobDownloadView(AdminRequiredMixin, View):
+    """Report Job Download View
+    Serves the file of a finished report.
+
+    Only accessible for Admin group members; others are answered with 403 Forbidden.
+    """
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(ReportJob, pk=kwargs['pk'])
+        if job.status == ReportJobStatus.DONE and not os.path.exists(job.file_path):
+            # The cached file was removed, so the report is queued again.
+            job = submit_report_job(job.event, retry_failed=True)
+        if job.status != ReportJobStatus.DONE:
+            return JsonResponse(_report_job_json(job), status=409)
+        return _report_file_response(request, job)
+
+
+def _report_job_json(job):
+    return {
+        'id': job.pk,
+        'event': job.event_id,
+        'status': job.status,
+        # The traceback stays in the job for admins; it is logged as the job fails.
+        'error': "The report could not be generated." if job.status == ReportJobStatus.FAILED else '',
+        'status_url': reverse('report_job_status', kwargs={'pk': job.pk}),
+        'download_url': reverse('report_job_download', kwargs={'pk': job.pk}),
+    }
+
+
+class RequestStatsView(AdminRequiredMixin, View):
+    """Request Stats View
+    Rolling query counts, SQL and template timings and repeated queries per route, as JSON.
+    Posting clears them.
+
+    Only accessible for Admin group members.
+    """
 
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({
+            'sample_rate': settings.REQUEST_PROFILING_SAMPLE_RATE,
+            'window': settings.REQUEST_PROFILING_WINDOW,
+            'routes': request_stats.snapshot(),
+        })
+
+    def post(self, request, *args, **kwargs):
+        request_stats.reset()
+        return HttpResponse(status=204)
+
+
+class ImportDataView(AdminRequiredMixin, FormView):
+    """Import Data View
+    Page uploading CSV or JSONL files of skills, events, volunteers and tasks to import in bulk.
+    The results, with the invalid rows by line, are shown on the page.
+
+    Only accessible for Admin group members.
+    """
+    template_name = 'import_data.html'
+    form_class = ImportUploadForm
+
+    def form_valid(self, form):
+        files = {kind: (file, file.name) for kind, file in form.cleaned_data.items() if kind != 'dry_run' and file}
+        try:
+            results = import_records(files, dry_run=form.cleaned_data['dry_run'])
+        except ImportFileError as exc:
+            form.add_error(None, str(exc))
+            return self.form_invalid(form)
+
+        if form.cleaned_data['dry_run']:
+            messages.info(self.request, "Validated the files; nothing was saved.")
+        elif any(result.created or result.updated for result in results):
+            messages.success(self.request, "Imported " + ", ".join(f"{result.created + result.updated} {result.kind}" for result in results) + ".")
+        return self.render_to_response(self.get_context_data(form=form, results=results))
+
+
+
+class AutoAssignEventView(AdminRequiredMixin, TemplateView):
+    """Auto Assign Event View
+    Page previewing the solver's staffing of an Event's Tasks; posting applies it.
+
+    Only accessible for Admin group members.
+    """
+    template_name = 'auto_assign_event.html'
+
+    def post(self, request, *args, **kwargs):
+        # The previewed plan is posted back as "task_id:user_id" pairs with the state it was solved from,
+        # so the admin gets exactly what they confirmed or, if the Event changed meanwhile, a new preview.
+        event = get_object_or_404(Event, pk=self.kwargs['pk'])
+        try:
+            pairs = [value.split(':') for value in request.POST.getlist('assignment')]
+            assignments = [Assignment(int(task_id), '', int(user_id), '', []) for task_id, user_id in pairs]
+        except ValueError:
+            return HttpResponseBadRequest("Malformed assignment.")
+        state = request.POST.get('state')
+        if not state:
+            return HttpResponseBadRequest("Missing plan state.")
+
+        try:
+            assigned = apply_assignment(AssignmentPlan(event=event, assignments=assignments, state=state))
+        except StalePlanError:
+            messages.warning(request, "The event changed since this preview. Review the updated assignments.")
+            return HttpResponseRedirect(reverse('auto_assign_event', kwargs={'pk': event.pk}))
+        messages.success(request, f"Assigned {assigned} volunteers to tasks.")
+        return HttpResponseRedirect(reverse('view_event', kwargs={'pk': event.pk}))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['event'] = get_object_or_404(Event, pk=self.kwargs['pk'])
+        context['plan'] = solve_event_assignment(context['event'])
+        return context
 
 
 class JoinEventView(LoginRequiredMixin, TemplateView):
@@ -354,11 +352,8 @@ class JoinEventView(LoginRequiredMixin, TemplateView):
     template_name = 'confirm_join_event.html'
 
     def post(self, request, *args, **kwargs):
-        if 'event_id' in kwargs:
-            event = Event.objects.get(id=self.kwargs['event_id'])
-            event.attendees.add(request.user)
-            event.save()
-        
+        event = get_object_or_404(Event, pk=self.kwargs['event_id'])
+        join_event(event, request.user)
         return HttpResponseRedirect(reverse('view_event', kwargs={'pk':event.id}))
     
     def get_context_data(self, **kwargs):
@@ -379,15 +374,8 @@ class LeaveEventView(LoginRequiredMixin, TemplateView):
     template_name = 'confirm_leave_event.html'
 
     def post(self, request, *args, **kwargs):
-        if 'event_id' in kwargs:
-            event = Event.objects.get(id=self.kwargs['event_id'])
-            event.attendees.remove(request.user)
-            event.save()
-            
-            for task in request.user.tasks.all():
-                task.attendees.remove(request.user)
-                task.save()
-        
+        event = get_object_or_404(Event, pk=self.kwargs['event_id'])
+        remove_event_attendees(event, [request.user.pk])
         return HttpResponseRedirect(reverse('view_event', kwargs={'pk':event.id}))
     
     def get_context_data(self, **kwargs):
@@ -399,8 +387,38 @@ class LeaveEventView(LoginRequiredMixin, TemplateView):
         return context
 
 
+class RemoveEventAttendeesView(AdminRequiredMixin, FormView):
+    """Remove Event Attendees View
+    Form for removing several attendees, and their Task assignments, from an Event at once.
+
+    Only accessible for Admin group members.
+    """
+    form_class = EventAttendeeRemovalForm
+    template_name = 'remove_event_attendees.html'
+
+    @cached_property
+    def event(self):
+        # Loaded by the handlers, so only after AdminRequiredMixin has checked the user.
+        return get_object_or_404(Event, pk=self.kwargs['pk'])
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['event'] = self.event
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['event'] = self.event
+        return context
+
+    def form_valid(self, form):
+        removed = remove_event_attendees(self.event, [user.pk for user in form.cleaned_data['attendees']])
+        messages.success(self.request, f"Removed {removed} volunteers from {self.event.name}.")
+        return HttpResponseRedirect(reverse('view_event', kwargs={'pk': self.event.pk}))
+
+
 # Task views:
-class TaskCreateView(AccessMixin, CreateView):
+class TaskCreateView(AdminRequiredMixin, CreateView):
     """Task Create View
     Form for creating a new Task.
 
@@ -411,16 +429,6 @@ class TaskCreateView(AccessMixin, CreateView):
     template_name = 'task_form.html'
     extra_context = {'view_type': 'create'}
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if 'event_id' in self.kwargs:
@@ -443,7 +451,8 @@ class TaskCreateView(AccessMixin, CreateView):
             return reverse('home')
 
 
-class TaskDetailView(AccessMixin, DetailView):
+@method_decorator(conditional_page(task_state, use_last_modified=False), name='get')
+class TaskDetailView(AdminRequiredMixin, DetailView):
     """Task Detail View
     Page showing Task information and child Tasks.
 
@@ -452,26 +461,29 @@ class TaskDetailView(AccessMixin, DetailView):
     model = Task
     template_name = 'task_details.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['attendees'] = self.get_object().attendees.all()
-        context['unassigned_users'] = self.get_object().event.attendees.exclude(pk__in=context['attendees'])
-        context['attendees_fields'] = ["get_full_name", "profile.get_skill_names"]
+        task = self.object
+        index = get_volunteer_index()
+        attendees = list(task.attendees.order_by('pk'))
+        unassigned_users = list(task.event.attendees.exclude(tasks=task).order_by('pk'))
+
+        # Attendees with every required skill first; skill names come from the index, not a query per user.
+        required = task.skills.values_list('pk', flat=True)
+        qualified = {index.user_ids[i] for i in index.search(all_skills=required, user_ids=[user.pk for user in unassigned_users])}
+        unassigned_users.sort(key=lambda user: user.pk not in qualified)
+        for user in attendees + unassigned_users:
+            user.skill_names = ", ".join(index.skill_names_of(user.pk))
+
+        context['attendees'] = attendees
+        context['unassigned_users'] = unassigned_users
+        context['waitlist'] = task.waitlist.select_related('user').order_by('created_at', 'pk')
+        context['attendees_fields'] = ["get_full_name", "skill_names"]
         context['attendees_headers'] = ["Full Name", 'Skills']
         return context
     
 
-class AssignTaskView(AccessMixin, TemplateView):
+class AssignTaskView(AdminRequiredMixin, TemplateView):
     """Assign Task View
     Page confirming that user should be assigned to task.
 
@@ -479,24 +491,18 @@ class AssignTaskView(AccessMixin, TemplateView):
     """
     template_name = 'confirm_assign_task.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-    
-
     def post(self, request, *args, **kwargs):
-        if 'user_id' in kwargs and 'task_id' in kwargs:
-            user = User.objects.get(pk=self.kwargs['user_id'])
-            task = Task.objects.get(id=self.kwargs['task_id'])
-            task.attendees.add(user)
-            task.save()
-        
+        user = get_object_or_404(User, pk=self.kwargs['user_id'])
+        task = get_object_or_404(Task, pk=self.kwargs['task_id'])
+        result = assign_volunteer(task, user)
+
+        name = user.get_full_name() or user.username
+        if result == ASSIGNED:
+            messages.success(request, f"Assigned {name} to {task.name}.")
+        elif result == ALREADY_ASSIGNED:
+            messages.info(request, f"{name} is already assigned to {task.name}.")
+        else:
+            messages.warning(request, f"{task.name} is full, {name} was added to its waitlist.")
         return HttpResponseRedirect(reverse('view_task', kwargs={'pk':task.id}))
             
 
@@ -512,7 +518,7 @@ class AssignTaskView(AccessMixin, TemplateView):
     
 
 
-class RemoveTaskView(AccessMixin, TemplateView):
+class RemoveTaskView(AdminRequiredMixin, TemplateView):
     """Remove Task View
     Page confirming that user should be unassigned from task.
 
@@ -520,24 +526,12 @@ class RemoveTaskView(AccessMixin, TemplateView):
     """
     template_name = 'confirm_remove_task.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-    
-
     def post(self, request, *args, **kwargs):
-        if 'user_id' in kwargs and 'task_id' in kwargs:
-            user = User.objects.get(pk=self.kwargs['user_id'])
-            task = Task.objects.get(id=self.kwargs['task_id'])
-            task.attendees.remove(user)
-            task.save()
-        
+        user = get_object_or_404(User, pk=self.kwargs['user_id'])
+        task = get_object_or_404(Task, pk=self.kwargs['task_id'])
+        promoted = unassign_volunteer(task, user)
+        if promoted is not None:
+            messages.info(request, f"{promoted.get_full_name() or promoted.username} was moved from the waitlist to {task.name}.")
         return HttpResponseRedirect(reverse('view_task', kwargs={'pk':task.id}))
             
 
@@ -552,7 +546,7 @@ class RemoveTaskView(AccessMixin, TemplateView):
         return context
 
 
-class TaskUpdateView(AccessMixin, UpdateView):
+class TaskUpdateView(AdminRequiredMixin, UpdateView):
     """Task Update View
     Form for updating an existing Task.
 
@@ -563,15 +557,12 @@ class TaskUpdateView(AccessMixin, UpdateView):
     template_name = 'task_form.html'
     extra_context = {'view_type': 'update'}
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if 'capacity' in form.changed_data:
+            # Places added by a higher capacity go to the waitlist; a lower one promotes nobody.
+            promote_waitlist(self.object)
+        return response
 
     def get_success_url(self):
         if 'pk' in self.kwargs:
@@ -581,7 +572,7 @@ class TaskUpdateView(AccessMixin, UpdateView):
             return reverse('home')
  
 
-class TaskDeleteView(AccessMixin, DeleteView):
+class TaskDeleteView(AdminRequiredMixin, DeleteView):
     """Task Delete View
     Form for deleting an Task.
 
@@ -590,16 +581,6 @@ class TaskDeleteView(AccessMixin, DeleteView):
     model = Task
     template_name = 'task_confirm_delete.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        """Handles authorization
-        """
-        if not request.user.is_authenticated:
-            return self.handle_no_permission()
-        if not self.request.user.groups.filter(name="Admin").exists():
-            return HttpResponseRedirect(reverse('home'))
-
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse('home')
 
@@ -636,9 +617,8 @@ class EventReviewUpdateView(LoginRequiredMixin, UpdateView):
     extra_context={'view_type': 'update'}
 
     def get_success_url(self):
-        return redirect('home')
+        return reverse('home')
 
-    
 
 
 class TaskHistoryView(LoginRequiredMixin, TemplateView):
@@ -648,6 +628,7 @@ class TaskHistoryView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
      
+        context['stats'] = volunteer_stats([self.request.user.pk])[self.request.user.pk]
         context['tasks'] = self.request.user.tasks.all()
         context['tasks_fields'] = ["name","description","attendee_count","capacity","location"]
         context['tasks_headers'] = ["Name","Description","Attendees","Capacity","Location"]
@@ -662,19 +643,17 @@ class NotificationCreateView(CreateView):
     def post(self, request, *args, **kwargs):
         form = self.get_form()
         if form.is_valid():
-            # Get event, subject, body from form
             event = form.cleaned_data['event']
-            subject = form.cleaned_data['subject']
-            body = form.cleaned_data['body']
-            # Loop through event attendees and create notifications
-            for attendee in event.attendees.all():
-                Notification.objects.create(
-                    event=event,
-                    recipient=attendee,
-                    subject=subject,
-                    body=body,
-                    is_read=False
-                )
+            count, queued = send_event_notification(
+                event,
+                form.cleaned_data['subject'],
+                form.cleaned_data['body'],
+                created_by=request.user if request.user.is_authenticated else None,
+            )
+            if queued:
+                messages.info(request, f"Sending notification to {count} attendees of {event.name} in the background.")
+            else:
+                messages.success(request, f"Sent notification to {count} attendees of {event.name}.")
             return redirect(self.get_success_url())
         return self.form_invalid(form)
 
@@ -708,28 +687,80 @@ class event_browser(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['events'] = Event.objects.all()
+
+        events = Event.objects.select_related('admin')
+        profile = cached_profile(self.request.user.pk)
+        origin = (profile.latitude, profile.longitude) if profile is not None and profile.latitude is not None else None
+        form = EventBrowserFilterForm(self.request.GET, origin=origin)
+        if form.is_valid():
+            events = form.filter(events)
+        else:
+            events = events.order_by('date', 'pk')
+
+        page = Paginator(events, settings.EVENT_BROWSER_PAGE_SIZE).get_page(self.request.GET.get('page'))
+        query = self.request.GET.copy()
+        query.pop('page', None)
+
+        context['filter_form'] = form
+        context['filter_query'] = query.urlencode()
+        context['page_obj'] = page
+        context['events'] = page.object_list
         context['events_fields'] = ["name","description","location","date","admin","urgency_display"]
         context['events_headers'] = ["Name","Description","Location","Date","Organizer","Urgency"]
+        if form.is_valid() and form.point is not None:
+            context['events_fields'].append("distance")
+            context['events_headers'].append("Miles")
         return context
 
-class NotificationInboxView(TemplateView):
+def _inbox_page(request):
+    """The requested page of the user's inbox, shared by the HTML and JSON inbox views.
+    """
+    inbox = Notification.objects.select_related('event').filter(recipient=request.user)
+    if request.GET.get('unread'):
+        inbox = inbox.filter(is_read=False)
+    return keyset_paginate(inbox, request.GET.get('cursor'), settings.INBOX_PAGE_SIZE)
+
+
+class NotificationInboxView(LoginRequiredMixin, TemplateView):
     template_name = 'inbox.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        user = self.request.user
-
-        context['inbox'] = Notification.objects.select_related('event') \
-            .filter(recipient=user) \
-            .order_by('-created_at')
+        page = _inbox_page(self.request)
+        context['inbox'] = page.items
+        context['inbox_page'] = page
 
         context['inbox_fields'] = ["is_read", "event", "subject"]
         context['inbox_headers'] = ["Read", "Event", "Subject"]
         return context
 
 
+class NotificationInboxJsonView(LoginRequiredMixin, View):
+    """Notification Inbox JSON View
+    The user's inbox as JSON, paginated with the same cursors as the inbox page.
+
+    Requires login.
+    """
+
+    def get(self, request, *args, **kwargs):
+        page = _inbox_page(request)
+        return JsonResponse({
+            'results': [
+                {
+                    'id': notification.pk,
+                    'event': notification.event.name if notification.event else None,
+                    'subject': notification.subject,
+                    'body': notification.body,
+                    'is_read': notification.is_read,
+                    'created_at': notification.created_at.isoformat(),
+                }
+                for notification in page.items
+            ],
+            'next_cursor': page.next_cursor,
+        })
+
+
 
 class NotificationDetailView(LoginRequiredMixin, DetailView):
     model = Notification
@@ -755,11 +786,55 @@ def skill_browser(request: HttpRequest) -> HttpResponse:
     :param HttpRequest request: The request from the client's browser.
     :return HttpResponse: The response to the client.
     """
-    skills = Skill.objects.all()  # fetch all Skill objects
+    index = get_volunteer_index()
+    key = versioned_key('skill_browser', index.version)
+    skills = cache.get(key)
+    if skills is None:
+        skills = list(Skill.objects.all())  # fetch all Skill objects
+        volunteer_counts = index.skill_counts()
+        for skill in skills:
+            skill.volunteer_count = volunteer_counts.get(skill.pk, 0)
+        cache.set(key, skills, settings.FRAGMENT_CACHE_TIMEOUT)
     context: dict = {'skills': skills}  # pass them to the template
     return render(request, 'skill_browser.html', context)
 
 
+class SearchView(LoginRequiredMixin, TemplateView):
+    """Search View
+    Page listing the Events, Tasks and Skills matching a search, best match first.
+
+    Requires login.
+    """
+    template_name = 'search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '').strip()
+        context['results'] = search(context['query'], search_kinds(self.request.user), settings.SEARCH_RESULTS_LIMIT)
+        return context
+
+
+class SearchTypeaheadView(LoginRequiredMixin, View):
+    """Search Typeahead View
+    The best matches for a search as it is typed, as JSON. Results are cached until an Event, Task or Skill changes.
+
+    Requires login.
+    """
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '')[:200]
+        kinds = search_kinds(request.user)
+        key = versioned_key('typeahead', query.lower(), kinds)
+        results = cache.get(key)
+        if results is None:
+            results = [
+                {'kind': result.kind, 'kind_label': result.kind_label, 'id': result.object_id, 'title': result.title, 'url': result.url}
+                for result in search(query, kinds, settings.TYPEAHEAD_LIMIT)
+            ]
+            cache.set(key, results, settings.FRAGMENT_CACHE_TIMEOUT)
+        return JsonResponse({'query': query, 'results': results})
+
+
 def volunteer_history(request: HttpRequest) -> HttpResponse:
     """ Default page.
 
@@ -769,13 +844,53 @@ def volunteer_history(request: HttpRequest) -> HttpResponse:
     context: dict = {'test_key': 'test_value'}
     return render(request, 'volunteer_history.html', context)
 
+class VolunteerSearchView(AdminRequiredMixin, TemplateView):
+    """Volunteer Search View
+    Page finding volunteers by skills and availability, using the volunteer index.
+
+    Only accessible for Admin group members.
+    """
+    template_name = 'volunteer_search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        index = get_volunteer_index()
+        form = VolunteerSearchForm(self.request.GET)
+        positions = form.search(index) if form.is_valid() else []
+
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        page_obj = Paginator(positions, settings.VOLUNTEER_SEARCH_PAGE_SIZE).get_page(self.request.GET.get('page'))
+        context['search_form'] = form
+        context['search_query'] = query.urlencode()
+        context['page_obj'] = page_obj
+        context['volunteers'] = [index.volunteer(i) for i in page_obj]
+        return context
+
+
+@role_required(ADMIN)
 def matching_form(request: HttpRequest) -> HttpResponse:
-    """ Default page.
+    """ Volunteer matching page.
+
+    Ranks volunteers for the selected Task by skills, availability and location.
+    Only accessible for Admin group members, since it shows other volunteers' profiles.
 
     :param HttpRequest reqest: The request from the client's browser.
     :return HttpReponse: The response to the client.
     """
-    context: dict = {'test_key': 'test_value'}
+    tasks = Task.objects.select_related('event').order_by('event__date', 'event__name', 'name')
+    task = None
+    matches = []
+
+    task_id = request.GET.get('task')
+    if task_id:
+        try:
+            task = get_object_or_404(tasks, pk=int(task_id))
+        except ValueError:
+            raise Http404("No Task matches the given query.")
+        matches = rank_volunteers(task)
+
+    context: dict = {'tasks': tasks, 'task': task, 'matches': matches}
     return render(request, 'matching_form.html', context)
 
 class AccountView(LoginRequiredMixin, TemplateView):
@@ -808,7 +923,8 @@ class AccountManagementView(LoginRequiredMixin, View):
         skills = Skill.objects.all()  
         profile, created = UserProfile.objects.get_or_create(user=request.user) 
         avatars = AvatarOption.objects.all()
-        return render(request, "profile_management.html", {"profile": profile, "skills": skills, "avatars": avatars})
+        selected_skill_ids = set(profile.skills.values_list('pk', flat=True))
+        return render(request, "profile_management.html", {"profile": profile, "skills": skills, "avatars": avatars, "selected_skill_ids": selected_skill_ids})
 
     def post(self, request):
         profile, created = UserProfile.objects.get_or_create(user=request.user)